@@ -4,6 +4,62 @@ from typing import Dict, Any, Optional
 from .providers import provider_manager
 
 
+COMPLEXITY_SCORES = {
+    "low": 1,
+    "medium": 2,
+    "high": 3
+}
+
+# Rough hourly spend per model
+MODEL_HOURLY_COSTS = {
+    "gpt-4": 0.5,  # $0.50 per hour average
+    "gpt-3.5-turbo": 0.1  # $0.10 per hour average
+}
+
+MODEL_PROVIDERS = {
+    "gpt-4": "openai",
+    "gpt-3.5-turbo": "openai"
+}
+
+# Prompt-cache pricing relative to the normal input rate: cache reads are
+# discounted, cache writes may carry a surcharge
+PROVIDER_CACHE_MULTIPLIERS = {
+    "openai": {"read": 0.5, "write": 1.0},
+    "anthropic": {"read": 0.1, "write": 1.25},
+    "google": {"read": 0.25, "write": 1.0}
+}
+
+# Per-1K-token prices, with cache read/write rates derived per provider
+MODEL_COSTS = {
+    model: {
+        **rates,
+        "cached": rates["input"] * PROVIDER_CACHE_MULTIPLIERS[MODEL_PROVIDERS[model]]["read"],
+        "cache_write": rates["input"] * PROVIDER_CACHE_MULTIPLIERS[MODEL_PROVIDERS[model]]["write"]
+    }
+    for model, rates in {
+        "gpt-4": {"input": 0.03, "output": 0.06},
+        "gpt-3.5-turbo": {"input": 0.0015, "output": 0.002}
+    }.items()
+}
+
+# Assume 30% input / 70% output tokens
+INPUT_TOKEN_SHARE = 0.3
+OUTPUT_TOKEN_SHARE = 0.7
+
+# Blended price per token, folded from MODEL_COSTS and the token split
+COST_PER_TOKEN = {
+    model: (rates["input"] * INPUT_TOKEN_SHARE + rates["output"] * OUTPUT_TOKEN_SHARE) / 1000
+    for model, rates in MODEL_COSTS.items()
+}
+
+BASE_LATENCIES_MS = {
+    "gpt-4": 2000,
+    "gpt-3.5-turbo": 1000
+}
+
+DEFAULT_MODEL = "gpt-3.5-turbo"
+
+
 class CostLatencyBudgeter:
     """Budgets cost and latency to pick optimal model/context size per task"""
 
@@ -14,17 +70,15 @@ class CostLatencyBudgeter:
             "preferred_models": ["gpt-4", "gpt-3.5-turbo"]
         }
 
-    def select_model_and_context(self, task_complexity: str, available_tokens: int) -> Dict[str, Any]:
+    def select_model_and_context(self, task_complexity: str, available_tokens: int,
+                                 prefix_hash: Optional[str] = None) -> Dict[str, Any]:
         """
         Select optimal model and context size based on task complexity and budget
-        """
-        complexity_scores = {
-            "low": 1,
-            "medium": 2,
-            "high": 3
-        }
 
-        complexity = complexity_scores.get(task_complexity, 2)
+        If `prefix_hash` identifies a prompt prefix the provider has recently
+        cached, those tokens are priced at the cached-input rate.
+        """
+        complexity = COMPLEXITY_SCORES.get(task_complexity, 2)
 
         # Select model based on complexity and cost
         if complexity >= 3 and self._can_afford_model("gpt-4"):
@@ -38,50 +92,49 @@ class CostLatencyBudgeter:
             model = "gpt-3.5-turbo"
             max_context = min(available_tokens, 2000)
 
+        cached_tokens = provider_manager.lookup_cached_prefix_tokens(prefix_hash) if prefix_hash else 0
+
         return {
             "model": model,
             "max_context": max_context,
-            "estimated_cost": self._estimate_cost(model, max_context),
+            "estimated_cost": self._estimate_cost(model, max_context, cached_tokens=cached_tokens),
             "estimated_latency": self._estimate_latency(model, complexity)
         }
 
     def _can_afford_model(self, model: str) -> bool:
         """Check if we can afford using this model within budget"""
         # Get current usage
-        stats = provider_manager.get_usage_stats()
-        current_cost = sum(provider.get("estimated_cost", 0) for provider in stats.values())
+        current_cost = provider_manager.total_estimated_cost
 
         # Estimate cost for this model (rough hourly estimate)
-        model_hourly_costs = {
-            "gpt-4": 0.5,  # $0.50 per hour average
-            "gpt-3.5-turbo": 0.1  # $0.10 per hour average
-        }
-
-        estimated_hourly = model_hourly_costs.get(model, 0.1)
+        estimated_hourly = MODEL_HOURLY_COSTS.get(model, 0.1)
         return current_cost + estimated_hourly <= self.budgets["cost_per_hour"]
 
-    def _estimate_cost(self, model: str, tokens: int) -> float:
-        """Estimate cost for a request"""
-        costs = {
-            "gpt-4": {"input": 0.03, "output": 0.06},
-            "gpt-3.5-turbo": {"input": 0.0015, "output": 0.002}
-        }
+    def _estimate_cost(self, model: str, tokens: int, cached_tokens: int = 0,
+                       cache_creation_tokens: int = 0) -> float:
+        """Estimate cost for a request
+
+        `cached_tokens` are input tokens served from the provider's prompt
+        cache and `cache_creation_tokens` are input tokens written to it;
+        both are capped at the input share of `tokens`.
+        """
+        if not cached_tokens and not cache_creation_tokens:
+            return tokens * COST_PER_TOKEN.get(model, COST_PER_TOKEN[DEFAULT_MODEL])
 
-        model_costs = costs.get(model, costs["gpt-3.5-turbo"])
-        # Assume 70% output tokens
-        input_tokens = tokens * 0.3
-        output_tokens = tokens * 0.7
+        rates = MODEL_COSTS.get(model, MODEL_COSTS[DEFAULT_MODEL])
+        input_tokens = tokens * INPUT_TOKEN_SHARE
+        output_tokens = tokens * OUTPUT_TOKEN_SHARE
 
-        return (input_tokens * model_costs["input"] + output_tokens * model_costs["output"]) / 1000
+        cached = min(cached_tokens, input_tokens)
+        written = min(cache_creation_tokens, input_tokens - cached)
+        uncached = input_tokens - cached - written
+
+        return (uncached * rates["input"] + cached * rates["cached"] +
+                written * rates["cache_write"] + output_tokens * rates["output"]) / 1000
 
     def _estimate_latency(self, model: str, complexity: int) -> int:
         """Estimate latency in milliseconds"""
-        base_latencies = {
-            "gpt-4": 2000,
-            "gpt-3.5-turbo": 1000
-        }
-
-        base = base_latencies.get(model, 1000)
+        base = BASE_LATENCIES_MS.get(model, 1000)
         # Add complexity factor
         return base + (complexity - 1) * 500
 
@@ -91,8 +144,7 @@ class CostLatencyBudgeter:
 
     def get_budget_status(self) -> Dict[str, Any]:
         """Get current budget status"""
-        stats = provider_manager.get_usage_stats()
-        current_cost = sum(provider.get("estimated_cost", 0) for provider in stats.values())
+        current_cost = provider_manager.total_estimated_cost
 
         return {
             "current_cost": current_cost,
@@ -103,4 +155,4 @@ class CostLatencyBudgeter:
 
 
 # Global budgeter instance
-budgeter = CostLatencyBudgeter()
\ No newline at end of file
+budgeter = CostLatencyBudgeter()
@@ -1,11 +1,127 @@
 from __future__ import annotations
 
+import ast
 import difflib
+import hashlib
+import os
 import re
-from typing import Dict, List, Any, Optional, Tuple
+import shutil
+import subprocess
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Dict, List, Any, Optional, Set, Tuple
 from dataclasses import dataclass
 from pathlib import Path
 
+try:
+    # Optional C implementation of SequenceMatcher, used only by this
+    # module's diffs; difflib itself is left untouched for other users
+    from cdifflib import CSequenceMatcher as _SequenceMatcher
+except ImportError:
+    _SequenceMatcher = difflib.SequenceMatcher
+
+
+# Above this many lines per side, diffs are delegated to `git diff --no-index`
+GIT_DIFF_THRESHOLD_LINES = 10000
+
+# Multi-file batches are flushed by a bounded thread pool
+MAX_FLUSH_WORKERS = 32
+
+
+def _open_file_budget() -> int:
+    """A quarter of the soft RLIMIT_NOFILE, so flushes never exhaust fds"""
+    try:
+        import resource
+        soft_limit = resource.getrlimit(resource.RLIMIT_NOFILE)[0]
+    except (ImportError, OSError, ValueError):
+        return MAX_FLUSH_WORKERS
+    if soft_limit == resource.RLIM_INFINITY:
+        return MAX_FLUSH_WORKERS
+    return max(1, soft_limit // 4)
+
+
+_open_file_slots = threading.BoundedSemaphore(_open_file_budget())
+
+
+def _format_range(start: int, stop: int) -> str:
+    """Hunk range in unified diff form, as difflib writes it"""
+    length = stop - start
+    if length == 1:
+        return str(start + 1)
+    return f"{start + 1 if length else start},{length}"
+
+
+def _unified_diff(old_lines: List[str], new_lines: List[str], fromfile: str, tofile: str) -> List[str]:
+    """difflib.unified_diff(lineterm="") driven by this module's matcher"""
+    diff: List[str] = []
+    for group in _SequenceMatcher(None, old_lines, new_lines).get_grouped_opcodes(3):
+        if not diff:
+            diff.extend((f"--- {fromfile}", f"+++ {tofile}"))
+        first, last = group[0], group[-1]
+        diff.append(f"@@ -{_format_range(first[1], last[2])} +{_format_range(first[3], last[4])} @@")
+        for tag, i1, i2, j1, j2 in group:
+            if tag == 'equal':
+                diff.extend(' ' + line for line in old_lines[i1:i2])
+                continue
+            if tag in ('replace', 'delete'):
+                diff.extend('-' + line for line in old_lines[i1:i2])
+            if tag in ('replace', 'insert'):
+                diff.extend('+' + line for line in new_lines[j1:j2])
+    return diff
+
+
+# Content-addressed parse cache: (path, mtime_ns, size) -> sha256 of the
+# source, and sha256 -> parsed module. Touching a file without changing it,
+# or several files with identical content, reuse the same parse.
+AST_CACHE_SIZE = 128
+_source_digests: "OrderedDict[Tuple[str, int, int], str]" = OrderedDict()
+_parsed_sources: "OrderedDict[str, Tuple[ast.Module, List[str]]]" = OrderedDict()
+_parse_cache_lock = threading.Lock()
+
+
+def _bounded_put(cache: OrderedDict, key: Any, value: Any, maxsize: int):
+    cache[key] = value
+    cache.move_to_end(key)
+    if len(cache) > maxsize:
+        cache.popitem(last=False)
+
+
+def _parse_python_source(file_path: str) -> Tuple[ast.Module, List[str]]:
+    """Parse a Python file, reusing earlier parses of identical content"""
+    st = os.stat(file_path)
+    stat_key = (file_path, st.st_mtime_ns, st.st_size)
+
+    with _parse_cache_lock:
+        digest = _source_digests.get(stat_key)
+        if digest is not None and digest in _parsed_sources:
+            _parsed_sources.move_to_end(digest)
+            return _parsed_sources[digest]
+
+    with open(file_path, 'r') as f:
+        content = f.read()
+    digest = hashlib.sha256(content.encode('utf-8', 'surrogatepass')).hexdigest()
+
+    with _parse_cache_lock:
+        _bounded_put(_source_digests, stat_key, digest, AST_CACHE_SIZE * 2)
+        parsed = _parsed_sources.get(digest)
+        if parsed is not None:
+            _parsed_sources.move_to_end(digest)
+            return parsed
+
+    parsed = (ast.parse(content), content.split('\n'))
+    with _parse_cache_lock:
+        _bounded_put(_parsed_sources, digest, parsed, AST_CACHE_SIZE)
+    return parsed
+
+
+@lru_cache(maxsize=256)
+def _compile_fuzzy_pattern(pattern: str) -> re.Pattern:
+    """Compile (and memoize) a fuzzy patch search pattern"""
+    return re.compile(pattern, re.MULTILINE | re.DOTALL)
+
 
 @dataclass
 class EditOperation:
@@ -37,30 +153,41 @@ class AtomicEditEngine:
 
     def apply_edits(self, operations: List[EditOperation]) -> EditResult:
         """Apply a list of edit operations atomically"""
+        # Per-batch buffer cache: each file is read once, mutated in memory
+        # and written once after every operation has succeeded.
+        cache: Dict[str, List[str]] = {}
+        dirty: Set[str] = set()
+
         try:
             # Validate all operations first
             for op in operations:
-                if not self._validate_operation(op):
+                if not self._validate_operation(op, cache):
                     return EditResult(
                         success=False,
                         operations=[],
                         error_message=f"Invalid operation: {op.description}"
                     )
 
+            # Shallow snapshot of the untouched buffers, used to restore any
+            # file already replaced if a later write in the flush fails
+            originals = {path: list(lines) for path, lines in cache.items()}
+
             # Apply all operations
             applied_ops = []
             for op in operations:
-                if self._apply_single_operation(op):
+                if self._apply_single_operation(op, cache, dirty):
                     applied_ops.append(op)
                 else:
-                    # Rollback on failure
-                    self._rollback_operations(applied_ops)
+                    # Nothing has been flushed yet, so dropping the buffers
+                    # is a complete rollback
                     return EditResult(
                         success=False,
                         operations=applied_ops,
                         error_message=f"Failed to apply operation: {op.description}"
                     )
 
+            self._flush_buffers(cache, dirty, originals)
+
             # Generate diff
             diff = self._generate_diff(applied_ops)
 
@@ -81,16 +208,115 @@ class AtomicEditEngine:
                 error_message=f"Edit failed: {str(e)}"
             )
 
-    def _validate_operation(self, operation: EditOperation) -> bool:
+    def _load_lines(self, file_path: str, cache: Dict[str, List[str]]) -> List[str]:
+        """Return the buffered lines for a file, reading it on first use"""
+        lines = cache.get(file_path)
+        if lines is None:
+            with open(file_path, 'r') as f:
+                lines = f.readlines()
+            cache[file_path] = lines
+        return lines
+
+    def _flush_buffers(self, cache: Dict[str, List[str]], dirty: Set[str],
+                       originals: Optional[Dict[str, List[str]]] = None):
+        """Write every modified buffer back to disk
+
+        Each file is written to a sibling tempfile and swapped in with
+        os.replace, so a crash never leaves a half-written file. Batches
+        touching several files are written concurrently. If any write fails
+        and `originals` is given, files already replaced are restored before
+        the error is re-raised. Directory entries are fsynced once per
+        directory after all renames.
+        """
+        paths = list(dirty)
+        errors: Dict[str, BaseException] = {}
+
+        if len(paths) > 1:
+            with ThreadPoolExecutor(max_workers=min(MAX_FLUSH_WORKERS, len(paths))) as executor:
+                futures = {
+                    path: executor.submit(self._replace_file, path, ''.join(cache[path]))
+                    for path in paths
+                }
+            errors = {path: f.exception() for path, f in futures.items() if f.exception()}
+        else:
+            for path in paths:
+                # Collect any failure, as the thread pool path does
+                try:
+                    self._replace_file(path, ''.join(cache[path]))
+                except Exception as e:
+                    errors[path] = e
+
+        if errors:
+            if originals is not None:
+                for path in paths:
+                    if path not in errors and path in originals:
+                        self._replace_file(path, ''.join(originals[path]))
+            raise next(iter(errors.values()))
+
+        for directory in {os.path.dirname(os.path.abspath(path)) for path in paths}:
+            self._fsync_directory(directory)
+
+    @staticmethod
+    def _replace_file(file_path: str, content: str):
+        """Atomically and durably replace a file's content, keeping its permissions"""
+        with _open_file_slots:
+            # A unique temp file per call, so concurrent edits of one file
+            # never write through (or clean up) each other's temp file
+            fd, tmp_path = tempfile.mkstemp(
+                prefix=f"{os.path.basename(file_path)}.",
+                suffix='.tmp',
+                dir=os.path.dirname(os.path.abspath(file_path)),
+            )
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    f.write(content)
+                    f.flush()
+                    os.fsync(f.fileno())
+                shutil.copymode(file_path, tmp_path)
+                os.replace(tmp_path, file_path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+                raise
+
+    @staticmethod
+    def _fsync_directory(directory: str):
+        """Persist renames in a directory (no-op where unsupported)"""
+        if not hasattr(os, 'O_DIRECTORY'):
+            return
+        try:
+            fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        except OSError:
+            return
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+    @staticmethod
+    def _content_lines(content: str, terminate: bool = True) -> List[str]:
+        """Split operation content into buffer lines (keepends)
+
+        Empty content is a single blank line. The last line only gets a
+        newline appended when `terminate` is set, i.e. unless it replaces
+        the unterminated final line of a file.
+        """
+        new_lines = content.splitlines(keepends=True) or ['']
+        if terminate and not new_lines[-1].endswith('\n'):
+            new_lines[-1] += '\n'
+        return new_lines
+
+    def _validate_operation(self, operation: EditOperation,
+                            cache: Optional[Dict[str, List[str]]] = None) -> bool:
         """Validate an edit operation"""
-        if not Path(operation.file_path).exists():
-            return False
+        if cache is None:
+            cache = {}
 
         # Check line numbers are valid
         try:
-            with open(operation.file_path, 'r') as f:
-                lines = f.readlines()
-                total_lines = len(lines)
+            total_lines = len(self._load_lines(operation.file_path, cache))
 
             if operation.start_line < 1 or operation.start_line > total_lines + 1:
                 return False
@@ -103,25 +329,39 @@ class AtomicEditEngine:
 
         return True
 
-    def _apply_single_operation(self, operation: EditOperation) -> bool:
-        """Apply a single edit operation"""
+    def _apply_single_operation(self, operation: EditOperation,
+                                cache: Optional[Dict[str, List[str]]] = None,
+                                dirty: Optional[Set[str]] = None) -> bool:
+        """Apply a single edit operation
+
+        When a buffer cache is given the edit is only applied in memory and
+        the file is marked dirty; otherwise it is written through immediately.
+        """
+        write_through = cache is None
+        if write_through:
+            cache, dirty = {}, set()
+
         try:
-            with open(operation.file_path, 'r') as f:
-                lines = f.readlines()
+            lines = self._load_lines(operation.file_path, cache)
 
+            start = operation.start_line - 1
             if operation.operation_type == 'insert':
                 # Insert new content at start_line
-                lines.insert(operation.start_line - 1, operation.new_content + '\n')
+                lines[start:start] = self._content_lines(operation.new_content)
             elif operation.operation_type == 'replace':
-                # Replace lines from start_line to end_line
-                new_lines = operation.new_content.split('\n')
-                lines[operation.start_line - 1:operation.end_line] = [line + '\n' for line in new_lines]
+                # Replace lines from start_line to end_line; only leave the
+                # last line unterminated if it replaces an unterminated EOF line
+                end = operation.end_line
+                terminate = end < len(lines) or (end > start and lines[end - 1].endswith('\n'))
+                lines[start:end] = self._content_lines(operation.new_content, terminate)
             elif operation.operation_type == 'delete':
                 # Delete lines from start_line to end_line
                 del lines[operation.start_line - 1:operation.end_line]
 
-            with open(operation.file_path, 'w') as f:
-                f.writelines(lines)
+            dirty.add(operation.file_path)
+
+            if write_through:
+                self._flush_buffers(cache, dirty)
 
             return True
 
@@ -138,7 +378,7 @@ class AtomicEditEngine:
                     operation_type='delete',
                     file_path=op.file_path,
                     start_line=op.start_line,
-                    end_line=op.start_line,
+                    end_line=op.start_line + len(self._content_lines(op.new_content)) - 1,
                     old_content='',
                     new_content='',
                     description=f"Rollback insert: {op.description}"
@@ -148,7 +388,7 @@ class AtomicEditEngine:
                     operation_type='replace',
                     file_path=op.file_path,
                     start_line=op.start_line,
-                    end_line=op.start_line + len(op.new_content.split('\n')) - 1,
+                    end_line=op.start_line + len(self._content_lines(op.new_content)) - 1,
                     old_content=op.new_content,
                     new_content=op.old_content,
                     description=f"Rollback replace: {op.description}"
@@ -164,8 +404,11 @@ class AtomicEditEngine:
                     description=f"Rollback delete: {op.description}"
                 ))
 
+        cache: Dict[str, List[str]] = {}
+        dirty: Set[str] = set()
         for op in reversed_ops:
-            self._apply_single_operation(op)
+            self._apply_single_operation(op, cache, dirty)
+        self._flush_buffers(cache, dirty)
 
     def undo_last_operation(self) -> bool:
         """Undo the last operation"""
@@ -183,8 +426,11 @@ class AtomicEditEngine:
             return False
 
         operations = self.redo_stack.pop()
+        cache: Dict[str, List[str]] = {}
+        dirty: Set[str] = set()
         for op in operations:
-            self._apply_single_operation(op)
+            self._apply_single_operation(op, cache, dirty)
+        self._flush_buffers(cache, dirty)
         self.undo_stack.append(operations)
         return True
 
@@ -192,39 +438,96 @@ class AtomicEditEngine:
         """Generate a unified diff for the operations"""
         diffs = []
 
+        # The diff is built purely from the operation payloads, so the
+        # target files never need to be re-read here
         for op in operations:
-            try:
-                with open(op.file_path, 'r') as f:
-                    current_content = f.read()
-
-                # Create diff
-                diff = list(difflib.unified_diff(
-                    op.old_content.splitlines(keepends=True),
-                    op.new_content.splitlines(keepends=True),
-                    fromfile=f"a/{op.file_path}",
-                    tofile=f"b/{op.file_path}",
-                    lineterm=""
-                ))
+            old_lines = op.old_content.splitlines(keepends=True)
+            new_lines = op.new_content.splitlines(keepends=True)
 
-                if diff:
-                    diffs.extend(diff)
-                    diffs.append("")  # Add blank line between files
+            diff = None
+            if max(len(old_lines), len(new_lines)) > GIT_DIFF_THRESHOLD_LINES:
+                diff = self._git_unified_diff(op)
 
-            except (IOError, OSError):
-                continue
+            if diff is None:
+                diff = _unified_diff(old_lines, new_lines, f"a/{op.file_path}", f"b/{op.file_path}")
+
+            if diff:
+                diffs.extend(diff)
+                diffs.append("")  # Add blank line between files
 
         return '\n'.join(diffs)
 
+    def _git_unified_diff(self, operation: EditOperation) -> Optional[List[str]]:
+        """Diff very large payloads with git; returns None if git is unavailable"""
+        try:
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                old_path = os.path.join(tmp_dir, "old")
+                new_path = os.path.join(tmp_dir, "new")
+                with open(old_path, 'w') as f:
+                    f.write(operation.old_content)
+                with open(new_path, 'w') as f:
+                    f.write(operation.new_content)
+
+                result = subprocess.run(
+                    ["git", "diff", "--no-index", "--no-color", "--", old_path, new_path],
+                    capture_output=True,
+                    text=True
+                )
+        except (IOError, OSError):
+            return None
+
+        # git exits with 1 when the inputs differ
+        if result.returncode not in (0, 1):
+            return None
+        if not result.stdout:
+            return []
+
+        # Replace git's tempfile headers with the real path, keeping the same
+        # line shape as difflib.unified_diff(lineterm="")
+        diff = [f"--- a/{operation.file_path}", f"+++ b/{operation.file_path}"]
+        body = result.stdout.splitlines(keepends=True)
+        start = next((i + 1 for i, line in enumerate(body) if line.startswith('+++ ')), len(body))
+        for line in body[start:]:
+            diff.append(line.rstrip('\n') if line.startswith('@@') else line)
+        return diff
+
     def create_ast_guided_edit(self, file_path: str, target_symbol: str,
                               new_content: str, language: str = 'python') -> Optional[EditOperation]:
-        """Create an AST-guided edit operation"""
+        """Create an AST-guided edit operation
+
+        Python sources are resolved through the `ast` module, so the edit
+        spans the whole definition (lineno..end_lineno). Other languages,
+        and Python files that fail to parse, fall back to a line scan for
+        the definition line.
+        """
         try:
+            if language == 'python':
+                try:
+                    tree, lines = _parse_python_source(file_path)
+                except SyntaxError:
+                    tree = None
+
+                if tree is not None:
+                    for node in ast.walk(tree):
+                        if (isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef))
+                                and node.name == target_symbol):
+                            return EditOperation(
+                                operation_type='replace',
+                                file_path=file_path,
+                                start_line=node.lineno,
+                                end_line=node.end_lineno,
+                                old_content='\n'.join(lines[node.lineno - 1:node.end_lineno]),
+                                new_content=new_content,
+                                description=f"AST-guided edit of {target_symbol}"
+                            )
+                    return None
+
             with open(file_path, 'r') as f:
                 content = f.read()
 
             lines = content.split('\n')
 
-            # Find the target symbol (simplified - would use actual AST parsing)
+            # Find the target symbol by scanning for its definition line
             for i, line in enumerate(lines):
                 if target_symbol in line and ('def ' in line or 'class ' in line):
                     # Found the symbol, create replace operation
@@ -251,14 +554,14 @@ class AtomicEditEngine:
                 content = f.read()
 
             # Find the pattern
-            match = re.search(search_pattern, content, re.MULTILINE | re.DOTALL)
+            match = _compile_fuzzy_pattern(search_pattern).search(content)
             if match:
                 start_pos = match.start()
                 end_pos = match.end()
 
-                # Convert positions to line numbers
-                lines_before = content[:start_pos].count('\n') + 1
-                lines_in_match = content[start_pos:end_pos].count('\n') + 1
+                # Convert positions to line numbers without copying slices
+                lines_before = content.count('\n', 0, start_pos) + 1
+                lines_in_match = content.count('\n', start_pos, end_pos) + 1
 
                 return EditOperation(
                     operation_type='replace',
@@ -1,24 +1,111 @@
 from __future__ import annotations
 
+import asyncio
+import os
 import time
 import psutil
 import threading
-from typing import Dict, Any, List
+from collections import deque
+from itertools import islice
+from typing import Callable, Deque, Dict, Any, List, Optional, Tuple
 from datetime import datetime, timedelta
 from .memory_store import MemoryStore
 from .permissions import permission_manager
 from .providers import provider_manager
 
 
+def _read_proc_cpu_times() -> Tuple[int, int]:
+    """(total, idle) jiffies from the aggregate line of /proc/stat"""
+    with open('/proc/stat', 'rb') as f:
+        values = [int(v) for v in f.readline().split()[1:]]
+    # user nice system idle iowait irq softirq steal; guest time is already
+    # counted in user/nice
+    total = sum(values[:8])
+    idle = values[3] + (values[4] if len(values) > 4 else 0)
+    return total, idle
+
+
+def _read_proc_meminfo() -> Tuple[int, int]:
+    """(MemTotal, MemAvailable) in bytes from /proc/meminfo"""
+    total = available = None
+    with open('/proc/meminfo', 'rb') as f:
+        for line in f:
+            if line.startswith(b'MemTotal:'):
+                total = int(line.split()[1]) * 1024
+            elif line.startswith(b'MemAvailable:'):
+                available = int(line.split()[1]) * 1024
+            if total is not None and available is not None:
+                return total, available
+    raise OSError("MemTotal/MemAvailable missing from /proc/meminfo")
+
+
+def _disk_usage_percent(path: str) -> float:
+    """Disk usage the way psutil reports it (relative to non-root space)"""
+    st = os.statvfs(path)
+    used = (st.f_blocks - st.f_bfree) * st.f_frsize
+    available = st.f_bavail * st.f_frsize
+    total_user = used + available
+    return round(used / total_user * 100, 1) if total_user else 0.0
+
+
 class HealthMonitor:
     """Monitor system health and performance metrics"""
 
-    def __init__(self):
+    RETENTION_HOURS = 24
+    MAX_ALERTS = 1024
+    REPORT_WINDOW_SECONDS = 3600
+
+    def __init__(self, collect_network_connections: bool = False):
+        self._retention_seconds = self.RETENTION_HOURS * 3600
         self.memory_store = MemoryStore()
-        self.metrics_history: List[Dict[str, Any]] = []
-        self.alerts: List[Dict[str, Any]] = []
+        # Ring buffers: appends are O(1) and the oldest samples fall off the
+        # left once the retention window (sized for the default interval) is full
+        self.metrics_history: Deque[Dict[str, Any]] = deque(maxlen=self._history_size(60))
+        self.alerts: Deque[Dict[str, Any]] = deque(maxlen=self.MAX_ALERTS)
+        # The monitor task appends and evicts on the event loop while sync
+        # endpoints read from threadpool threads; a deque can't be iterated
+        # while it changes, so every access to these buffers holds this lock
+        self._history_lock = threading.Lock()
         self.monitoring = False
-        self.monitor_thread = None
+        self.monitor_task: Optional[asyncio.Task] = None
+        self.interval_seconds = 60
+        # Created when monitoring starts, on the event loop that runs it
+        self._stop_event: Optional[asyncio.Event] = None
+        self._alert_event: Optional[asyncio.Event] = None
+
+        # (ts, memory_percent, cpu_percent) for the report window, with
+        # running sums so averages are O(1) to read; guarded by _history_lock
+        self._report_window: Deque[tuple] = deque()
+        self._report_memory_sum = 0.0
+        self._report_cpu_sum = 0.0
+
+        # Stats snapshots keyed by name -> (monotonic second, value), so one
+        # collection or status request builds each stats dict only once
+        self._snapshots: Dict[str, Tuple[int, Any]] = {}
+
+        # Latest collected sample, shared by the monitor loop and
+        # get_health_status so status requests don't re-sample the system
+        self._latest: Optional[Dict[str, Any]] = None
+        self._latest_lock = threading.Lock()
+
+        # psutil.net_connections() walks every socket table; only opt in
+        # when the count is actually needed
+        self.collect_network_connections = collect_network_connections
+
+        # On Linux, sample /proc directly; elsewhere go through psutil. Either
+        # way prime the CPU counters so each sample reports utilisation since
+        # the previous one without blocking. Samples come from the monitor's
+        # executor and from request threads, so the counters swap under a lock
+        self._cpu_lock = threading.Lock()
+        try:
+            self._prev_cpu_times: Optional[Tuple[int, int]] = _read_proc_cpu_times()
+            _read_proc_meminfo()
+            self._use_procfs = hasattr(os, 'statvfs')
+        except (OSError, ValueError, IndexError):
+            self._prev_cpu_times = None
+            self._use_procfs = False
+        if not self._use_procfs:
+            psutil.cpu_percent(interval=None)
 
         # Health thresholds
         self.thresholds = {
@@ -29,62 +116,140 @@ class HealthMonitor:
             "db_size_mb": 100.0
         }
 
-    def start_monitoring(self, interval_seconds: int = 60):
-        """Start background health monitoring"""
+    async def start_monitoring(self, interval_seconds: int = 60):
+        """Start background health monitoring as a task on the running loop"""
         if self.monitoring:
             return
 
+        with self._history_lock:
+            if self.metrics_history.maxlen != self._history_size(interval_seconds):
+                self.metrics_history = deque(self.metrics_history, maxlen=self._history_size(interval_seconds))
+
+        self.interval_seconds = interval_seconds
         self.monitoring = True
-        self.monitor_thread = threading.Thread(
-            target=self._monitor_loop,
-            args=(interval_seconds,),
-            daemon=True
-        )
-        self.monitor_thread.start()
-
-    def stop_monitoring(self):
-        """Stop health monitoring"""
+        self._stop_event = asyncio.Event()
+        self._alert_event = asyncio.Event()
+        self.monitor_task = asyncio.create_task(self._monitor_loop(interval_seconds))
+
+    def _history_size(self, interval_seconds: int) -> int:
+        """Number of samples that fit in the retention window"""
+        return max(1, self.RETENTION_HOURS * 3600 // max(1, interval_seconds))
+
+    @staticmethod
+    def _evict_older_than(buffer: Deque[Dict[str, Any]], cutoff: float):
+        """Drop entries older than cutoff from the left of a time-ordered buffer"""
+        while buffer and buffer[0]["ts"] <= cutoff:
+            buffer.popleft()
+
+    @staticmethod
+    def _iso(ts: float) -> str:
+        """Format an internal epoch timestamp for API responses"""
+        return datetime.fromtimestamp(ts).isoformat()
+
+    def _with_iso_timestamp(self, entry: Dict[str, Any]) -> Dict[str, Any]:
+        """Copy of an internal entry with its float ts rendered as ISO"""
+        public = {k: v for k, v in entry.items() if k != "ts"}
+        public["timestamp"] = self._iso(entry["ts"])
+        return public
+
+    async def stop_monitoring(self):
+        """Stop health monitoring and wait for the loop to exit"""
         self.monitoring = False
-        if self.monitor_thread:
-            self.monitor_thread.join(timeout=5)
+        if self._stop_event is not None:
+            self._stop_event.set()
+        if self.monitor_task is not None:
+            await self.monitor_task
+            self.monitor_task = None
+
+    async def wait_for_alert(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Wait for the monitor loop to raise an alert; None on timeout"""
+        if self._alert_event is None:
+            return None
+
+        self._alert_event.clear()
+        try:
+            await asyncio.wait_for(self._alert_event.wait(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        return self._with_iso_timestamp(self.alerts[-1])
 
     def get_health_status(self) -> Dict[str, Any]:
         """Get current health status"""
+        latest = self._latest_metrics()
         return {
             "status": self._calculate_overall_health(),
             "timestamp": datetime.now().isoformat(),
-            "system": self._get_system_metrics(),
-            "application": self._get_application_metrics(),
+            "system": latest["system"],
+            "application": latest["application"],
             "alerts": self._get_recent_alerts(5),
             "uptime": self._get_uptime()
         }
 
-    def _monitor_loop(self, interval: int):
+    def _latest_metrics(self) -> Dict[str, Any]:
+        """Latest sample, re-collected only if older than one monitor interval"""
+        with self._latest_lock:
+            latest = self._latest
+            if latest is None or time.time() - latest["ts"] >= self.interval_seconds:
+                latest = self._collect_metrics()
+                self._latest = latest
+            return latest
+
+    async def _monitor_loop(self, interval: int):
         """Background monitoring loop"""
-        while self.monitoring:
+        loop = asyncio.get_running_loop()
+        while not self._stop_event.is_set():
             try:
-                metrics = self._collect_metrics()
-                self.metrics_history.append(metrics)
-
-                # Keep only last 24 hours of metrics
-                cutoff = datetime.now() - timedelta(hours=24)
-                self.metrics_history = [
-                    m for m in self.metrics_history
-                    if datetime.fromisoformat(m["timestamp"]) > cutoff
-                ]
+                # psutil and sqlite calls block, so collect off the loop
+                metrics = await loop.run_in_executor(None, self._collect_metrics)
+                self._record_sample(metrics)
 
                 # Check for alerts
                 self._check_alerts(metrics)
-
-                time.sleep(interval)
             except Exception as e:
                 print(f"Health monitoring error: {e}")
-                time.sleep(interval)
+
+            # Sleep until the next tick, waking immediately on stop
+            try:
+                await asyncio.wait_for(self._stop_event.wait(), interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def _record_sample(self, metrics: Dict[str, Any]):
+        """Add a collected sample to the history and report window"""
+        system = metrics["system"]
+        with self._history_lock:
+            self.metrics_history.append(metrics)
+            # Keep only last 24 hours of metrics
+            self._evict_older_than(self.metrics_history, metrics["ts"] - self._retention_seconds)
+
+            self._report_window.append((metrics["ts"], system["memory_percent"], system["cpu_percent"]))
+            self._report_memory_sum += system["memory_percent"]
+            self._report_cpu_sum += system["cpu_percent"]
+            self._evict_report_window(metrics["ts"])
+        with self._latest_lock:
+            self._latest = metrics
+
+    def _evict_report_window(self, now: float):
+        """Drop samples that left the report window and adjust the sums
+
+        Callers hold _history_lock, so a pop and its subtraction happen together.
+        """
+        cutoff = now - self.REPORT_WINDOW_SECONDS
+        window = self._report_window
+        while window and window[0][0] <= cutoff:
+            _, memory, cpu = window.popleft()
+            self._report_memory_sum -= memory
+            self._report_cpu_sum -= cpu
+
+        if not window:
+            # Reset so floating point drift can't accumulate across gaps
+            self._report_memory_sum = 0.0
+            self._report_cpu_sum = 0.0
 
     def _collect_metrics(self) -> Dict[str, Any]:
         """Collect comprehensive system and application metrics"""
         return {
-            "timestamp": datetime.now().isoformat(),
+            "ts": time.time(),
             "system": self._get_system_metrics(),
             "application": self._get_application_metrics(),
             "database": self._get_database_metrics()
@@ -92,49 +257,86 @@ class HealthMonitor:
 
     def _get_system_metrics(self) -> Dict[str, Any]:
         """Get system-level metrics"""
-        return {
-            "cpu_percent": psutil.cpu_percent(interval=1),
-            "memory_percent": psutil.virtual_memory().percent,
-            "memory_used_mb": psutil.virtual_memory().used / 1024 / 1024,
-            "memory_available_mb": psutil.virtual_memory().available / 1024 / 1024,
-            "disk_usage_percent": psutil.disk_usage('/').percent,
-            "network_connections": len(psutil.net_connections())
-        }
+        if self._use_procfs:
+            mem_total, mem_available = _read_proc_meminfo()
+            mem_used = mem_total - mem_available
+            metrics = {
+                "cpu_percent": self._proc_cpu_percent(),
+                "memory_percent": round(mem_used / mem_total * 100, 1) if mem_total else 0.0,
+                "memory_used_mb": mem_used / 1024 / 1024,
+                "memory_available_mb": mem_available / 1024 / 1024,
+                "disk_usage_percent": _disk_usage_percent('/')
+            }
+        else:
+            vm = psutil.virtual_memory()
+            metrics = {
+                "cpu_percent": psutil.cpu_percent(interval=None),
+                "memory_percent": vm.percent,
+                "memory_used_mb": vm.used / 1024 / 1024,
+                "memory_available_mb": vm.available / 1024 / 1024,
+                "disk_usage_percent": psutil.disk_usage('/').percent
+            }
+
+        if self.collect_network_connections:
+            metrics["network_connections"] = len(psutil.net_connections())
+
+        return metrics
+
+    def _snapshot(self, name: str, getter: Callable[[], Any]) -> Any:
+        """Value of getter(), shared by all callers within the same second"""
+        bucket = int(time.monotonic())
+        cached = self._snapshots.get(name)
+        if cached is not None and cached[0] == bucket:
+            return cached[1]
+
+        value = getter()
+        self._snapshots[name] = (bucket, value)
+        return value
+
+    def _proc_cpu_percent(self) -> float:
+        """CPU utilisation since the previous sample, from /proc/stat deltas"""
+        with self._cpu_lock:
+            total, idle = _read_proc_cpu_times()
+            prev_total, prev_idle = self._prev_cpu_times
+            self._prev_cpu_times = (total, idle)
+
+        delta_total = total - prev_total
+        if delta_total <= 0:
+            return 0.0
+        return round(100.0 * (1 - (idle - prev_idle) / delta_total), 1)
 
     def _get_application_metrics(self) -> Dict[str, Any]:
         """Get application-specific metrics"""
-        provider_stats = provider_manager.get_usage_stats()
-        permission_stats = permission_manager.get_permission_stats()
+        provider_stats = self._snapshot("providers", provider_manager.get_usage_stats)
+        permission_stats = self._snapshot("permissions", permission_manager.get_permission_stats)
 
         return {
             "providers": provider_stats,
             "permissions": permission_stats,
-            "memory_store": self.memory_store.get_stats()
+            "memory_store": self._snapshot("memory_store", self.memory_store.get_stats)
         }
 
     def _get_database_metrics(self) -> Dict[str, Any]:
         """Get database-specific metrics"""
         try:
-            import os
-            db_path = self.memory_store.db_path
-            if os.path.exists(db_path):
-                db_size = os.path.getsize(db_path) / 1024 / 1024  # MB
-            else:
+            try:
+                db_size = os.stat(self.memory_store.db_path).st_size / 1024 / 1024  # MB
+            except FileNotFoundError:
                 db_size = 0
 
             return {
                 "size_mb": db_size,
-                "tables": self.memory_store.get_stats()
+                "tables": self._snapshot("memory_store", self.memory_store.get_stats)
             }
         except Exception:
             return {"error": "Could not collect database metrics"}
 
     def _calculate_overall_health(self) -> str:
         """Calculate overall system health"""
-        if not self.metrics_history:
-            return "unknown"
-
-        latest = self.metrics_history[-1]
+        with self._history_lock:
+            if not self.metrics_history:
+                return "unknown"
+            latest = self.metrics_history[-1]
         system = latest.get("system", {})
 
         # Critical thresholds
@@ -181,26 +383,28 @@ class HealthMonitor:
 
     def _create_alert(self, alert_type: str, message: str, severity: str):
         """Create a new alert"""
+        now = time.time()
         alert = {
-            "id": f"{alert_type}_{int(time.time())}",
+            "id": f"{alert_type}_{int(now)}",
             "type": alert_type,
             "message": message,
             "severity": severity,
-            "timestamp": datetime.now().isoformat()
+            "ts": now
         }
 
-        self.alerts.append(alert)
+        with self._history_lock:
+            self.alerts.append(alert)
+            # Keep only recent alerts
+            self._evict_older_than(self.alerts, now - self._retention_seconds)
 
-        # Keep only recent alerts
-        cutoff = datetime.now() - timedelta(hours=24)
-        self.alerts = [
-            a for a in self.alerts
-            if datetime.fromisoformat(a["timestamp"]) > cutoff
-        ]
+        if self._alert_event is not None:
+            self._alert_event.set()
 
     def _get_recent_alerts(self, count: int) -> List[Dict[str, Any]]:
         """Get recent alerts"""
-        return self.alerts[-count:] if self.alerts else []
+        with self._history_lock:
+            recent = list(islice(self.alerts, max(0, len(self.alerts) - count), None))
+        return [self._with_iso_timestamp(a) for a in recent]
 
     def _get_uptime(self) -> str:
         """Get system uptime (simplified)"""
@@ -214,14 +418,28 @@ class HealthMonitor:
 
     def get_metrics_history(self, hours: int = 24) -> List[Dict[str, Any]]:
         """Get historical metrics"""
-        if not self.metrics_history:
-            return []
-
-        cutoff = datetime.now() - timedelta(hours=hours)
-        return [
-            m for m in self.metrics_history
-            if datetime.fromisoformat(m["timestamp"]) > cutoff
-        ]
+        return [self._with_iso_timestamp(m) for m in self._metrics_since(hours)]
+
+    def _metrics_since(self, hours: float) -> List[Dict[str, Any]]:
+        """Raw samples from the last `hours`, oldest first"""
+        now = time.time()
+        with self._history_lock:
+            if hours * 3600 >= self._retention_seconds:
+                # The whole buffer is the answer once anything past retention
+                # (left over while monitoring was paused) has been dropped
+                self._evict_older_than(self.metrics_history, now - self._retention_seconds)
+                return list(self.metrics_history)
+
+            # History is time-ordered, so walk back from the newest sample and
+            # stop at the first one outside the window
+            cutoff = now - hours * 3600
+            recent = []
+            for m in reversed(self.metrics_history):
+                if m["ts"] <= cutoff:
+                    break
+                recent.append(m)
+        recent.reverse()
+        return recent
 
     def update_thresholds(self, new_thresholds: Dict[str, float]):
         """Update health monitoring thresholds"""
@@ -229,18 +447,22 @@ class HealthMonitor:
 
     def get_performance_report(self) -> Dict[str, Any]:
         """Generate a comprehensive performance report"""
-        if not self.metrics_history:
-            return {"error": "No metrics history available"}
+        with self._history_lock:
+            if not self.metrics_history:
+                return {"error": "No metrics history available"}
 
-        # Analyze trends
-        recent_metrics = self.get_metrics_history(1)  # Last hour
+            # Analyze trends over the last hour
+            self._evict_report_window(time.time())
+            sample_count = len(self._report_window)
+            memory_sum = self._report_memory_sum
+            cpu_sum = self._report_cpu_sum
 
-        if not recent_metrics:
+        if not sample_count:
             return {"error": "No recent metrics available"}
 
-        # Calculate averages
-        avg_memory = sum(m["system"]["memory_percent"] for m in recent_metrics) / len(recent_metrics)
-        avg_cpu = sum(m["system"]["cpu_percent"] for m in recent_metrics) / len(recent_metrics)
+        # Averages come from the running sums
+        avg_memory = memory_sum / sample_count
+        avg_cpu = cpu_sum / sample_count
 
         return {
             "period": "last_hour",
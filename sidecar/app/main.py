@@ -1,11 +1,33 @@
 from __future__ import annotations
 
+import asyncio
+from collections import OrderedDict
+from dataclasses import asdict
 from pathlib import Path
+import hashlib
+import importlib.util
 import json
-from jsonschema import validate as jsonschema_validate
+import logging
+import threading
+from typing import Optional
+from jsonschema.validators import validator_for
 from jsonschema.exceptions import ValidationError as JsonSchemaValidationError
 from fastapi import FastAPI, HTTPException
-from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter, ValidationError as PydanticValidationError
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
+
+try:  # optional accelerator for schema parsing and response serialization
+    import orjson
+    from fastapi.responses import ORJSONResponse as DefaultResponse
+
+    _json_loads = orjson.loads
+    # orjson encodes dataclasses natively, so they can skip jsonable_encoder
+    _ENCODES_DATACLASSES = True
+except ImportError:
+    DefaultResponse = JSONResponse
+    _json_loads = json.loads
+    _ENCODES_DATACLASSES = False
 
 from .models import (
     TranscodeRequest,
@@ -13,21 +35,55 @@ from .models import (
     GenerateResponse,
     GenerateOpsRequest,
     GenerateOpsResponse,
+    TaskSpec,
+    HeartbeatRequest,
+    EventRequest,
+    EnhanceTaskSpecRequest,
+    ParseConstraintsRequest,
+    GenerateWithProviderRequest,
+    ProjectProfileRequest,
+    BuildProjectGraphRequest,
+    EnrichTaskSpecRequest,
+    StoreTaskSpecRequest,
+    CheckPermissionRequest,
+    GrantElevationRequest,
+    ApplyEditsRequest,
+    CreateBranchRequest,
+    CommitBranchRequest,
 )
 from .spec import generate_spec
 from .codegen import stub_generate_code
 from .spec_generator import SpecGenerator
-from .providers import generate_with_provider, get_provider_stats
+from .providers import (
+    ProviderError,
+    close_http_client,
+    generate_with_provider,
+    get_provider_stats,
+    stream_with_provider,
+)
 from .prompts import prompt_registry
 from .project_graph import ProjectGraphBuilder
 from .rag_system import rag_enrichment
 from .permissions import permission_manager
-from .edit_engine import edit_engine
+from .edit_engine import EditOperation, edit_engine
 from .vcs_ops import vcs_ops
 from .health_monitor import health_monitor
 
 
-app = FastAPI(title="AEIOU Self-Transcoder Sidecar", version="0.1.0")
+logger = logging.getLogger(__name__)
+
+app = FastAPI(
+    title="AEIOU Self-Transcoder Sidecar",
+    version="0.1.0",
+    default_response_class=DefaultResponse,
+)
+# Metrics history, project graphs and stats can run to megabytes of JSON;
+# small bodies aren't worth the CPU
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
+
+def _has_module(name: str) -> bool:
+    return importlib.util.find_spec(name) is not None
 
 
 def _schema_path() -> Path:
@@ -38,13 +94,60 @@ def _schema_path() -> Path:
 def _load_schema() -> dict:
     schema_file = _schema_path()
     try:
-        with schema_file.open("r", encoding="utf-8") as f:
-            return json.load(f)
+        # Parse the raw bytes; both parsers decode UTF-8 themselves
+        return _json_loads(schema_file.read_bytes())
     except FileNotFoundError:
         raise RuntimeError(f"Schema not found at {schema_file}")
 
 
+def _build_validator(schema: dict):
+    # Compile once: jsonschema.validate() re-checks the schema and rebuilds
+    # a validator on every call
+    validator_cls = validator_for(schema)
+    validator_cls.check_schema(schema)
+    return validator_cls(schema)
+
+
 SCHEMA = _load_schema()
+SCHEMA_VALIDATOR = _build_validator(SCHEMA)
+
+# Parse results for unchanged files are reused across /build_project_graph calls
+GRAPH_CACHE_PATH = "graph_cache.db"
+
+# Validates a whole batch of edit operations in one pydantic-core call
+EDIT_OPERATIONS_ADAPTER = TypeAdapter(list[EditOperation])
+
+# Canonical hashes of specs that already passed validation. Agent and CI
+# loops resend the same spec, so a hit skips jsonschema entirely.
+VALIDATED_SPEC_CACHE_SIZE = 4096
+_validated_specs: "OrderedDict[bytes, bool]" = OrderedDict()
+_validated_specs_lock = threading.Lock()
+
+
+def _spec_hash(spec) -> bytes | None:
+    try:
+        canonical = json.dumps(spec, sort_keys=True, separators=(",", ":"))
+    except (TypeError, ValueError):
+        return None
+    return hashlib.blake2b(canonical.encode("utf-8"), digest_size=16).digest()
+
+
+def _validate_spec(spec) -> None:
+    """Validate a spec against the canonical schema, memoizing successes"""
+    key = _spec_hash(spec)
+    if key is not None:
+        with _validated_specs_lock:
+            if key in _validated_specs:
+                _validated_specs.move_to_end(key)
+                return
+
+    SCHEMA_VALIDATOR.validate(spec)
+
+    if key is not None:
+        with _validated_specs_lock:
+            _validated_specs[key] = True
+            if len(_validated_specs) > VALIDATED_SPEC_CACHE_SIZE:
+                _validated_specs.popitem(last=False)
 
 
 @app.get("/health")
@@ -53,22 +156,22 @@ def health() -> dict:
 
 
 @app.post("/heartbeat")
-def heartbeat(data: dict) -> dict:
-    energy = data.get("energy", 0)
-    analysis = data.get("analysis")
+def heartbeat(req: HeartbeatRequest) -> dict:
+    energy = req.energy
+    analysis = req.analysis
 
     # Process analysis data if provided
     if analysis:
         # TODO: Store analysis in database, check thresholds for alerts
-        print(f"Heartbeat analysis: {analysis}")  # Debug logging
+        logger.debug("Heartbeat analysis: %s", analysis)
 
     # Could trigger watchers based on energy thresholds
     return {"status": "ok", "energy": energy}
 
 
 @app.post("/event")
-def handle_event(data: dict) -> dict:
-    event_type = data.get("type")
+def handle_event(req: EventRequest) -> dict:
+    event_type = req.type
     # TODO: Process different event types (FILE_SAVED, USER_IDLE, etc.)
     # Could trigger watchers or update internal state
     return {"status": "ok", "event_type": event_type}
@@ -78,7 +181,7 @@ def handle_event(data: dict) -> dict:
 def transcode(req: TranscodeRequest) -> dict:
     spec = generate_spec(req)
     try:
-        jsonschema_validate(instance=spec, schema=SCHEMA)
+        _validate_spec(spec)
     except JsonSchemaValidationError as e:
         raise HTTPException(status_code=500, detail=f"Spec validation failed: {e.message}")
     return spec
@@ -88,7 +191,7 @@ def transcode(req: TranscodeRequest) -> dict:
 def generate(req: GenerateRequest) -> GenerateResponse:
     # Validate incoming spec conforms to canonical schema before generation
     try:
-        jsonschema_validate(instance=req.spec, schema=SCHEMA)
+        _validate_spec(req.spec)
     except JsonSchemaValidationError as e:
         raise HTTPException(status_code=400, detail=f"Invalid spec: {e.message}")
     code = stub_generate_code(req.spec)
@@ -97,7 +200,7 @@ def generate(req: GenerateRequest) -> GenerateResponse:
 def generate_ops(req: GenerateOpsRequest) -> GenerateOpsResponse:
     # Validate incoming spec
     try:
-        jsonschema_validate(instance=req.spec, schema=SCHEMA)
+        _validate_spec(req.spec)
     except JsonSchemaValidationError as e:
         raise HTTPException(status_code=400, detail=f"Invalid spec: {e.message}")
     # Stub: create a tests/ file with a minimal test
@@ -114,50 +217,43 @@ def generate_ops(req: GenerateOpsRequest) -> GenerateOpsResponse:
 
 spec_generator = SpecGenerator()
 @app.post("/generate_taskspec")
-def generate_taskspec(analysis_data: dict) -> dict:
+async def generate_taskspec(analysis_data: dict) -> dict:
     """Generate a TaskSpec from analysis data"""
     try:
-        taskspec = spec_generator.cluster_signals_to_taskspec(analysis_data)
+        taskspec = await asyncio.to_thread(spec_generator.cluster_signals_to_taskspec, analysis_data)
         # Validate against schema
-        jsonschema_validate(instance=taskspec.dict(), schema=SCHEMA)
+        _validate_spec(taskspec.dict())
         return taskspec.dict()
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"TaskSpec generation failed: {str(e)}")
 
 
 @app.post("/generate_clarifying_questions")
-def generate_clarifying_questions(taskspec_data: dict) -> dict:
+def generate_clarifying_questions(taskspec: TaskSpec) -> dict:
     """Generate clarifying questions for a TaskSpec"""
     try:
-        # Convert dict to TaskSpec
-        taskspec = TaskSpec(**taskspec_data)
         questions = spec_generator.generate_clarifying_questions(taskspec)
         return {"questions": questions}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Question generation failed: {str(e)}")
 @app.post("/enhance_taskspec")
-def enhance_taskspec(request: dict) -> dict:
+def enhance_taskspec(req: EnhanceTaskSpecRequest) -> dict:
     """Enhance TaskSpec with answers to clarifying questions"""
     try:
-        taskspec_data = request.get("taskspec", {})
-        answers = request.get("answers", {})
-
-        taskspec = TaskSpec(**taskspec_data)
-        enhanced = spec_generator.enhance_taskspec_with_answers(taskspec, answers)
+        enhanced = spec_generator.enhance_taskspec_with_answers(req.taskspec, req.answers)
 
         # Validate enhanced spec
-        jsonschema_validate(instance=enhanced.dict(), schema=SCHEMA)
+        _validate_spec(enhanced.dict())
         return enhanced.dict()
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"TaskSpec enhancement failed: {str(e)}")
 
 
 @app.post("/parse_constraints")
-def parse_constraints(request: dict) -> dict:
+def parse_constraints(req: ParseConstraintsRequest) -> dict:
     """Parse explicit constraints from a prompt"""
     try:
-        prompt = request.get("prompt", "")
-        parsed = spec_generator.parse_explicit_constraints(prompt)
+        parsed = spec_generator.parse_explicit_constraints(req.prompt)
         return parsed
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Constraint parsing failed: {str(e)}")
@@ -168,17 +264,14 @@ def provider_stats() -> dict:
     """Get usage statistics for all providers"""
     return get_provider_stats()
 @app.post("/generate_with_provider")
-async def generate_with_provider_endpoint(request: dict) -> dict:
+async def generate_with_provider_endpoint(req: GenerateWithProviderRequest) -> dict:
     """Generate content using the provider abstraction"""
     try:
-        prompt = request.get("prompt", "")
-        provider = request.get("provider")
-        max_tokens = request.get("max_tokens", 1000)
-
         result = await generate_with_provider(
-            prompt,
-            provider_name=provider,
-            max_tokens=max_tokens
+            req.prompt,
+            provider_name=req.provider,
+            max_tokens=req.max_tokens,
+            prefix_hash=req.prefix_hash
         )
 
         return {"result": result}
@@ -186,12 +279,24 @@ async def generate_with_provider_endpoint(request: dict) -> dict:
         raise HTTPException(status_code=500, detail=f"Generation failed: {str(e)}")
 
 
+@app.post("/generate_with_provider/stream")
+def generate_with_provider_stream(req: GenerateWithProviderRequest) -> StreamingResponse:
+    """Stream generated text as the provider produces it"""
+    try:
+        chunks = stream_with_provider(
+            req.prompt, provider_name=req.provider, max_tokens=req.max_tokens, prefix_hash=req.prefix_hash
+        )
+    except ProviderError as e:
+        raise HTTPException(status_code=500, detail=f"Generation failed: {str(e)}")
+    return StreamingResponse(chunks, media_type="text/plain")
+
+
 @app.get("/prompts")
 def list_prompts(tags: Optional[str] = None) -> dict:
     """List available prompts"""
     tag_list = [tag.strip() for tag in tags.split(",")] if tags else None
     prompts = prompt_registry.list_prompts(tag_list)
-    return {"prompts": [p.__dict__ for p in prompts]}
+    return {"prompts": [asdict(p) for p in prompts]}
 
 
 @app.get("/prompts/{prompt_id}")
@@ -200,19 +305,16 @@ def get_prompt(prompt_id: str) -> dict:
     prompt = prompt_registry.get_prompt(prompt_id)
     if not prompt:
         raise HTTPException(status_code=404, detail=f"Prompt {prompt_id} not found")
-    return prompt.__dict__
+    return asdict(prompt)
 
 
 @app.post("/project_profile")
-def set_project_profile(request: dict) -> dict:
+def set_project_profile(req: ProjectProfileRequest) -> dict:
     """Set the active profile for a project"""
-    project_path = request.get("project_path", "")
-    profile = request.get("profile", {})
-
-    if not project_path:
+    if not req.project_path:
         raise HTTPException(status_code=400, detail="project_path is required")
 
-    prompt_registry.set_project_profile(project_path, profile)
+    prompt_registry.set_project_profile(req.project_path, req.profile)
     return {"status": "ok"}
 @app.get("/project_profile")
 def get_project_profile(project_path: str) -> dict:
@@ -222,36 +324,32 @@ def get_project_profile(project_path: str) -> dict:
 
     return {
         "profile": profile,
-        "active_prompt": active_prompt.__dict__ if active_prompt else None
+        "active_prompt": asdict(active_prompt) if active_prompt else None
     }
 
 
 @app.post("/build_project_graph")
-def build_project_graph(request: dict) -> dict:
+async def build_project_graph(req: BuildProjectGraphRequest) -> dict:
     """Build project graph from source code analysis"""
-    project_root = request.get("project_root", ".")
-    builder = ProjectGraphBuilder(project_root)
-    graph = builder.build_graph()
+    builder = ProjectGraphBuilder(req.project_root, cache_path=GRAPH_CACHE_PATH)
+    if _ENCODES_DATACLASSES:
+        # Encode the graph's dataclasses straight to bytes in the worker thread
+        return await asyncio.to_thread(lambda: DefaultResponse(builder.build_graph()))
+    graph = await asyncio.to_thread(builder.build_graph)
     return graph
 
 
 @app.post("/enrich_taskspec")
-def enrich_taskspec_endpoint(request: dict) -> dict:
+async def enrich_taskspec_endpoint(req: EnrichTaskSpecRequest) -> dict:
     """Enrich TaskSpec with RAG-retrieved information"""
-    taskspec = request.get("taskspec", {})
-    project_context = request.get("project_context", "current_project")
-
-    enriched = rag_enrichment.enrich_taskspec(taskspec, project_context)
+    enriched = await asyncio.to_thread(rag_enrichment.enrich_taskspec, req.taskspec, req.project_context)
     return enriched
 
 
 @app.post("/store_successful_taskspec")
-def store_successful_taskspec(request: dict):
+async def store_successful_taskspec(req: StoreTaskSpecRequest):
     """Store a successful TaskSpec for future RAG retrieval"""
-    taskspec = request.get("taskspec", {})
-    project = request.get("project", "current_project")
-
-    rag_enrichment.store_successful_taskspec(taskspec, project)
+    await asyncio.to_thread(rag_enrichment.store_successful_taskspec, req.taskspec, req.project)
     return {"status": "stored"}
 @app.get("/rag_stats")
 def get_rag_stats() -> dict:
@@ -260,49 +358,39 @@ def get_rag_stats() -> dict:
 
 
 @app.post("/check_permission")
-def check_permission(request: dict) -> dict:
+def check_permission(req: CheckPermissionRequest) -> dict:
     """Check permission for a tool"""
-    tool_name = request.get("tool_name", "")
-    session_id = request.get("session_id")
-    reason = request.get("reason", "")
-
-    if not tool_name:
+    if not req.tool_name:
         raise HTTPException(status_code=400, detail="tool_name is required")
 
-    return permission_manager.request_permission(tool_name, reason, session_id)
+    return permission_manager.request_permission(req.tool_name, req.reason, req.session_id)
 
 
 @app.post("/grant_elevation")
-def grant_elevation(request: dict) -> dict:
+def grant_elevation(req: GrantElevationRequest) -> dict:
     """Grant temporary permission elevation"""
-    session_id = request.get("session_id", "")
-    tools = request.get("tools", [])
-    duration_minutes = request.get("duration_minutes", 30)
-    reason = request.get("reason", "")
-    granted_by = request.get("granted_by", "user")
-
-    if not session_id or not tools:
+    if not req.session_id or not req.tools:
         raise HTTPException(status_code=400, detail="session_id and tools are required")
 
-    elevation = permission_manager.grant_elevation(session_id, tools, duration_minutes, reason, granted_by)
+    elevation = permission_manager.grant_elevation(
+        req.session_id, req.tools, req.duration_minutes, req.reason, req.granted_by
+    )
     return {
         "session_id": elevation.session_id,
-        "elevated_tools": elevation.elevated_tools,
+        "elevated_tools": sorted(elevation.elevated_tools),
         "expires_at": elevation.expires_at
     }
 
 
 @app.post("/apply_edits")
-def apply_edits(request: dict) -> dict:
+async def apply_edits(req: ApplyEditsRequest) -> dict:
     """Apply atomic edit operations"""
-    operations_data = request.get("operations", [])
-
-    operations = []
-    for op_data in operations_data:
-        from .edit_engine import EditOperation
-        operations.append(EditOperation(**op_data))
+    try:
+        operations = EDIT_OPERATIONS_ADAPTER.validate_python(req.operations)
+    except PydanticValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False))
 
-    result = edit_engine.apply_edits(operations)
+    result = await asyncio.to_thread(edit_engine.apply_edits, operations)
 
     return {
         "success": result.success,
@@ -313,34 +401,30 @@ def apply_edits(request: dict) -> dict:
 
 
 @app.post("/create_ephemeral_branch")
-def create_ephemeral_branch(request: dict) -> dict:
+async def create_ephemeral_branch(req: CreateBranchRequest) -> dict:
     """Create an ephemeral branch for edits"""
-    description = request.get("description", "AEIOU ephemeral branch")
-
     try:
-        branch_name = vcs_ops.create_ephemeral_branch(description)
+        branch_name = await asyncio.to_thread(vcs_ops.create_ephemeral_branch, req.description)
         return {"branch_name": branch_name, "status": "created"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to create branch: {str(e)}")
 
 
 @app.post("/commit_ephemeral_branch")
-def commit_ephemeral_branch(request: dict) -> dict:
+async def commit_ephemeral_branch(req: CommitBranchRequest) -> dict:
     """Commit changes on ephemeral branch"""
-    branch_name = request.get("branch_name", "")
-    message = request.get("message", "AEIOU: Apply changes")
-
-    if not branch_name:
+    if not req.branch_name:
         raise HTTPException(status_code=400, detail="branch_name is required")
 
-    success = vcs_ops.commit_ephemeral_changes(branch_name, message)
+    success = await asyncio.to_thread(vcs_ops.commit_ephemeral_changes, req.branch_name, req.message)
     return {"success": success}
 
 
 @app.get("/diff_narration")
-def get_diff_narration(from_ref: str = "HEAD~1", to_ref: str = "HEAD") -> dict:
-    """Get diffs with narration"""
-    diffs = vcs_ops.get_diffs_with_narration(from_ref, to_ref)
+async def get_diff_narration(from_ref: str = "HEAD~1", to_ref: str = "HEAD", summary: bool = False) -> dict:
+    """Get diffs with narration; summary=true narrates counts only, without reading content"""
+    narrate = vcs_ops.get_diff_summary if summary else vcs_ops.get_diffs_with_narration
+    diffs = await asyncio.to_thread(narrate, from_ref, to_ref)
 
     return {
         "diffs": [{
@@ -351,6 +435,24 @@ def get_diff_narration(from_ref: str = "HEAD~1", to_ref: str = "HEAD") -> dict:
             "risk_level": d.risk_level
         } for d in diffs]
     }
+
+
+@app.get("/changed_files")
+async def get_changed_files(from_ref: str = "HEAD~1", to_ref: str = "HEAD") -> dict:
+    """Changed files with line counts and coarse narration, without fetching hunks"""
+    diffs = await asyncio.to_thread(vcs_ops.list_changed_files, from_ref, to_ref)
+
+    return {
+        "files": [{
+            "file_path": d.file_path,
+            "additions": d.additions,
+            "deletions": d.deletions,
+            "narration": d.narration,
+            "risk_level": d.risk_level
+        } for d in diffs]
+    }
+
+
 @app.get("/permission_stats")
 def get_permission_stats() -> dict:
     """Get permission system statistics"""
@@ -376,19 +478,29 @@ def get_metrics_history(hours: int = 24) -> dict:
 
 
 @app.post("/start_monitoring")
-def start_monitoring(interval: int = 60) -> dict:
+async def start_monitoring(interval: int = 60) -> dict:
     """Start health monitoring"""
-    health_monitor.start_monitoring(interval)
+    await health_monitor.start_monitoring(interval)
     return {"status": "monitoring_started", "interval_seconds": interval}
 
 
 @app.post("/stop_monitoring")
-def stop_monitoring() -> dict:
+async def stop_monitoring() -> dict:
     """Stop health monitoring"""
-    health_monitor.stop_monitoring()
+    await health_monitor.stop_monitoring()
     return {"status": "monitoring_stopped"}
 
 
+@app.on_event("shutdown")
+async def stop_monitoring_on_shutdown():
+    await health_monitor.stop_monitoring()
+
+
+@app.on_event("shutdown")
+async def close_provider_connections():
+    await close_http_client()
+
+
 
 
 
@@ -403,8 +515,21 @@ def stop_monitoring() -> dict:
 
 
 if __name__ == "__main__":
+    import os
     import uvicorn
 
-    uvicorn.run(app, host="127.0.0.1", port=8000)
+    # Undo stacks, permissions and monitor state are per-process, so extra
+    # workers are opt-in. Workers need an import string rather than the app.
+    workers = int(os.environ.get("AEIOU_SIDECAR_WORKERS", "1"))
+    uvicorn.run(
+        f"{__spec__.name}:app" if workers > 1 and __spec__ else app,
+        host="127.0.0.1",
+        port=8000,
+        loop="uvloop" if _has_module("uvloop") else "asyncio",
+        http="httptools" if _has_module("httptools") else "h11",
+        workers=workers,
+        limit_concurrency=1000,
+        timeout_keep_alive=30,
+    )
 
 
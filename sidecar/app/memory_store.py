@@ -2,23 +2,141 @@ from __future__ import annotations
 
 import sqlite3
 import json
+import re
+import threading
 import time
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Dict, List, Any, Optional
-from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Any, Optional, Tuple
 import numpy as np
 
+try:  # optional accelerator; meta/spec columns are TEXT either way
+    import orjson
+
+    def _dumps(obj: Any) -> str:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+
+    _loads = orjson.loads
+except ImportError:
+    _dumps = json.dumps
+    _loads = json.loads
+
+
+# Storage dtypes for embedding BLOBs; rows record which one they use. New
+# rows are int8, each scaled by its own largest component so the full
+# [-127, 127] range is used; the scale is stored next to the blob. int8 only
+# saves space: the index is decoded to float32 for the BLAS dot product.
+EMBEDDING_DTYPES = {'f32': np.float32, 'f16': np.float16, 'i8': np.int8}
+EMBEDDING_DTYPE = 'i8'
+INT8_MAX = 127.0
+# Rows written before per-vector scales used this fixed one
+LEGACY_INT8_SCALE = 1.0 / INT8_MAX
+
+TABLES = ('decisions', 'actions', 'embeddings', 'nodes', 'edges')
+EXPORT_TABLES = ['decisions', 'embeddings', 'nodes', 'edges']
+# Every count in one statement, so get_stats is a single round trip
+STATS_QUERY = "SELECT " + ", ".join(f"(SELECT COUNT(*) FROM {table})" for table in TABLES)
+
+# (direction, filtered by relation) -> query. Kept as separate constant
+# statements rather than one "(? IS NULL OR rel = ?)" form, which would stop
+# SQLite using the rel and created_at columns of the edge indexes.
+NEIGHBOR_QUERIES = {
+    ('out', True): "SELECT dst, rel, meta FROM edges WHERE src = ? AND rel = ? AND created_at > ?",
+    ('out', False): "SELECT dst, rel, meta FROM edges WHERE src = ? AND created_at > ?",
+    ('in', True): "SELECT src, rel, meta FROM edges WHERE dst = ? AND rel = ? AND created_at > ?",
+    ('in', False): "SELECT src, rel, meta FROM edges WHERE dst = ? AND created_at > ?",
+}
+
+
+# Terms for the decision inverted index; specs and queries share this tokenizer
+_TERM_RE = re.compile(r"\w+")
+
+
+# Rough token estimate stored with each decision, so retrieval can budget
+# without re-serializing specs
+BYTES_PER_TOKEN = 4
+
+
+def _terms(text: str) -> List[str]:
+    return list(dict.fromkeys(_TERM_RE.findall(text.lower())))
+
+
+def _encode_vector(vector: List[float]) -> Tuple[bytes, Optional[float]]:
+    """Return the stored blob and, for int8 rows, the scale that decodes it"""
+    # Normalized once here, then stored at a quarter of float32's size
+    vec = np.array(vector, dtype=np.float32)
+    norm = np.linalg.norm(vec)
+    if norm > 0:
+        vec /= norm
+    if EMBEDDING_DTYPE == 'i8':
+        peak = float(np.abs(vec).max(initial=0.0))
+        scale = peak / INT8_MAX if peak > 0 else LEGACY_INT8_SCALE
+        return np.clip(np.rint(vec / scale), -INT8_MAX, INT8_MAX).astype(np.int8).tobytes(), scale
+    return vec.astype(EMBEDDING_DTYPES[EMBEDDING_DTYPE]).tobytes(), None
+
 
 class MemoryStore:
     """Embedded SQLite stores for relational, vector, and graph data"""
 
+    # Foreign keys are declared for documentation only; all writes go through
+    # this class, so enforcement is pinned off even on builds that default it
+    # on. Shared-cache mode is deliberately not used: it swaps WAL's
+    # reader/writer concurrency for table-level locks between connections.
+    PRAGMAS = """
+        PRAGMA journal_mode=WAL;
+        PRAGMA synchronous=NORMAL;
+        PRAGMA temp_store=MEMORY;
+        PRAGMA mmap_size=268435456;
+        PRAGMA cache_size=-65536;
+        PRAGMA foreign_keys=OFF;
+    """
+
     def __init__(self, db_path: str = "aeiou_memory.db"):
         self.db_path = db_path
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        # (kind, dim) -> (normalized matrix, item ids, row ids, created_at)
+        self._vec_cache: Dict[Tuple[str, int], Tuple[np.ndarray, List[str], np.ndarray, np.ndarray]] = {}
+        self._vec_generation = 0
+        self._vec_lock = threading.Lock()
         self._init_db()
 
+    def _conn(self) -> sqlite3.Connection:
+        """Return this thread's connection, opening it on first use"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Autocommit; multi-statement work goes through _transaction()
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+            conn.executescript(self.PRAGMAS)
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._conn()
+        conn.execute("BEGIN")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def close(self):
+        """Close every connection opened by this store"""
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.execute("PRAGMA optimize")
+            conn.close()
+        self._local = threading.local()
+
     def _init_db(self):
         """Initialize database with required tables"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._transaction() as conn:
             conn.execute("""
                 CREATE TABLE IF NOT EXISTS decisions (
                     id INTEGER PRIMARY KEY,
@@ -27,10 +145,30 @@ class MemoryStore:
                     spec TEXT,
                     ttl INTEGER DEFAULT 2592000,  -- 30 days
                     pinned BOOLEAN DEFAULT 0,
-                    created_at REAL
+                    created_at INTEGER,
+                    tokens INTEGER
                 )
             """)
 
+            # Databases created before decisions carried a token estimate
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(decisions)")}
+            if 'tokens' not in columns:
+                conn.execute("ALTER TABLE decisions ADD COLUMN tokens INTEGER")
+
+            # term -> decision posting lists, written alongside each decision
+            indexed = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'decision_terms'").fetchone()
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS decision_terms (
+                    term TEXT,
+                    decision_id INTEGER,
+                    PRIMARY KEY (term, decision_id)
+                ) WITHOUT ROWID
+            """)
+            if not indexed:
+                # Databases created before the index existed
+                for decision_id, spec in conn.execute("SELECT id, spec FROM decisions").fetchall():
+                    self._index_decision(conn, decision_id, spec)
+
             conn.execute("""
                 CREATE TABLE IF NOT EXISTS actions (
                     id INTEGER PRIMARY KEY,
@@ -39,7 +177,7 @@ class MemoryStore:
                     data TEXT,
                     result TEXT,
                     success BOOLEAN,
-                    created_at REAL,
+                    created_at INTEGER,
                     FOREIGN KEY (decision_id) REFERENCES decisions(id)
                 )
             """)
@@ -53,11 +191,21 @@ class MemoryStore:
                     vec BLOB,
                     meta TEXT,
                     ttl INTEGER DEFAULT 2592000,
-                    created_at REAL,
+                    created_at INTEGER,
+                    dtype TEXT DEFAULT 'f32',
+                    scale REAL,
                     UNIQUE(item_id, kind)
                 )
             """)
 
+            # Databases created before vectors were stored as fp16
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(embeddings)")}
+            if 'dtype' not in columns:
+                conn.execute("ALTER TABLE embeddings ADD COLUMN dtype TEXT DEFAULT 'f32'")
+            # ...and before int8 rows carried their own scale
+            if 'scale' not in columns:
+                conn.execute("ALTER TABLE embeddings ADD COLUMN scale REAL")
+
             conn.execute("""
                 CREATE TABLE IF NOT EXISTS nodes (
                     id TEXT PRIMARY KEY,
@@ -65,7 +213,7 @@ class MemoryStore:
                     uri TEXT,
                     meta TEXT,
                     ttl INTEGER DEFAULT 2592000,
-                    created_at REAL
+                    created_at INTEGER
                 )
             """)
 
@@ -77,7 +225,7 @@ class MemoryStore:
                     rel TEXT,
                     meta TEXT,
                     ttl INTEGER DEFAULT 2592000,
-                    created_at REAL,
+                    created_at INTEGER,
                     FOREIGN KEY (src) REFERENCES nodes(id),
                     FOREIGN KEY (dst) REFERENCES nodes(id)
                 )
@@ -85,183 +233,303 @@ class MemoryStore:
 
             # Create indexes for better performance
             conn.execute("CREATE INDEX IF NOT EXISTS idx_decisions_ts ON decisions(ts)")
-            conn.execute("CREATE INDEX IF NOT EXISTS idx_decisions_project ON decisions(project)")
-            conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_kind ON embeddings(kind)")
-            conn.execute("CREATE INDEX IF NOT EXISTS idx_edges_src_rel ON edges(src, rel)")
-            conn.execute("CREATE INDEX IF NOT EXISTS idx_edges_dst_rel ON edges(dst, rel)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_decisions_proj_ts ON decisions(project, ts DESC)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_decisions_pinned ON decisions(project) WHERE pinned = 1")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_kind_dim_ct ON embeddings(kind, dim, created_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_edges_src_rel_ct ON edges(src, rel, created_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_edges_dst_rel_ct ON edges(dst, rel, created_at)")
+
+            # Prefixes of the composite indexes above; they only slow writes now
+            for index in ('idx_decisions_project', 'idx_embeddings_kind', 'idx_edges_src_rel', 'idx_edges_dst_rel'):
+                conn.execute(f"DROP INDEX IF EXISTS {index}")
+
+            # Give the planner statistics once; close() keeps them current via PRAGMA optimize
+            if not conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'").fetchone():
+                conn.execute("ANALYZE")
 
     # Relational operations
     def store_decision(self, project: str, spec: Dict[str, Any], ttl_seconds: int = 2592000) -> int:
         """Store a decision in the relational store"""
-        with sqlite3.connect(self.db_path) as conn:
+        now = int(time.time())
+        spec_text = _dumps(spec)
+        with self._transaction() as conn:
             cursor = conn.execute("""
-                INSERT INTO decisions (ts, project, spec, ttl, created_at)
-                VALUES (?, ?, ?, ?, ?)
+                INSERT INTO decisions (ts, project, spec, ttl, created_at, tokens)
+                VALUES (?, ?, ?, ?, ?, ?)
             """, (
-                int(time.time()),
+                now,
                 project,
-                json.dumps(spec),
+                spec_text,
                 ttl_seconds,
-                time.time()
+                now,
+                len(spec_text.encode('utf-8')) // BYTES_PER_TOKEN
             ))
-            return cursor.lastrowid
+            self._index_decision(conn, cursor.lastrowid, spec_text)
+        return cursor.lastrowid
+
+    @staticmethod
+    def _index_decision(conn: sqlite3.Connection, decision_id: int, spec_text: str):
+        conn.executemany(
+            "INSERT OR IGNORE INTO decision_terms (term, decision_id) VALUES (?, ?)",
+            ((term, decision_id) for term in _terms(spec_text))
+        )
 
     def get_decisions(self, project: str, limit: int = 50) -> List[Dict[str, Any]]:
         """Get recent decisions for a project"""
-        with sqlite3.connect(self.db_path) as conn:
-            rows = conn.execute("""
-                SELECT id, ts, spec, pinned FROM decisions
-                WHERE project = ? AND (pinned = 1 OR ts > ?)
-                ORDER BY ts DESC LIMIT ?
-            """, (project, time.time() - 2592000, limit)).fetchall()
-
-            return [{
+        conn = self._conn()
+        rows = conn.execute("""
+            SELECT id, ts, spec, pinned, tokens FROM decisions
+            WHERE project = ? AND (pinned = 1 OR ts > ?)
+            ORDER BY ts DESC LIMIT ?
+        """, (project, int(time.time()) - 2592000, limit)).fetchall()
+        return self._decision_rows(rows)
+
+    def search_decisions(self, project: str, query: str, limit: int = 50) -> List[Dict[str, Any]]:
+        """Get recent decisions for a project whose spec shares a term with the query"""
+        terms = _terms(query)
+        if not terms:
+            return []
+        conn = self._conn()
+        rows = conn.execute(f"""
+            SELECT id, ts, spec, pinned, tokens FROM decisions
+            WHERE id IN (SELECT decision_id FROM decision_terms WHERE term IN ({", ".join("?" * len(terms))}))
+            AND project = ? AND (pinned = 1 OR ts > ?)
+            ORDER BY ts DESC LIMIT ?
+        """, (*terms, project, int(time.time()) - 2592000, limit)).fetchall()
+        return self._decision_rows(rows)
+
+    @staticmethod
+    def _decision_rows(rows: List[tuple]) -> List[Dict[str, Any]]:
+        decisions = []
+        for row in rows:
+            decision = {
                 'id': row[0],
                 'timestamp': row[1],
-                'spec': json.loads(row[2]),
+                'spec': _loads(row[2]),
                 'pinned': bool(row[3])
-            } for row in rows]
+            }
+            if row[4] is not None:
+                decision['tokens'] = row[4]
+            decisions.append(decision)
+        return decisions
 
     def pin_decision(self, decision_id: int):
         """Pin a decision to prevent TTL expiration"""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute("UPDATE decisions SET pinned = 1 WHERE id = ?", (decision_id,))
+        conn = self._conn()
+        conn.execute("UPDATE decisions SET pinned = 1 WHERE id = ?", (decision_id,))
 
     def forget_decision(self, decision_id: int):
         """Mark a decision for redaction (soft delete)"""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute("UPDATE decisions SET ttl = 0 WHERE id = ?", (decision_id,))
+        conn = self._conn()
+        conn.execute("UPDATE decisions SET ttl = 0 WHERE id = ?", (decision_id,))
 
     # Vector operations
     def store_embedding(self, item_id: str, kind: str, vector: List[float], meta: Dict[str, Any] = None, ttl_seconds: int = 2592000):
-        """Store a vector embedding"""
-        vec_bytes = np.array(vector, dtype=np.float32).tobytes()
-
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute("""
-                INSERT OR REPLACE INTO embeddings (item_id, kind, dim, vec, meta, ttl, created_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (
-                item_id,
-                kind,
-                len(vector),
-                vec_bytes,
-                json.dumps(meta or {}),
-                ttl_seconds,
-                time.time()
-            ))
+        """Store a vector embedding, L2-normalized so searches are a plain dot product"""
+        self.store_embeddings_bulk([{
+            'item_id': item_id, 'kind': kind, 'vector': vector, 'meta': meta, 'ttl_seconds': ttl_seconds
+        }])
+
+    def store_embeddings_bulk(self, items: Iterable[Dict[str, Any]]):
+        """Store many embeddings in one transaction; items take store_embedding's arguments"""
+        now = int(time.time())
+        rows = [(
+            item['item_id'],
+            item['kind'],
+            len(item['vector']),
+            *_encode_vector(item['vector']),
+            _dumps(item.get('meta') or {}),
+            item.get('ttl_seconds', 2592000),
+            now,
+            EMBEDDING_DTYPE
+        ) for item in items]
+
+        with self._transaction() as conn:
+            conn.executemany("""
+                INSERT OR REPLACE INTO embeddings (item_id, kind, dim, vec, scale, meta, ttl, created_at, dtype)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, rows)
+        for kind in {row[1] for row in rows}:
+            self._invalidate_vectors(kind)
+
+    def _vector_index(self, kind: str, dim: int) -> Tuple[np.ndarray, List[str], np.ndarray, np.ndarray]:
+        """Return the L2-normalized (N, dim) matrix for a kind, building it on first use"""
+        key = (kind, dim)
+        with self._vec_lock:
+            cached = self._vec_cache.get(key)
+            generation = self._vec_generation
+        if cached is not None:
+            return cached
+
+        conn = self._conn()
+        # meta stays in SQLite; search_similar fetches it for the top_k only
+        # Rows already past retention can never match again, so skip them. The
+        # ORDER BY is answered by walking idx_embeddings_kind_dim_ct backwards
+        # (no sort step), and search_similar relies on the newest-first order.
+        rows = conn.execute("""
+            SELECT id, item_id, vec, created_at, dtype, scale FROM embeddings
+            WHERE kind = ? AND dim = ? AND created_at > ?
+            ORDER BY created_at DESC
+        """, (kind, dim, int(time.time()) - 2592000)).fetchall()
+
+        # Decode each storage dtype with a single frombuffer over the joined blobs
+        matrix = np.empty((len(rows), dim), dtype=np.float32)
+        by_dtype: Dict[str, List[int]] = {}
+        for i, row in enumerate(rows):
+            by_dtype.setdefault(row[4] or 'f32', []).append(i)
+        for dtype, positions in by_dtype.items():
+            block = np.frombuffer(b''.join(rows[i][2] for i in positions), dtype=EMBEDDING_DTYPES[dtype])
+            block = block.reshape(len(positions), dim).astype(np.float32)
+            if dtype == 'i8':
+                block *= np.array([
+                    rows[i][5] or LEGACY_INT8_SCALE for i in positions
+                ], dtype=np.float32)[:, None]
+            if dtype in ('f32', 'i8'):
+                # Legacy rows were stored raw and int8 rounding drifts off unit
+                # length; fp16 rows are already unit length
+                norms = np.linalg.norm(block, axis=1, keepdims=True)
+                norms[norms == 0] = 1.0
+                block /= norms
+            matrix[positions] = block
+
+        index = (
+            matrix,
+            [row[1] for row in rows],
+            np.array([row[0] for row in rows], dtype=np.int64),
+            np.array([row[3] for row in rows], dtype=np.int64),
+        )
+        with self._vec_lock:
+            # Don't cache a matrix that a concurrent write already made stale
+            if generation == self._vec_generation:
+                self._vec_cache[key] = index
+        return index
+
+    def _invalidate_vectors(self, kind: Optional[str] = None):
+        with self._vec_lock:
+            self._vec_generation += 1
+            if kind is None:
+                self._vec_cache.clear()
+            else:
+                for key in [k for k in self._vec_cache if k[0] == kind]:
+                    del self._vec_cache[key]
 
     def search_similar(self, query_vec: List[float], kind: str, top_k: int = 5) -> List[Dict[str, Any]]:
         """Find similar vectors using cosine similarity"""
         query = np.array(query_vec, dtype=np.float32)
         query = query / np.linalg.norm(query)
 
-        with sqlite3.connect(self.db_path) as conn:
-            rows = conn.execute("""
-                SELECT item_id, vec, meta FROM embeddings
-                WHERE kind = ? AND created_at > ?
-                ORDER BY created_at DESC
-            """, (kind, time.time() - 2592000)).fetchall()
-
-            similarities = []
-            for row in rows:
-                item_id, vec_bytes, meta = row
-                vec = np.frombuffer(vec_bytes, dtype=np.float32)
-                vec = vec / np.linalg.norm(vec)
-
-                similarity = float(np.dot(query, vec))
-                similarities.append({
-                    'item_id': item_id,
-                    'similarity': similarity,
-                    'meta': json.loads(meta)
-                })
-
-            # Sort by similarity and return top_k
-            similarities.sort(key=lambda x: x['similarity'], reverse=True)
-            return similarities[:top_k]
+        matrix, item_ids, row_ids, created_at = self._vector_index(kind, len(query))
+
+        # Rows are ordered newest first, so those still inside the retention
+        # window are a prefix: find it by bisection and score only that view
+        cutoff = int(time.time()) - 2592000
+        live = len(created_at) - int(np.searchsorted(created_at[::-1], cutoff, side='right'))
+        count = min(top_k, live)
+        if count <= 0:
+            return []
+
+        scores = matrix[:live] @ query
+
+        # Partial selection, then sort only the top_k
+        if count < live:
+            top = np.argpartition(scores, live - count)[live - count:]
+        else:
+            top = np.arange(live)
+        top = top[np.argsort(-scores[top], kind='stable')]
+
+        top_ids = [int(row_ids[i]) for i in top]
+        placeholders = ", ".join("?" * len(top_ids))
+        metas = dict(self._conn().execute(
+            f"SELECT id, meta FROM embeddings WHERE id IN ({placeholders})", top_ids
+        ).fetchall())
+
+        return [{
+            'item_id': item_ids[i],
+            'similarity': float(scores[i]),
+            'meta': _loads(metas.get(row_id, '{}'))
+        } for i, row_id in zip(top, top_ids)]
 
     # Graph operations
     def store_node(self, node_id: str, kind: str, uri: str = "", meta: Dict[str, Any] = None, ttl_seconds: int = 2592000):
         """Store a graph node"""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute("""
+        self.store_nodes_bulk([{
+            'node_id': node_id, 'kind': kind, 'uri': uri, 'meta': meta, 'ttl_seconds': ttl_seconds
+        }])
+
+    def store_nodes_bulk(self, items: Iterable[Dict[str, Any]]):
+        """Store many graph nodes in one transaction; items take store_node's arguments"""
+        now = int(time.time())
+        with self._transaction() as conn:
+            conn.executemany("""
                 INSERT OR REPLACE INTO nodes (id, kind, uri, meta, ttl, created_at)
                 VALUES (?, ?, ?, ?, ?, ?)
-            """, (
-                node_id,
-                kind,
-                uri,
-                json.dumps(meta or {}),
-                ttl_seconds,
-                time.time()
-            ))
+            """, [(
+                item['node_id'],
+                item['kind'],
+                item.get('uri', ""),
+                _dumps(item.get('meta') or {}),
+                item.get('ttl_seconds', 2592000),
+                now
+            ) for item in items])
 
     def store_edge(self, src: str, dst: str, rel: str, meta: Dict[str, Any] = None, ttl_seconds: int = 2592000):
         """Store a graph edge"""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute("""
+        self.store_edges_bulk([{
+            'src': src, 'dst': dst, 'rel': rel, 'meta': meta, 'ttl_seconds': ttl_seconds
+        }])
+
+    def store_edges_bulk(self, items: Iterable[Dict[str, Any]]):
+        """Store many graph edges in one transaction; items take store_edge's arguments"""
+        now = int(time.time())
+        with self._transaction() as conn:
+            conn.executemany("""
                 INSERT INTO edges (src, dst, rel, meta, ttl, created_at)
                 VALUES (?, ?, ?, ?, ?, ?)
-            """, (
-                src,
-                dst,
-                rel,
-                json.dumps(meta or {}),
-                ttl_seconds,
-                time.time()
-            ))
-
-    def get_node_neighbors(self, node_id: str, relation: Optional[str] = None) -> List[Dict[str, Any]]:
+            """, [(
+                item['src'],
+                item['dst'],
+                item['rel'],
+                _dumps(item.get('meta') or {}),
+                item.get('ttl_seconds', 2592000),
+                now
+            ) for item in items])
+
+    def _neighbor_rows(self, direction: str, node_id: str, relation: Optional[str], now: Optional[int]) -> List[tuple]:
+        cutoff = (int(time.time()) if now is None else now) - 2592000
+        params = (node_id, relation, cutoff) if relation else (node_id, cutoff)
+        return self._conn().execute(NEIGHBOR_QUERIES[direction, bool(relation)], params).fetchall()
+
+    def get_node_neighbors(self, node_id: str, relation: Optional[str] = None, now: Optional[int] = None) -> List[Dict[str, Any]]:
         """Get neighbors of a node"""
-        with sqlite3.connect(self.db_path) as conn:
-            if relation:
-                rows = conn.execute("""
-                    SELECT dst, rel, meta FROM edges
-                    WHERE src = ? AND rel = ? AND created_at > ?
-                """, (node_id, relation, time.time() - 2592000)).fetchall()
-            else:
-                rows = conn.execute("""
-                    SELECT dst, rel, meta FROM edges
-                    WHERE src = ? AND created_at > ?
-                """, (node_id, time.time() - 2592000)).fetchall()
-
-            return [{
-                'target': row[0],
-                'relation': row[1],
-                'meta': json.loads(row[2])
-            } for row in rows]
-
-    def get_reverse_neighbors(self, node_id: str, relation: Optional[str] = None) -> List[Dict[str, Any]]:
-        """Get nodes that point to this node"""
-        with sqlite3.connect(self.db_path) as conn:
-            if relation:
-                rows = conn.execute("""
-                    SELECT src, rel, meta FROM edges
-                    WHERE dst = ? AND rel = ? AND created_at > ?
-                """, (node_id, relation, time.time() - 2592000)).fetchall()
-            else:
-                rows = conn.execute("""
-                    SELECT src, rel, meta FROM edges
-                    WHERE dst = ? AND created_at > ?
-                """, (node_id, time.time() - 2592000)).fetchall()
+        return [{
+            'target': row[0],
+            'relation': row[1],
+            'meta': _loads(row[2])
+        } for row in self._neighbor_rows('out', node_id, relation, now)]
 
-            return [{
-                'source': row[0],
-                'relation': row[1],
-                'meta': json.loads(row[2])
-            } for row in rows]
+    def get_reverse_neighbors(self, node_id: str, relation: Optional[str] = None, now: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Get nodes that point to this node"""
+        return [{
+            'source': row[0],
+            'relation': row[1],
+            'meta': _loads(row[2])
+        } for row in self._neighbor_rows('in', node_id, relation, now)]
 
     # Memory lifecycle management
     def cleanup_expired(self):
         """Remove expired entries based on TTL"""
-        cutoff = time.time()
+        cutoff = int(time.time())
 
-        with sqlite3.connect(self.db_path) as conn:
+        with self._transaction() as conn:
             # Remove expired decisions (unless pinned)
             conn.execute("""
                 DELETE FROM decisions
                 WHERE pinned = 0 AND (created_at + ttl) < ?
             """, (cutoff,))
+            conn.execute("""
+                DELETE FROM decision_terms
+                WHERE decision_id NOT IN (SELECT id FROM decisions)
+            """)
 
             # Remove expired embeddings
             conn.execute("""
@@ -279,37 +547,29 @@ class MemoryStore:
                 DELETE FROM edges
                 WHERE (created_at + ttl) < ?
             """, (cutoff,))
+        self._invalidate_vectors()
 
     def compact_database(self):
         """Compact the database to reclaim space"""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute("VACUUM")
+        conn = self._conn()
+        conn.execute("VACUUM")
 
     def get_stats(self) -> Dict[str, int]:
         """Get database statistics"""
-        with sqlite3.connect(self.db_path) as conn:
-            stats = {}
-
-            for table in ['decisions', 'actions', 'embeddings', 'nodes', 'edges']:
-                count = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
-                stats[table] = count
-
-            return stats
+        row = self._conn().execute(STATS_QUERY).fetchone()
+        return dict(zip(TABLES, row))
 
     def export_data(self, tables: List[str] = None) -> Dict[str, List[Dict[str, Any]]]:
         """Export data from specified tables"""
         if tables is None:
-            tables = ['decisions', 'embeddings', 'nodes', 'edges']
+            tables = EXPORT_TABLES
 
         export = {}
 
-        with sqlite3.connect(self.db_path) as conn:
-            for table in tables:
-                rows = conn.execute(f"SELECT * FROM {table}").fetchall()
-                columns = [desc[0] for desc in conn.execute(f"PRAGMA table_info({table})").fetchall()]
-
-                export[table] = []
-                for row in rows:
-                    export[table].append(dict(zip(columns, row)))
+        # sqlite3.Row maps names to values in C; other queries keep plain tuples
+        cursor = self._conn().cursor()
+        cursor.row_factory = sqlite3.Row
+        for table in tables:
+            export[table] = [dict(row) for row in cursor.execute(f"SELECT * FROM {table}")]
 
-        return export
\ No newline at end of file
+        return export
@@ -72,5 +72,75 @@ class TaskSpec(BaseModel):
     estimated_cost: str = "medium"
 
 
+# Request bodies. Defaults mirror what the handlers used to fall back to
+# with dict.get(), so omitted fields behave as before.
+class HeartbeatRequest(BaseModel):
+    energy: float = 0
+    analysis: dict | None = None
 
 
+class EventRequest(BaseModel):
+    type: str | None = None
+
+
+class EnhanceTaskSpecRequest(BaseModel):
+    taskspec: TaskSpec
+    answers: dict = {}
+
+
+class ParseConstraintsRequest(BaseModel):
+    prompt: str = ""
+
+
+class GenerateWithProviderRequest(BaseModel):
+    prompt: str = ""
+    provider: str | None = None
+    max_tokens: int = 1000
+    # Caller's id for a shared prompt prefix, used to track provider cache hits
+    prefix_hash: str | None = None
+
+
+class ProjectProfileRequest(BaseModel):
+    project_path: str = ""
+    profile: dict = {}
+
+
+class BuildProjectGraphRequest(BaseModel):
+    project_root: str = "."
+
+
+class EnrichTaskSpecRequest(BaseModel):
+    taskspec: dict = {}
+    project_context: str = "current_project"
+
+
+class StoreTaskSpecRequest(BaseModel):
+    taskspec: dict = {}
+    project: str = "current_project"
+
+
+class CheckPermissionRequest(BaseModel):
+    tool_name: str = ""
+    session_id: str | None = None
+    reason: str = ""
+
+
+class GrantElevationRequest(BaseModel):
+    session_id: str = ""
+    tools: list[str] = []
+    duration_minutes: int = 30
+    reason: str = ""
+    granted_by: str = "user"
+
+
+class ApplyEditsRequest(BaseModel):
+    operations: list[dict] = []
+
+
+class CreateBranchRequest(BaseModel):
+    description: str = "AEIOU ephemeral branch"
+
+
+class CommitBranchRequest(BaseModel):
+    branch_name: str = ""
+    message: str = "AEIOU: Apply changes"
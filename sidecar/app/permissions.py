@@ -1,10 +1,16 @@
 from __future__ import annotations
 
+import heapq
+import threading
 import time
-from typing import Dict, List, Any, Optional
+from collections import OrderedDict
+from typing import Dict, FrozenSet, List, Any, Optional, Tuple
 from enum import Enum
 from dataclasses import dataclass
 
+# valid_until for cached decisions that no elevation can invalidate
+NEVER_EXPIRES = float('inf')
+
 
 class PermissionLevel(Enum):
     DENY = "deny"
@@ -12,7 +18,7 @@ class PermissionLevel(Enum):
     ALLOW = "allow"
 
 
-@dataclass
+@dataclass(slots=True)
 class ToolPermission:
     """Permission settings for a specific tool"""
     tool_name: str
@@ -23,11 +29,11 @@ class ToolPermission:
     use_count: int = 0
 
 
-@dataclass
+@dataclass(slots=True)
 class SessionElevation:
     """Temporary permission elevation for a session"""
     session_id: str
-    elevated_tools: List[str]
+    elevated_tools: FrozenSet[str]
     granted_by: str
     granted_at: float
     expires_at: float
@@ -37,9 +43,28 @@ class SessionElevation:
 class PermissionManager:
     """Manages tool permissions and session elevations"""
 
+    # Level for tools with no configured permission
+    DEFAULT_PERMISSION = PermissionLevel.ASK
+    DECISION_CACHE_SIZE = 4096
+
     def __init__(self):
+        # Guards every structure below; handlers call in from worker threads
+        self._lock = threading.RLock()
         self.tool_permissions: Dict[str, ToolPermission] = {}
+        # tool_name -> permission level, mirrors tool_permissions for the check path
+        self._perm_cache: Dict[str, PermissionLevel] = {}
         self.session_elevations: Dict[str, SessionElevation] = {}
+        # (expires_at, session_id) for every grant; entries for replaced or revoked grants go stale
+        self._expiry_heap: List[Tuple[float, str]] = []
+        # Bumped by every policy mutation so cached decisions from older policies never match
+        self._policy_version = 0
+        # (tool_name, session_id, policy_version) -> (decision, valid_until)
+        self._decision_cache: OrderedDict[Tuple[str, str, int], Tuple[PermissionLevel, float]] = OrderedDict()
+        # Sum of use_count over tool_permissions, kept in step with _record_tool_usage
+        self._total_requests = 0
+        # ((policy_version, total_requests, elevations), per-tool rows) for the
+        # last stats snapshot; rows are tuples so callers can't alter the memo
+        self._stats_memo: Optional[Tuple[Tuple[int, int, int], Tuple[tuple, ...]]] = None
         self._load_default_permissions()
 
     def _load_default_permissions(self):
@@ -97,36 +122,59 @@ class PermissionManager:
 
         for perm in default_permissions:
             self.tool_permissions[perm.tool_name] = perm
+            self._perm_cache[perm.tool_name] = perm.permission
 
     def check_permission(self, tool_name: str, session_id: Optional[str] = None) -> PermissionLevel:
         """Check permission for a tool, considering session elevations"""
-        base_permission = self.tool_permissions.get(tool_name, ToolPermission(
-            tool_name=tool_name,
-            permission=PermissionLevel.ASK,
-            risk_level="medium"
-        ))
+        with self._lock:
+            return self._decide(tool_name, session_id)
+
+    def _resolve(self, tool_name: str, session_id: Optional[str]) -> Tuple[PermissionLevel, Optional[ToolPermission]]:
+        """Return the decision and the tool's settings together; caller holds the lock"""
+        return self._decide(tool_name, session_id), self.tool_permissions.get(tool_name)
+
+    def _decide(self, tool_name: str, session_id: Optional[str]) -> PermissionLevel:
+        """Permission decision for a tool, served from the decision cache; caller holds the lock"""
+        key = (tool_name, session_id or '', self._policy_version)
+        cached = self._decision_cache.get(key)
+        # Only decisions tied to an elevation expire, so only they read the clock
+        if cached is not None and (cached[1] == NEVER_EXPIRES or time.time() < cached[1]):
+            self._decision_cache.move_to_end(key)
+            return cached[0]
+
+        now = time.time()
+        decision = self._perm_cache.get(tool_name, self.DEFAULT_PERMISSION)
+        valid_until = NEVER_EXPIRES
 
         # Check for session elevation
-        if session_id and session_id in self.session_elevations:
-            elevation = self.session_elevations[session_id]
-            if time.time() < elevation.expires_at and tool_name in elevation.elevated_tools:
-                return PermissionLevel.ALLOW
-
-        return base_permission.permission
+        elevation = self.session_elevations.get(session_id) if session_id else None
+        if elevation is not None:
+            if now < elevation.expires_at:
+                if tool_name in elevation.elevated_tools:
+                    decision = PermissionLevel.ALLOW
+                # The decision changes once the elevation lapses
+                valid_until = elevation.expires_at
+
+        self._decision_cache[key] = (decision, valid_until)
+        self._decision_cache.move_to_end(key)
+        if len(self._decision_cache) > self.DECISION_CACHE_SIZE:
+            self._decision_cache.popitem(last=False)
+        return decision
 
     def request_permission(self, tool_name: str, reason: str, session_id: str) -> Dict[str, Any]:
         """Request permission for a tool that requires approval"""
-        permission = self.check_permission(tool_name, session_id)
+        with self._lock:
+            permission, tool_perm = self._resolve(tool_name, session_id)
 
-        if permission == PermissionLevel.ALLOW:
-            self._record_tool_usage(tool_name)
-            return {"granted": True, "reason": "Auto-approved"}
+            if permission == PermissionLevel.ALLOW:
+                if tool_perm is not None:
+                    self._record_tool_usage(tool_perm)
+                return {"granted": True, "reason": "Auto-approved"}
 
         if permission == PermissionLevel.DENY:
             return {"granted": False, "reason": "Permission denied by policy"}
 
         # ASK permission - requires user approval
-        tool_perm = self.tool_permissions.get(tool_name)
         risk_level = tool_perm.risk_level if tool_perm else "medium"
 
         return {
@@ -143,70 +191,93 @@ class PermissionManager:
         """Grant temporary elevation for specific tools"""
         elevation = SessionElevation(
             session_id=session_id,
-            elevated_tools=tools,
+            elevated_tools=frozenset(tools),
             granted_by=granted_by,
             granted_at=time.time(),
             expires_at=time.time() + (duration_minutes * 60),
             reason=reason
         )
 
-        self.session_elevations[session_id] = elevation
+        with self._lock:
+            self.session_elevations[session_id] = elevation
+            heapq.heappush(self._expiry_heap, (elevation.expires_at, session_id))
+            self._policy_version += 1
         return elevation
 
     def revoke_elevation(self, session_id: str):
         """Revoke session elevation"""
-        if session_id in self.session_elevations:
-            del self.session_elevations[session_id]
+        with self._lock:
+            if self.session_elevations.pop(session_id, None) is not None:
+                self._policy_version += 1
 
     def set_tool_permission(self, tool_name: str, permission: PermissionLevel,
                            risk_level: str = "medium", description: str = ""):
         """Set permission for a specific tool"""
-        self.tool_permissions[tool_name] = ToolPermission(
+        tool_perm = ToolPermission(
             tool_name=tool_name,
             permission=permission,
             risk_level=risk_level,
             description=description
         )
-
-    def _record_tool_usage(self, tool_name: str):
-        """Record tool usage for analytics"""
-        if tool_name in self.tool_permissions:
-            perm = self.tool_permissions[tool_name]
-            perm.last_used = time.time()
-            perm.use_count += 1
+        with self._lock:
+            previous = self.tool_permissions.get(tool_name)
+            if previous is not None:
+                # The replacement starts counting from zero
+                self._total_requests -= previous.use_count
+            self.tool_permissions[tool_name] = tool_perm
+            self._perm_cache[tool_name] = permission
+            self._policy_version += 1
+
+    def _record_tool_usage(self, perm: ToolPermission):
+        """Record tool usage for analytics; caller holds the lock"""
+        perm.last_used = time.time()
+        perm.use_count += 1
+        self._total_requests += 1
 
     def get_permission_stats(self) -> Dict[str, Any]:
         """Get permission and usage statistics"""
-        stats = {
-            "tools": {},
-            "elevations": len(self.session_elevations),
-            "total_requests": 0
+        # Snapshot under the lock, build the response outside it
+        with self._lock:
+            memo_key = (self._policy_version, self._total_requests, len(self.session_elevations))
+            if self._stats_memo is not None and self._stats_memo[0] == memo_key:
+                snapshot = self._stats_memo[1]
+            else:
+                snapshot = tuple(
+                    (tool_name, perm.permission, perm.risk_level, perm.use_count, perm.last_used)
+                    for tool_name, perm in self.tool_permissions.items()
+                )
+                self._stats_memo = (memo_key, snapshot)
+
+        # A fresh dict per call: the response is the caller's to modify
+        return {
+            "tools": {
+                tool_name: {
+                    "permission": permission.value,
+                    "risk_level": risk_level,
+                    "use_count": use_count,
+                    "last_used": last_used
+                }
+                for tool_name, permission, risk_level, use_count, last_used in snapshot
+            },
+            "elevations": memo_key[2],
+            "total_requests": memo_key[1]
         }
 
-        for tool_name, perm in self.tool_permissions.items():
-            stats["tools"][tool_name] = {
-                "permission": perm.permission.value,
-                "risk_level": perm.risk_level,
-                "use_count": perm.use_count,
-                "last_used": perm.last_used
-            }
-            stats["total_requests"] += perm.use_count
-
-        return stats
-
     def cleanup_expired_elevations(self):
         """Remove expired session elevations"""
         current_time = time.time()
-        expired_sessions = []
-
-        for session_id, elevation in self.session_elevations.items():
-            if current_time >= elevation.expires_at:
-                expired_sessions.append(session_id)
-
-        for session_id in expired_sessions:
-            del self.session_elevations[session_id]
-
-        return len(expired_sessions)
+        removed = 0
+
+        # Only entries that are due are visited, so the lock is held briefly
+        with self._lock:
+            while self._expiry_heap and self._expiry_heap[0][0] <= current_time:
+                expires_at, session_id = heapq.heappop(self._expiry_heap)
+                elevation = self.session_elevations.get(session_id)
+                if elevation is not None and elevation.expires_at == expires_at:
+                    del self.session_elevations[session_id]
+                    removed += 1
+
+        return removed
 
     def get_pending_approvals(self) -> List[Dict[str, Any]]:
         """Get list of tools waiting for approval (for UI display)"""
@@ -1,35 +1,95 @@
 from __future__ import annotations
 
+import multiprocessing
 import os
+import re
 import sqlite3
+import threading
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import closing
 from pathlib import Path
-from typing import Dict, List, Set, Optional, Any
-from dataclasses import dataclass
+from typing import Dict, List, Set, Optional, Any, Tuple
+from dataclasses import dataclass, field
 from datetime import datetime
 import json
 
 
-@dataclass
+# Candidate lines for symbol extraction. The regex engine skips every other
+# line in C; the per-line rules below only run on the few lines that match.
+_PY_SYMBOL_LINE_RE = re.compile(r'^[ \t]*(?:def|class) .*$', re.MULTILINE)
+_JS_SYMBOL_LINE_RE = re.compile(r'^.*(?:function |=>|class ).*$', re.MULTILINE)
+
+# Import lines, matched the same way so content is never split into a line list
+_DEPENDENCY_LINE_RES = {
+    'python': re.compile(r'^[ \t]*(?:import|from) .*$', re.MULTILINE),
+    'javascript': re.compile(r'^[ \t]*(?:import |require\().*$', re.MULTILINE),
+    'typescript': re.compile(r'^[ \t]*(?:import |require\().*$', re.MULTILINE),
+}
+
+_IDENTIFIER_RE = re.compile(r'[A-Za-z_]\w*')
+
+# Larger files (bundles, generated output) are not parsed; reads never go past this
+MAX_PARSE_BYTES = 1024 * 1024
+# Leading bytes inspected to spot binary and minified files
+SNIFF_BYTES = 8192
+# Average line length above which a file is treated as minified
+MINIFIED_AVG_LINE_LENGTH = 500
+
+# Below this many files, process start-up costs more than parsing serially
+PARALLEL_PARSE_MIN_FILES = 256
+
+# Parse workers outlive a single analysis. They are started by a forkserver
+# (spawn where that is unavailable): analyses run in worker threads of a
+# multithreaded server, and forking there can copy locks other threads hold
+_parse_pool: Optional[ProcessPoolExecutor] = None
+_parse_pool_lock = threading.Lock()
+
+
+def _parse_executor() -> ProcessPoolExecutor:
+    """The process-wide parse pool, started on first use"""
+    global _parse_pool
+    with _parse_pool_lock:
+        if _parse_pool is None:
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            _parse_pool = ProcessPoolExecutor(mp_context=multiprocessing.get_context(method))
+        return _parse_pool
+
+
+def _discard_parse_executor(executor: ProcessPoolExecutor):
+    """Drop a broken pool so the next analysis starts a fresh one"""
+    global _parse_pool
+    with _parse_pool_lock:
+        if _parse_pool is executor:
+            _parse_pool = None
+    executor.shutdown(wait=False)
+
+
+def _matching_lines(pattern: re.Pattern, content: str):
+    """Yield (1-based line number, stripped line) for each line matching pattern"""
+    line_no = 1
+    pos = 0
+    for match in pattern.finditer(content):
+        # Matches arrive in order, so count newlines incrementally
+        line_no += content.count('\n', pos, match.start())
+        pos = match.start()
+        yield line_no, match.group().strip()
+
+
+@dataclass(slots=True)
 class FileNode:
     """Represents a file in the project graph"""
     path: str
     language: str
     size: int
     last_modified: str
-    symbols: List[Dict[str, Any]] = None
-    imports: List[str] = None
-    exports: List[str] = None
+    symbols: List[Dict[str, Any]] = field(default_factory=list)
+    imports: List[str] = field(default_factory=list)
+    exports: List[str] = field(default_factory=list)
 
-    def __post_init__(self):
-        if self.symbols is None:
-            self.symbols = []
-        if self.imports is None:
-            self.imports = []
-        if self.exports is None:
-            self.exports = []
 
-
-@dataclass
+@dataclass(slots=True)
 class SymbolNode:
     """Represents a symbol (function, class, etc.) in the project"""
     id: str
@@ -40,14 +100,10 @@ class SymbolNode:
     column: int
     signature: Optional[str] = None
     docstring: Optional[str] = None
-    references: List[Dict[str, Any]] = None
-
-    def __post_init__(self):
-        if self.references is None:
-            self.references = []
+    references: List[Dict[str, Any]] = field(default_factory=list)
 
 
-@dataclass
+@dataclass(slots=True)
 class DependencyEdge:
     """Represents a dependency relationship"""
     from_file: str
@@ -57,21 +113,173 @@ class DependencyEdge:
     line: Optional[int] = None
 
 
+def _extract_symbols_from_content(content: str, language: str) -> List[Dict[str, Any]]:
+    """Extract symbols from file content"""
+    symbols = []
+
+    if language == 'python':
+        symbols.extend(_extract_python_symbols(content))
+    elif language in ['javascript', 'typescript']:
+        symbols.extend(_extract_js_symbols(content))
+    # Add more language-specific extractors as needed
+
+    return symbols
+
+
+def _extract_python_symbols(content: str) -> List[Dict[str, Any]]:
+    """Extract Python symbols"""
+    symbols = []
+
+    for line_no, line in _matching_lines(_PY_SYMBOL_LINE_RE, content):
+        # Functions
+        if line.startswith('def '):
+            name = line.split('def ')[1].split('(')[0].strip()
+            symbols.append({
+                'name': name,
+                'kind': 'function',
+                'line': line_no,
+                'signature': line
+            })
+
+        # Classes
+        elif line.startswith('class '):
+            name = line.split('class ')[1].split('(')[0].split(':')[0].strip()
+            symbols.append({
+                'name': name,
+                'kind': 'class',
+                'line': line_no,
+                'signature': line
+            })
+
+    return symbols
+
+
+def _extract_js_symbols(content: str) -> List[Dict[str, Any]]:
+    """Extract JavaScript/TypeScript symbols"""
+    symbols = []
+
+    for line_no, line in _matching_lines(_JS_SYMBOL_LINE_RE, content):
+        # Functions
+        if 'function ' in line or line.startswith('const ') and '=>' in line:
+            symbols.append({
+                'name': 'function_name',  # Would need better parsing
+                'kind': 'function',
+                'line': line_no,
+                'signature': line
+            })
+
+        # Classes
+        if line.startswith('class '):
+            name = line.split('class ')[1].split(' ')[0].split('{')[0].strip()
+            symbols.append({
+                'name': name,
+                'kind': 'class',
+                'line': line_no,
+                'signature': line
+            })
+
+    return symbols
+
+
+def _extract_dependencies(content: str, language: str) -> List[str]:
+    """Extract dependencies from file content"""
+    pattern = _DEPENDENCY_LINE_RES.get(language)
+    if pattern is None:
+        return []
+    # Simple extraction - could be more sophisticated
+    return [match.group().strip() for match in pattern.finditer(content)]
+
+
+def _parse_file(full_path: str, language: str) -> Optional[Tuple[List[Dict[str, Any]], List[str]]]:
+    """Read a file once and return (symbols, dependencies), or None if unreadable"""
+    try:
+        with open(full_path, 'rb') as f:
+            raw = f.read(MAX_PARSE_BYTES)
+    except OSError:
+        return None
+
+    # Binary and minified files contribute no useful symbols
+    sample = raw[:SNIFF_BYTES]
+    if b'\0' in sample or len(sample) > MINIFIED_AVG_LINE_LENGTH * (sample.count(b'\n') + 1):
+        return [], []
+
+    content = raw.decode('utf-8', errors='ignore')
+    return _extract_symbols_from_content(content, language), _extract_dependencies(content, language)
+
+
+class ParseCache:
+    """Per-file (symbols, imports) persisted in SQLite, keyed by (mtime_ns, size)"""
+
+    LOOKUP_BATCH = 500
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        with closing(sqlite3.connect(db_path)) as conn, conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS files (
+                    path TEXT PRIMARY KEY,
+                    mtime_ns INTEGER,
+                    size INTEGER,
+                    symbols TEXT,
+                    imports TEXT
+                )
+            """)
+
+    def lookup(self, stat_keys: Dict[str, Tuple[int, int]]) -> Dict[str, Tuple[List[Dict[str, Any]], List[str]]]:
+        """Return cached results for the paths whose (mtime_ns, size) still match"""
+        hits = {}
+        paths = list(stat_keys)
+        with closing(sqlite3.connect(self.db_path)) as conn:
+            for start in range(0, len(paths), self.LOOKUP_BATCH):
+                batch = paths[start:start + self.LOOKUP_BATCH]
+                placeholders = ", ".join("?" * len(batch))
+                rows = conn.execute(
+                    f"SELECT path, mtime_ns, size, symbols, imports FROM files WHERE path IN ({placeholders})",
+                    batch
+                )
+                for path, mtime_ns, size, symbols, imports in rows:
+                    if stat_keys[path] == (mtime_ns, size):
+                        hits[path] = (json.loads(symbols), json.loads(imports))
+        return hits
+
+    def store(self, entries: List[Tuple[str, Tuple[int, int], Tuple[List[Dict[str, Any]], List[str]]]]):
+        """Write (path, (mtime_ns, size), (symbols, imports)) entries in one transaction"""
+        if not entries:
+            return
+        with closing(sqlite3.connect(self.db_path)) as conn, conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO files (path, mtime_ns, size, symbols, imports) VALUES (?, ?, ?, ?, ?)",
+                [(path, mtime_ns, size, json.dumps(symbols), json.dumps(imports))
+                 for path, (mtime_ns, size), (symbols, imports) in entries]
+            )
+
+
 class ProjectGraphBuilder:
     """Builds project graph from LSP/Tree-sitter analysis"""
 
-    def __init__(self, project_root: str):
+    def __init__(self, project_root: str, cache_path: Optional[str] = None):
         self.project_root = Path(project_root)
+        # Optional on-disk cache of per-file parse results across builds
+        self._cache = ParseCache(cache_path) if cache_path else None
+        self._stat_keys: Dict[str, Tuple[int, int]] = {}  # path -> (mtime_ns, size)
         self.files: Dict[str, FileNode] = {}
         self.symbols: Dict[str, SymbolNode] = {}
-        self.dependencies: List[DependencyEdge] = []
+        # Dependency edges as parallel columns, one entry per edge
+        self._dep_from: List[str] = []
+        self._dep_to: List[str] = []
+        self._dep_type: List[str] = []
+        self._dep_symbol: List[Optional[str]] = []
+        # Adjacency indices over the edges: file -> files it imports / imported by
+        self._forward_deps: Dict[str, List[str]] = defaultdict(list)
+        self._reverse_deps: Dict[str, List[str]] = defaultdict(list)
+        # Module stem -> Python files with that stem, for import resolution
+        self._stem_index: Dict[str, List[str]] = defaultdict(list)
         self.owners: Dict[str, str] = {}  # symbol_id -> owner
 
     def build_graph(self) -> Dict[str, Any]:
         """Build the complete project graph"""
         self._scan_files()
-        self._extract_symbols()
-        self._analyze_dependencies()
+        self._analyze_files()
         self._determine_ownership()
 
         return {
@@ -84,7 +292,7 @@ class ProjectGraphBuilder:
                 "build_time": datetime.now().isoformat(),
                 "total_files": len(self.files),
                 "total_symbols": len(self.symbols),
-                "total_dependencies": len(self.dependencies)
+                "total_dependencies": len(self._dep_from)
             }
         }
 
@@ -102,183 +310,137 @@ class ProjectGraphBuilder:
             '.lua': 'lua'
         }
 
-        for root, dirs, files in os.walk(self.project_root):
-            # Skip common directories
-            dirs[:] = [d for d in dirs if not d.startswith('.') and d not in {'node_modules', '__pycache__', 'target', 'build'}]
-
-            for file in files:
-                file_path = Path(root) / file
-                ext = file_path.suffix
-
-                if ext in extensions:
-                    try:
-                        stat = file_path.stat()
-                        relative_path = file_path.relative_to(self.project_root)
+        skip_dirs = {'node_modules', '__pycache__', 'target', 'build'}
+        root = os.fspath(self.project_root)
+        prefix_len = len(os.path.join(root, ''))
+        stack = [root]
 
-                        self.files[str(relative_path)] = FileNode(
-                            path=str(relative_path),
+        while stack:
+            try:
+                with os.scandir(stack.pop()) as entries:
+                    for entry in entries:
+                        # Skip common directories; symlinked directories are not followed
+                        if entry.is_dir(follow_symlinks=False):
+                            if not entry.name.startswith('.') and entry.name not in skip_dirs:
+                                stack.append(entry.path)
+                            continue
+
+                        ext = os.path.splitext(entry.name)[1]
+                        if ext not in extensions or not entry.is_file():
+                            continue
+
+                        try:
+                            stat = entry.stat()
+                        except OSError:
+                            continue
+
+                        relative_path = entry.path[prefix_len:]
+                        self._stat_keys[relative_path] = (stat.st_mtime_ns, stat.st_size)
+                        self.files[relative_path] = FileNode(
+                            path=relative_path,
                             language=extensions[ext],
                             size=stat.st_size,
                             last_modified=datetime.fromtimestamp(stat.st_mtime).isoformat()
                         )
-                    except (OSError, ValueError):
-                        continue
-
-    def _extract_symbols(self):
-        """Extract symbols from files using basic analysis"""
-        for file_path, file_node in self.files.items():
-            full_path = self.project_root / file_path
-
-            try:
-                with open(full_path, 'r', encoding='utf-8', errors='ignore') as f:
-                    content = f.read()
-                    lines = content.split('\n')
-
-                symbols = self._extract_symbols_from_content(content, lines, file_path, file_node.language)
-                file_node.symbols = symbols
-
-                # Store symbols globally
-                for symbol in symbols:
-                    symbol_id = f"{file_path}:{symbol['name']}:{symbol['line']}"
-                    self.symbols[symbol_id] = SymbolNode(
-                        id=symbol_id,
-                        name=symbol['name'],
-                        kind=symbol['kind'],
-                        file_path=file_path,
-                        line=symbol['line'],
-                        column=symbol.get('column', 0),
-                        signature=symbol.get('signature'),
-                        docstring=symbol.get('docstring')
-                    )
-
-            except (IOError, UnicodeDecodeError):
+            except OSError:
                 continue
 
-    def _extract_symbols_from_content(self, content: str, lines: List[str], file_path: str, language: str) -> List[Dict[str, Any]]:
-        """Extract symbols from file content"""
-        symbols = []
-
-        if language == 'python':
-            symbols.extend(self._extract_python_symbols(lines))
-        elif language in ['javascript', 'typescript']:
-            symbols.extend(self._extract_js_symbols(lines))
-        # Add more language-specific extractors as needed
-
-        return symbols
-
-    def _extract_python_symbols(self, lines: List[str]) -> List[Dict[str, Any]]:
-        """Extract Python symbols"""
-        symbols = []
-
-        for i, line in enumerate(lines):
-            line = line.strip()
-
-            # Functions
-            if line.startswith('def '):
-                name = line.split('def ')[1].split('(')[0].strip()
-                symbols.append({
-                    'name': name,
-                    'kind': 'function',
-                    'line': i + 1,
-                    'signature': line
-                })
-
-            # Classes
-            elif line.startswith('class '):
-                name = line.split('class ')[1].split('(')[0].split(':')[0].strip()
-                symbols.append({
-                    'name': name,
-                    'kind': 'class',
-                    'line': i + 1,
-                    'signature': line
-                })
-
-        return symbols
-
-    def _extract_js_symbols(self, lines: List[str]) -> List[Dict[str, Any]]:
-        """Extract JavaScript/TypeScript symbols"""
-        symbols = []
-
-        for i, line in enumerate(lines):
-            line = line.strip()
-
-            # Functions
-            if 'function ' in line or line.startswith('const ') and '=>' in line:
-                symbols.append({
-                    'name': 'function_name',  # Would need better parsing
-                    'kind': 'function',
-                    'line': i + 1,
-                    'signature': line
-                })
-
-            # Classes
-            if line.startswith('class '):
-                name = line.split('class ')[1].split(' ')[0].split('{')[0].strip()
-                symbols.append({
-                    'name': name,
-                    'kind': 'class',
-                    'line': i + 1,
-                    'signature': line
-                })
-
-        return symbols
-
-    def _analyze_dependencies(self):
-        """Analyze dependencies between files"""
-        for file_path, file_node in self.files.items():
-            full_path = self.project_root / file_path
-
+    def _analyze_files(self):
+        """Read each file once, extracting its symbols and dependencies"""
+        paths = list(self.files)
+        full_paths = {path: str(self.project_root / path) for path in paths}
+        stat_keys = {full_paths[path]: self._stat_keys[path] for path in paths}
+
+        # Unchanged files (same mtime and size) skip both I/O and parsing
+        parsed_by_path = self._cache.lookup(stat_keys) if self._cache else {}
+        for path in paths:
+            if self.files[path].size > MAX_PARSE_BYTES:
+                parsed_by_path[full_paths[path]] = None
+        dirty = [path for path in paths if full_paths[path] not in parsed_by_path]
+        dirty_full = [full_paths[path] for path in dirty]
+        languages = [self.files[path].language for path in dirty]
+
+        results = None
+        if len(dirty) >= PARALLEL_PARSE_MIN_FILES:
+            # Pure per-file work: fan out across processes
+            executor = _parse_executor()
             try:
-                with open(full_path, 'r', encoding='utf-8', errors='ignore') as f:
-                    content = f.read()
-
-                deps = self._extract_dependencies(content, file_node.language)
-                file_node.imports = deps
-
-                # Create dependency edges
-                for dep in deps:
-                    # Try to resolve the dependency to a file in the project
-                    resolved_file = self._resolve_dependency(dep, file_path)
-                    if resolved_file and resolved_file in self.files:
-                        self.dependencies.append(DependencyEdge(
-                            from_file=file_path,
-                            to_file=resolved_file,
-                            dependency_type='import',
-                            symbol_name=dep
-                        ))
-
-            except (IOError, UnicodeDecodeError):
+                results = list(executor.map(_parse_file, dirty_full, languages, chunksize=32))
+            except BrokenProcessPool:
+                _discard_parse_executor(executor)
+        if results is None:
+            results = [_parse_file(path, language) for path, language in zip(dirty_full, languages)]
+
+        parsed_by_path.update(zip(dirty_full, results))
+        if self._cache:
+            self._cache.store([
+                (full, stat_keys[full], parsed)
+                for full, parsed in zip(dirty_full, results) if parsed is not None
+            ])
+
+        for file_path in paths:
+            parsed = parsed_by_path[full_paths[file_path]]
+            if parsed is None:
                 continue
+            symbols, deps = parsed
+            file_node = self.files[file_path]
+            file_node.symbols = symbols
+            file_node.imports = deps
+
+            # Store symbols globally
+            for symbol in symbols:
+                symbol_id = f"{file_path}:{symbol['name']}:{symbol['line']}"
+                self.symbols[symbol_id] = SymbolNode(
+                    id=symbol_id,
+                    name=symbol['name'],
+                    kind=symbol['kind'],
+                    file_path=file_path,
+                    line=symbol['line'],
+                    column=symbol.get('column', 0),
+                    signature=symbol.get('signature'),
+                    docstring=symbol.get('docstring')
+                )
+
+        # Resolve edges once every file's imports are known
+        for file_path in self.files:
+            if file_path.endswith('.py'):
+                self._stem_index[os.path.splitext(os.path.basename(file_path))[0]].append(file_path)
 
-    def _extract_dependencies(self, content: str, language: str) -> List[str]:
-        """Extract dependencies from file content"""
-        deps = []
-
-        if language == 'python':
-            lines = content.split('\n')
-            for line in lines:
-                line = line.strip()
-                if line.startswith('import ') or line.startswith('from '):
-                    # Simple extraction - could be more sophisticated
-                    deps.append(line)
-
-        elif language in ['javascript', 'typescript']:
-            lines = content.split('\n')
-            for line in lines:
-                line = line.strip()
-                if line.startswith('import ') or line.startswith('require('):
-                    deps.append(line)
-
-        return deps
+        for file_path, file_node in self.files.items():
+            for dep in file_node.imports:
+                # Try to resolve the dependency to a file in the project
+                resolved_file = self._resolve_dependency(dep, file_path)
+                if resolved_file and resolved_file in self.files:
+                    self._add_dependency(file_path, resolved_file, 'import', dep)
+
+    def _add_dependency(self, from_file: str, to_file: str, dependency_type: str,
+                        symbol_name: Optional[str] = None):
+        """Record an edge and keep the adjacency indices in step"""
+        self._dep_from.append(from_file)
+        self._dep_to.append(to_file)
+        self._dep_type.append(dependency_type)
+        self._dep_symbol.append(symbol_name)
+        self._forward_deps[from_file].append(to_file)
+        self._reverse_deps[to_file].append(from_file)
+
+    @property
+    def dependencies(self) -> List[DependencyEdge]:
+        """Dependency edges as objects, built on demand from the edge columns"""
+        return [
+            DependencyEdge(from_file=from_file, to_file=to_file, dependency_type=dependency_type, symbol_name=symbol_name)
+            for from_file, to_file, dependency_type, symbol_name
+            in zip(self._dep_from, self._dep_to, self._dep_type, self._dep_symbol)
+        ]
 
     def _resolve_dependency(self, dep: str, from_file: str) -> Optional[str]:
         """Resolve a dependency to a file path"""
         # This is a simplified resolver - in practice, you'd use the language's module resolution
         if 'import' in dep or 'from' in dep:
-            # Try to find a matching file
-            for file_path in self.files:
-                if file_path.endswith('.py') and Path(file_path).stem in dep:
-                    return file_path
+            # The first identifier naming a project module wins
+            for token in _IDENTIFIER_RE.findall(dep):
+                candidates = self._stem_index.get(token)
+                if candidates:
+                    return candidates[0]
 
         return None
 
@@ -306,16 +468,8 @@ class ProjectGraphBuilder:
 
     def get_file_dependencies(self, file_path: str) -> List[str]:
         """Get all files that this file depends on"""
-        deps = []
-        for edge in self.dependencies:
-            if edge.from_file == file_path:
-                deps.append(edge.to_file)
-        return deps
+        return list(self._forward_deps.get(file_path, ()))
 
     def get_reverse_dependencies(self, file_path: str) -> List[str]:
         """Get all files that depend on this file"""
-        deps = []
-        for edge in self.dependencies:
-            if edge.to_file == file_path:
-                deps.append(edge.from_file)
-        return deps
\ No newline at end of file
+        return list(self._reverse_deps.get(file_path, ()))
\ No newline at end of file
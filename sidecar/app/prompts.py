@@ -2,13 +2,15 @@ from __future__ import annotations
 
 import json
 import os
+import threading
+from collections import defaultdict
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Set
 from dataclasses import dataclass
 from datetime import datetime
 
 
-@dataclass
+@dataclass(slots=True)
 class PromptVersion:
     """Represents a version of a system prompt"""
     id: str
@@ -21,7 +23,7 @@ class PromptVersion:
     metadata: Dict[str, Any]
 
 
-@dataclass
+@dataclass(slots=True)
 class ToolManifest:
     """Represents a tool manifest"""
     id: str
@@ -37,7 +39,11 @@ class PromptRegistry:
     """Registry for managing system prompts and tool manifests"""
 
     def __init__(self):
+        # Guards the registries below; handlers call in from worker threads
+        self._lock = threading.RLock()
         self.prompts: Dict[str, PromptVersion] = {}
+        # tag -> ids of prompts carrying it
+        self._tag_index: Dict[str, Set[str]] = defaultdict(set)
         self.tool_manifests: Dict[str, ToolManifest] = {}
         self.project_profiles: Dict[str, Dict[str, str]] = {}
         self._load_builtin_prompts()
@@ -84,47 +90,63 @@ Follow testing best practices and frameworks.""",
         ]
 
         for prompt in builtin_prompts:
-            self.prompts[prompt.id] = prompt
+            self.add_prompt(prompt)
 
     def add_prompt(self, prompt: PromptVersion):
         """Add a new prompt version to the registry"""
-        self.prompts[prompt.id] = prompt
+        with self._lock:
+            previous = self.prompts.get(prompt.id)
+            if previous is not None:
+                for tag in previous.tags:
+                    self._tag_index[tag].discard(prompt.id)
+            self.prompts[prompt.id] = prompt
+            for tag in prompt.tags:
+                self._tag_index[tag].add(prompt.id)
 
     def get_prompt(self, prompt_id: str) -> Optional[PromptVersion]:
         """Get a prompt by ID"""
-        return self.prompts.get(prompt_id)
+        with self._lock:
+            return self.prompts.get(prompt_id)
 
     def list_prompts(self, tags: Optional[List[str]] = None) -> List[PromptVersion]:
         """List all prompts, optionally filtered by tags"""
-        prompts = list(self.prompts.values())
-
-        if tags:
-            prompts = [p for p in prompts if any(tag in p.tags for tag in tags)]
+        with self._lock:
+            if tags:
+                ids = set().union(*(self._tag_index.get(tag, ()) for tag in tags))
+                prompts = [self.prompts[prompt_id] for prompt_id in ids]
+            else:
+                prompts = list(self.prompts.values())
 
         return sorted(prompts, key=lambda p: p.created_at, reverse=True)
 
     def add_tool_manifest(self, manifest: ToolManifest):
         """Add a tool manifest"""
-        self.tool_manifests[manifest.id] = manifest
+        with self._lock:
+            self.tool_manifests[manifest.id] = manifest
 
     def get_tool_manifest(self, manifest_id: str) -> Optional[ToolManifest]:
         """Get a tool manifest by ID"""
-        return self.tool_manifests.get(manifest_id)
+        with self._lock:
+            return self.tool_manifests.get(manifest_id)
 
     def list_tool_manifests(self) -> List[ToolManifest]:
         """List all tool manifests"""
-        return list(self.tool_manifests.values())
+        with self._lock:
+            return list(self.tool_manifests.values())
 
     def set_project_profile(self, project_path: str, profile: Dict[str, str]):
         """Set the active profile for a project"""
-        self.project_profiles[project_path] = profile
+        with self._lock:
+            self.project_profiles[project_path] = profile
 
     def get_project_profile(self, project_path: str) -> Dict[str, str]:
         """Get the active profile for a project"""
-        return self.project_profiles.get(project_path, {
+        with self._lock:
+            profile = self.project_profiles.get(project_path)
+        return profile if profile is not None else {
             "prompt_id": "code_assistant_v1",
             "tool_manifest_id": None
-        })
+        }
 
     def get_active_prompt_for_project(self, project_path: str) -> Optional[PromptVersion]:
         """Get the active prompt for a project"""
@@ -145,21 +167,22 @@ Follow testing best practices and frameworks.""",
             raise ValueError(f"Base prompt {base_prompt_id} not found")
 
         # Generate new ID
-        new_id = f"{base_prompt_id}_custom_{int(datetime.now().timestamp())}"
+        now = datetime.now()
+        new_id = f"{base_prompt_id}_custom_{int(now.timestamp())}"
 
-        # Apply customizations
+        # Apply customizations; metadata and tags are only copied when they change
         new_content = base_prompt.content
-        new_metadata = base_prompt.metadata.copy()
-        new_tags = base_prompt.tags.copy()
+        new_metadata = base_prompt.metadata
+        new_tags = base_prompt.tags
 
         if "additional_instructions" in customizations:
             new_content += "\n\n" + customizations["additional_instructions"]
 
         if "metadata" in customizations:
-            new_metadata.update(customizations["metadata"])
+            new_metadata = {**base_prompt.metadata, **customizations["metadata"]}
 
         if "tags" in customizations:
-            new_tags.extend(customizations["tags"])
+            new_tags = [*base_prompt.tags, *customizations["tags"]]
 
         return PromptVersion(
             id=new_id,
@@ -167,7 +190,7 @@ Follow testing best practices and frameworks.""",
             version=f"{base_prompt.version}-custom",
             content=new_content,
             description=f"Customized version of {base_prompt.name}",
-            created_at=datetime.now().isoformat(),
+            created_at=now.isoformat(),
             tags=new_tags,
             metadata=new_metadata
         )
@@ -1,9 +1,16 @@
 from __future__ import annotations
 
 import asyncio
+import hashlib
+import importlib.util
+import random
 import time
-from typing import Any, Dict, List, Optional
+from collections import OrderedDict
+from contextlib import nullcontext
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
 from abc import ABC, abstractmethod
+import httpx
 import openai
 from openai import AsyncOpenAI
 import json
@@ -11,6 +18,19 @@ import os
 
 from .models import GenerateRequest, GenerateResponse
 
+try:  # optional accelerator for cache keys and batch payloads
+    import orjson
+
+    def _dumps(obj: Any, sort_keys: bool = False) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS if sort_keys else 0)
+
+    _loads = orjson.loads
+except ImportError:
+    def _dumps(obj: Any, sort_keys: bool = False) -> bytes:
+        return json.dumps(obj, sort_keys=sort_keys, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+    _loads = json.loads
+
 
 class ProviderError(Exception):
     pass
@@ -20,6 +40,49 @@ class RateLimitError(ProviderError):
     pass
 
 
+@dataclass
+class CacheConfig:
+    """Bounds for the response cache"""
+    max_entries: int = 1024
+    ttl: float = 3600.0
+
+
+class LLMCache:
+    """Exact-match response cache with LRU eviction and a TTL"""
+
+    def __init__(self, config: Optional[CacheConfig] = None):
+        self.config = config or CacheConfig()
+        # key -> (content, stored at)
+        self._entries: OrderedDict[str, Tuple[str, float]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(model: str, temperature: float, max_tokens: int, prompt: str) -> str:
+        payload = _dumps(
+            {"model": model, "temperature": temperature, "max_tokens": max_tokens, "prompt": prompt},
+            sort_keys=True
+        )
+        return hashlib.sha256(payload).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is not None and time.time() - entry[1] <= self.config.ttl:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+        if entry is not None:
+            del self._entries[key]
+        self.misses += 1
+        return None
+
+    def set(self, key: str, content: str):
+        self._entries[key] = (content, time.time())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.config.max_entries:
+            self._entries.popitem(last=False)
+
+
 class Provider(ABC):
     """Abstract base class for LLM providers"""
 
@@ -29,6 +92,10 @@ class Provider(ABC):
         self.request_count = 0
         self.token_count = 0
         self.cost_estimate = 0.0
+        # Set by ProviderManager to keep its running cost total current
+        self.on_usage: Optional[Callable[[float], None]] = None
+        # Set by ProviderManager to learn which prompt prefixes the API cached
+        self.on_cached_prefix: Optional[Callable[[str, int], None]] = None
 
     @abstractmethod
     async def generate(self, prompt: str, **kwargs) -> str:
@@ -39,41 +106,305 @@ class Provider(ABC):
         pass
 
     def record_usage(self, tokens: int):
+        cost = self.estimate_cost(tokens)
         self.request_count += 1
         self.token_count += tokens
-        self.cost_estimate += self.estimate_cost(tokens)
+        self.cost_estimate += cost
+        if self.on_usage is not None:
+            self.on_usage(cost)
+
+    def record_cached_prefix(self, prefix_hash: Optional[str], usage: Any):
+        """Report the prompt tokens the API served from its cache for a tagged prefix"""
+        if prefix_hash is None or self.on_cached_prefix is None or usage is None:
+            return
+        details = getattr(usage, 'prompt_tokens_details', None)
+        self.on_cached_prefix(prefix_hash, getattr(details, 'cached_tokens', None) or 0)
+
+
+# Connection pool shared by every OpenAI client, so concurrent calls reuse
+# warm keep-alive connections; HTTP/2 multiplexing when h2 is installed
+HTTP_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=50, keepalive_expiry=30.0)
+HTTP_TIMEOUT = httpx.Timeout(120.0, connect=5.0)
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def shared_http_client() -> httpx.AsyncClient:
+    """The process-wide pooled HTTP client, created on first use"""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            http2=importlib.util.find_spec("h2") is not None,
+            limits=HTTP_LIMITS,
+            timeout=HTTP_TIMEOUT
+        )
+    return _http_client
+
+
+async def close_http_client():
+    """Close the shared HTTP client; the next provider call opens a new one"""
+    global _http_client
+    if _http_client is not None:
+        client, _http_client = _http_client, None
+        await client.aclose()
+
+
+# Ceiling for the jittered backoff after a 429
+MAX_RETRY_DELAY = 30.0
+# Defaults for the limiter shared by the global provider
+REQUESTS_PER_MINUTE = 500
+MAX_IN_FLIGHT = 16
+
+
+class RateLimiter:
+    """Async token bucket of `rate` requests per `period`, with a cap on requests in flight"""
+
+    def __init__(self, rate: int = REQUESTS_PER_MINUTE, period: float = 60.0, max_in_flight: int = MAX_IN_FLIGHT):
+        self.rate = rate
+        self.period = period
+        self._tokens = float(rate)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+        self._in_flight = asyncio.Semaphore(max_in_flight)
+
+    async def __aenter__(self):
+        await self._in_flight.acquire()
+        try:
+            await self._take_token()
+        except BaseException:
+            self._in_flight.release()
+            raise
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self._in_flight.release()
+
+    async def _take_token(self):
+        # Waiters queue on the lock, so tokens go out in arrival order
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.rate, self._tokens + (now - self._updated) * self.rate / self.period)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) * self.period / self.rate)
+
+
+# Instruction for packing several prompts into one completion
+BATCH_SYSTEM_PROMPT = (
+    "You will receive a JSON array of prompts. Answer each one independently and reply with "
+    "only a JSON array of strings: exactly one answer per prompt, in the same order."
+)
 
 
 class OpenAIProvider(Provider):
     """OpenAI provider implementation"""
 
-    def __init__(self, api_key: str, model: str = "gpt-4"):
+    # Rough (input, output) cost per 1K tokens (as of 2024); unknown models are priced as gpt-4
+    RATES = {
+        "gpt-4": (0.03, 0.06),
+        "gpt-3.5-turbo": (0.0015, 0.002),
+    }
+    # Assume 70% of tokens are output tokens for estimation
+    OUTPUT_TOKEN_SHARE = 0.7
+
+    def __init__(self, api_key: str, model: str = "gpt-4", cache: Optional[LLMCache] = None,
+                 limiter: Optional[RateLimiter] = None, http_client: Optional[httpx.AsyncClient] = None):
         super().__init__(api_key, model)
-        self.client = AsyncOpenAI(api_key=api_key)
+        # None means the shared pool, which is re-fetched once it has been closed
+        self._http_client = http_client
+        self._bind_client()
+        # Identical requests are answered from here instead of the API
+        self.cache = cache
+        # Throttles calls before they reach the API; may be shared between providers
+        self.limiter = limiter
+        input_rate, output_rate = self.RATES.get(model, self.RATES["gpt-4"])
+        self._cost_per_token = (
+            (1 - self.OUTPUT_TOKEN_SHARE) * input_rate + self.OUTPUT_TOKEN_SHARE * output_rate
+        ) / 1000
+
+    def _bind_client(self):
+        self._client_pool = self._http_client or shared_http_client()
+        self._client = AsyncOpenAI(api_key=self.api_key, http_client=self._client_pool)
+
+    @property
+    def client(self) -> AsyncOpenAI:
+        """The OpenAI client, rebuilt on a fresh shared pool after close_http_client()"""
+        if self._http_client is None and self._client_pool is not None and self._client_pool.is_closed:
+            self._bind_client()
+        return self._client
+
+    @client.setter
+    def client(self, client):
+        # An injected client is used as-is and never rebuilt
+        self._client = client
+        self._client_pool = None
 
     async def generate(self, prompt: str, **kwargs) -> str:
-        max_retries = kwargs.get('max_retries', 3)
-        retry_delay = kwargs.get('retry_delay', 1.0)
-
-        for attempt in range(max_retries):
-            try:
-                response = await self.client.chat.completions.create(
+        max_tokens = kwargs.get('max_tokens', 1000)
+        temperature = kwargs.get('temperature', 0.7)
+
+        cache = self.cache if kwargs.get('use_cache', True) else None
+        cache_key = None
+        if cache is not None:
+            cache_key = cache.make_key(self.model, temperature, max_tokens, prompt)
+            cached = cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        content = await self._complete(
+            [{"role": "user", "content": prompt}], max_tokens, temperature,
+            kwargs.get('max_retries', 3), kwargs.get('retry_delay', 1.0),
+            prefix_hash=kwargs.get('prefix_hash')
+        )
+        if cache is not None and content is not None:
+            cache.set(cache_key, content)
+        return content
+
+    async def generate_stream(self, prompt: str, **kwargs) -> AsyncIterator[str]:
+        """Yield the completion as it arrives; bypasses the cache and is not retried once started"""
+        tokens_used = 0
+        try:
+            async with self.limiter if self.limiter is not None else nullcontext():
+                stream = await self.client.chat.completions.create(
                     model=self.model,
                     messages=[{"role": "user", "content": prompt}],
                     max_tokens=kwargs.get('max_tokens', 1000),
-                    temperature=kwargs.get('temperature', 0.7)
+                    temperature=kwargs.get('temperature', 0.7),
+                    stream=True,
+                    # The final chunk then carries usage, for cost accounting
+                    stream_options={"include_usage": True}
                 )
+                async for chunk in stream:
+                    if chunk.usage:
+                        tokens_used = chunk.usage.total_tokens
+                        self.record_cached_prefix(kwargs.get('prefix_hash'), chunk.usage)
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+        except openai.RateLimitError as e:
+            raise RateLimitError(f"Rate limit exceeded: {e}")
+        except Exception as e:
+            raise ProviderError(f"OpenAI API error: {e}")
+        self.record_usage(tokens_used)
+
+    async def generate_batch(self, prompts: List[str], **kwargs) -> List[str]:
+        """Answer several prompts with one chat completion, in input order"""
+        max_tokens = kwargs.get('max_tokens', 1000)
+        temperature = kwargs.get('temperature', 0.7)
+        cache = self.cache if kwargs.get('use_cache', True) else None
+
+        # Answers are cached per prompt, exactly as generate() would cache them
+        answers: List[Optional[str]] = [None] * len(prompts)
+        keys: List[Optional[str]] = [None] * len(prompts)
+        if cache is not None:
+            for i, prompt in enumerate(prompts):
+                keys[i] = cache.make_key(self.model, temperature, max_tokens, prompt)
+                answers[i] = cache.get(keys[i])
+        pending = [i for i, answer in enumerate(answers) if answer is None]
+        if not pending:
+            return answers
+
+        content = await self._complete(
+            [
+                {"role": "system", "content": BATCH_SYSTEM_PROMPT},
+                {"role": "user", "content": _dumps([prompts[i] for i in pending]).decode("utf-8")},
+            ],
+            max_tokens * len(pending), temperature,
+            kwargs.get('max_retries', 3), kwargs.get('retry_delay', 1.0)
+        )
+        try:
+            results = _loads(content or "")
+        except json.JSONDecodeError as e:
+            raise ProviderError(f"Batch response is not a JSON array: {e}")
+        if not isinstance(results, list) or len(results) != len(pending):
+            raise ProviderError(f"Batch response has the wrong shape for {len(pending)} prompts")
+
+        for i, result in zip(pending, results):
+            answers[i] = result if isinstance(result, str) else _dumps(result).decode("utf-8")
+            if cache is not None:
+                cache.set(keys[i], answers[i])
+        return answers
+
+    async def submit_batch(self, prompts: List[str], **kwargs) -> str:
+        """Queue prompts on the Batch API (24h window, lower price); returns the batch id"""
+        lines = [
+            _dumps({
+                "custom_id": str(i),
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {
+                    "model": self.model,
+                    "messages": [{"role": "user", "content": prompt}],
+                    "max_tokens": kwargs.get('max_tokens', 1000),
+                    "temperature": kwargs.get('temperature', 0.7),
+                },
+            })
+            for i, prompt in enumerate(prompts)
+        ]
+        try:
+            batch_file = await self.client.files.create(
+                file=("batch.jsonl", b"\n".join(lines)), purpose="batch"
+            )
+            batch = await self.client.batches.create(
+                input_file_id=batch_file.id,
+                endpoint="/v1/chat/completions",
+                completion_window="24h"
+            )
+        except Exception as e:
+            raise ProviderError(f"OpenAI batch submission failed: {e}")
+        return batch.id
+
+    async def get_batch_results(self, batch_id: str) -> Optional[List[Optional[str]]]:
+        """Answers of a submitted batch in input order, or None while it is still running"""
+        try:
+            batch = await self.client.batches.retrieve(batch_id)
+            if batch.status != "completed":
+                if batch.status in ("failed", "expired", "cancelled"):
+                    raise ProviderError(f"Batch {batch_id} {batch.status}")
+                return None
+            output = await self.client.files.content(batch.output_file_id)
+        except ProviderError:
+            raise
+        except Exception as e:
+            raise ProviderError(f"OpenAI batch retrieval failed: {e}")
+
+        answers: List[Optional[str]] = [None] * batch.request_counts.total
+        for line in output.text.splitlines():
+            if not line.strip():
+                continue
+            record = _loads(line)
+            body = (record.get("response") or {}).get("body") or {}
+            choices = body.get("choices") or []
+            if choices:
+                answers[int(record["custom_id"])] = choices[0]["message"]["content"]
+                self.record_usage((body.get("usage") or {}).get("total_tokens", 0))
+        return answers
+
+    async def _complete(self, messages: List[Dict[str, str]], max_tokens: int, temperature: float,
+                        max_retries: int = 3, retry_delay: float = 1.0,
+                        prefix_hash: Optional[str] = None) -> str:
+        """One chat completion with retries; records usage and, for a tagged prefix, cached tokens"""
+        for attempt in range(max_retries):
+            try:
+                if self.limiter is not None:
+                    async with self.limiter:
+                        response = await self._create(messages, max_tokens, temperature)
+                else:
+                    response = await self._create(messages, max_tokens, temperature)
 
                 content = response.choices[0].message.content
                 # Record usage
                 tokens_used = response.usage.total_tokens if response.usage else 0
                 self.record_usage(tokens_used)
+                self.record_cached_prefix(prefix_hash, response.usage)
 
                 return content
 
             except openai.RateLimitError as e:
                 if attempt < max_retries - 1:
-                    await asyncio.sleep(retry_delay * (2 ** attempt))  # Exponential backoff
+                    # Full jitter, so concurrent callers don't retry in lockstep
+                    await asyncio.sleep(random.uniform(0, min(MAX_RETRY_DELAY, retry_delay * (2 ** attempt))))
                     continue
                 raise RateLimitError(f"Rate limit exceeded: {e}")
 
@@ -85,19 +416,55 @@ class OpenAIProvider(Provider):
 
         raise ProviderError("Max retries exceeded")
 
+    async def _create(self, messages: List[Dict[str, str]], max_tokens: int, temperature: float):
+        return await self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=temperature
+        )
+
     def estimate_cost(self, tokens: int) -> float:
-        # Rough cost estimates per 1K tokens (as of 2024)
-        costs = {
-            "gpt-4": {"input": 0.03, "output": 0.06},
-            "gpt-3.5-turbo": {"input": 0.0015, "output": 0.002},
-        }
+        return tokens * self._cost_per_token
+
+
+# Providers evict cached prompt prefixes after a few minutes of inactivity
+PREFIX_CACHE_TTL = 300
+# Bound on remembered prefixes; the least recently reported go first
+MAX_CACHED_PREFIXES = 1024
 
-        model_costs = costs.get(self.model, costs["gpt-4"])
-        # Assume 70% of tokens are output tokens for estimation
-        input_tokens = tokens * 0.3
-        output_tokens = tokens * 0.7
+# Circuit breaker: a provider that fails this many times in a row is skipped
+# for failover until RECOVERY_TIMEOUT seconds have passed
+FAILURE_THRESHOLD = 3
+RECOVERY_TIMEOUT = 60.0
+# Weight of the newest sample in a provider's latency average
+LATENCY_EWMA_ALPHA = 0.2
+# With hedging on, fallbacks start once the primary runs this much over its average
+HEDGE_LATENCY_FACTOR = 1.5
 
-        return (input_tokens * model_costs["input"] + output_tokens * model_costs["output"]) / 1000
+
+@dataclass
+class ProviderHealth:
+    """Latency and circuit-breaker state for one provider"""
+    latency_ewma: Optional[float] = None
+    consecutive_failures: int = 0
+    opened_at: Optional[float] = None
+
+    def available(self, now: float) -> bool:
+        return self.opened_at is None or now - self.opened_at >= RECOVERY_TIMEOUT
+
+    def record_success(self, latency: float):
+        if self.latency_ewma is None:
+            self.latency_ewma = latency
+        else:
+            self.latency_ewma += LATENCY_EWMA_ALPHA * (latency - self.latency_ewma)
+        self.consecutive_failures = 0
+        self.opened_at = None
+
+    def record_failure(self, now: float):
+        self.consecutive_failures += 1
+        if self.consecutive_failures >= FAILURE_THRESHOLD:
+            self.opened_at = now
 
 
 class ProviderManager:
@@ -107,12 +474,64 @@ class ProviderManager:
         self.providers: Dict[str, Provider] = {}
         self.default_provider = None
         self.failover_enabled = True
+        # Race fallbacks against a primary that is running slow; off by default
+        # because the duplicate requests are billed
+        self.hedge_requests = False
+        self.health: Dict[str, ProviderHealth] = {}
+        # Running sum of provider cost estimates, kept current by record_usage
+        self.total_estimated_cost = 0.0
+        # prefix hash -> (cached token count, recorded at), oldest first;
+        # provider prompt caches are short-lived, so entries expire after
+        # PREFIX_CACHE_TTL
+        self.cached_prefixes: OrderedDict[str, tuple] = OrderedDict()
 
     def add_provider(self, name: str, provider: Provider):
+        previous = self.providers.get(name)
+        if previous is not None:
+            previous.on_usage = None
+            previous.on_cached_prefix = None
+            self.total_estimated_cost -= previous.cost_estimate
+
         self.providers[name] = provider
+        self.health[name] = ProviderHealth()
+        provider.on_usage = self._add_cost
+        provider.on_cached_prefix = self.record_cached_prefix
+        self.total_estimated_cost += provider.cost_estimate
         if self.default_provider is None:
             self.default_provider = name
 
+    def _add_cost(self, cost: float):
+        self.total_estimated_cost += cost
+
+    def record_cached_prefix(self, prefix_hash: str, tokens: int):
+        """Remember how many tokens of a prompt prefix the provider served from its cache"""
+        now = time.time()
+        if tokens > 0:
+            self.cached_prefixes[prefix_hash] = (tokens, now)
+            self.cached_prefixes.move_to_end(prefix_hash)
+        else:
+            # A miss means the provider no longer holds this prefix
+            self.cached_prefixes.pop(prefix_hash, None)
+
+        # Entries are kept in report order, so expired ones are at the front
+        while self.cached_prefixes:
+            _, recorded_at = next(iter(self.cached_prefixes.values()))
+            if now - recorded_at <= PREFIX_CACHE_TTL and len(self.cached_prefixes) <= MAX_CACHED_PREFIXES:
+                break
+            self.cached_prefixes.popitem(last=False)
+
+    def lookup_cached_prefix_tokens(self, prefix_hash: str) -> int:
+        """Number of tokens likely served from the provider's prompt cache"""
+        entry = self.cached_prefixes.get(prefix_hash)
+        if entry is None:
+            return 0
+
+        tokens, recorded_at = entry
+        if time.time() - recorded_at > PREFIX_CACHE_TTL:
+            del self.cached_prefixes[prefix_hash]
+            return 0
+        return tokens
+
     def set_default_provider(self, name: str):
         if name in self.providers:
             self.default_provider = name
@@ -124,24 +543,73 @@ class ProviderManager:
         if not provider_name or provider_name not in self.providers:
             raise ProviderError(f"Provider {provider_name} not available")
 
-        provider = self.providers[provider_name]
+        now = time.monotonic()
+        fallbacks = [
+            name for name in self.providers
+            if name != provider_name and self.health[name].available(now)
+        ] if self.failover_enabled else []
+
+        primary = asyncio.ensure_future(self._timed_generate(provider_name, prompt, **kwargs))
+
+        hedge_after = self._hedge_delay(provider_name) if fallbacks else None
+        if hedge_after is not None:
+            done, _ = await asyncio.wait({primary}, timeout=hedge_after)
+            if not done:
+                print(f"Hedging provider {provider_name} with {', '.join(fallbacks)}")
+                return await self._first_success(
+                    [primary] + [self._start(name, prompt, **kwargs) for name in fallbacks]
+                )
 
         try:
-            return await provider.generate(prompt, **kwargs)
+            return await primary
         except RateLimitError as e:
-            if self.failover_enabled:
-                # Try other providers
-                for name, fallback_provider in self.providers.items():
-                    if name != provider_name:
-                        try:
-                            print(f"Failing over to provider {name}")
-                            return await fallback_provider.generate(prompt, **kwargs)
-                        except Exception:
-                            continue
-            raise e
-        except Exception as e:
+            if fallbacks:
+                # Try the other providers at once; the first answer wins
+                print(f"Failing over to providers {', '.join(fallbacks)}")
+                try:
+                    return await self._first_success([self._start(name, prompt, **kwargs) for name in fallbacks])
+                except Exception:
+                    pass
             raise e
 
+    def _start(self, name: str, prompt: str, **kwargs) -> asyncio.Task:
+        return asyncio.ensure_future(self._timed_generate(name, prompt, **kwargs))
+
+    async def _timed_generate(self, name: str, prompt: str, **kwargs) -> str:
+        """Generate with one provider, updating its latency and circuit state"""
+        health = self.health[name]
+        started = time.monotonic()
+        try:
+            result = await self.providers[name].generate(prompt, **kwargs)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            health.record_failure(time.monotonic())
+            raise
+        health.record_success(time.monotonic() - started)
+        return result
+
+    def _hedge_delay(self, name: str) -> Optional[float]:
+        latency = self.health[name].latency_ewma
+        if not self.hedge_requests or latency is None:
+            return None
+        return latency * HEDGE_LATENCY_FACTOR
+
+    @staticmethod
+    async def _first_success(tasks: List[asyncio.Future]) -> str:
+        """Result of the first task to succeed; the rest are cancelled"""
+        last_error: Optional[BaseException] = None
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                try:
+                    return await next_done
+                except Exception as e:
+                    last_error = e
+        finally:
+            for task in tasks:
+                task.cancel()
+        raise last_error or ProviderError("No provider available")
+
     def get_usage_stats(self) -> Dict[str, Dict[str, Any]]:
         stats = {}
         for name, provider in self.providers.items():
@@ -151,6 +619,10 @@ class ProviderManager:
                 "estimated_cost": provider.cost_estimate,
                 "model": provider.model
             }
+            cache = getattr(provider, "cache", None)
+            if cache is not None:
+                stats[name]["cache_hits"] = cache.hits
+                stats[name]["cache_misses"] = cache.misses
         return stats
 
     def reset_usage_stats(self):
@@ -158,6 +630,7 @@ class ProviderManager:
             provider.request_count = 0
             provider.token_count = 0
             provider.cost_estimate = 0.0
+        self.total_estimated_cost = 0.0
 
 
 # Global provider manager instance
@@ -166,7 +639,7 @@ provider_manager = ProviderManager()
 # Initialize with OpenAI if API key is available
 openai_key = os.getenv("OPENAI_API_KEY")
 if openai_key:
-    openai_provider = OpenAIProvider(openai_key, "gpt-4")
+    openai_provider = OpenAIProvider(openai_key, "gpt-4", cache=LLMCache(), limiter=RateLimiter())
     provider_manager.add_provider("openai", openai_provider)
 else:
     print("Warning: OPENAI_API_KEY not found, LLM functionality will be limited")
@@ -177,6 +650,34 @@ async def generate_with_provider(prompt: str, **kwargs) -> str:
     return await provider_manager.generate(prompt, **kwargs)
 
 
+def _named_provider(provider_name: Optional[str]) -> Provider:
+    provider_name = provider_name or provider_manager.default_provider
+    provider = provider_manager.providers.get(provider_name) if provider_name else None
+    if provider is None:
+        raise ProviderError(f"Provider {provider_name} not available")
+    return provider
+
+
+async def generate_batch_with_provider(prompts: List[str], provider_name: Optional[str] = None, **kwargs) -> List[str]:
+    """Answer several prompts in one request, falling back to one call each for providers without batching"""
+    provider = _named_provider(provider_name)
+    if isinstance(provider, OpenAIProvider):
+        return await provider.generate_batch(prompts, **kwargs)
+    return [await provider.generate(prompt, **kwargs) for prompt in prompts]
+
+
+def stream_with_provider(prompt: str, provider_name: Optional[str] = None, **kwargs) -> AsyncIterator[str]:
+    """Stream a completion; the provider is resolved up front so a bad name fails before streaming"""
+    provider = _named_provider(provider_name)
+    if isinstance(provider, OpenAIProvider):
+        return provider.generate_stream(prompt, **kwargs)
+    return _single_chunk(provider, prompt, kwargs)
+
+
+async def _single_chunk(provider: Provider, prompt: str, kwargs: Dict[str, Any]) -> AsyncIterator[str]:
+    yield await provider.generate(prompt, **kwargs)
+
+
 def get_provider_stats() -> Dict[str, Dict[str, Any]]:
     """Get usage statistics for all providers"""
     return provider_manager.get_usage_stats()
\ No newline at end of file
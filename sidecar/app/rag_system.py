@@ -1,42 +1,77 @@
 from __future__ import annotations
 
 import json
+import re
+import zlib
+from collections import Counter
+from itertools import islice, takewhile
 from typing import Dict, List, Any, Optional
-from .memory_store import MemoryStore
+
+import numpy as np
+
+from .memory_store import BYTES_PER_TOKEN, MemoryStore
 from .providers import generate_with_provider
 
+try:  # optional accelerator for measuring serialized items
+    import orjson
+
+    def _json_bytes(obj: Any) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+except ImportError:
+    def _json_bytes(obj: Any) -> bytes:
+        return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+# Stored decisions arrive from MemoryStore with their token estimate under
+# this key, so they are never re-serialized to be measured
+TOKEN_ESTIMATE_KEY = "tokens"
+
+# Stored decisions are embedded locally by feature hashing: no model to load,
+# stable across processes, and any token shared with the query scores above zero
+DECISION_EMBEDDING_KIND = "decision"
+EMBEDDING_DIM = 384
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def embed_text(text: str) -> Optional[np.ndarray]:
+    """Hashed bag-of-words vector for text, or None if it has no tokens"""
+    vec = np.zeros(EMBEDDING_DIM, dtype=np.float32)
+    for token in _TOKEN_RE.findall(text.lower()):
+        vec[zlib.crc32(token.encode("utf-8")) % EMBEDDING_DIM] += 1.0
+    return vec if vec.any() else None
+
+
+def decision_text(spec: Dict[str, Any]) -> str:
+    """Text of a TaskSpec that retrieval matches against"""
+    return " ".join([spec.get("goal", ""), *spec.get("constraints_inferred", [])])
+
 
 class RAGPolicy:
     """Policy for Retrieval-Augmented Generation"""
 
-    def __init__(self, token_budget: int = 2000):
+    def __init__(self, token_budget: int = 2000, memory_store: Optional[MemoryStore] = None):
         self.token_budget = token_budget
-        self.memory_store = MemoryStore()
+        self.memory_store = memory_store or MemoryStore()
 
-    def retrieve_context(self, query: str, context_type: str = "general", max_items: int = 5) -> Dict[str, Any]:
+    def retrieve_context(self, query: str, context_type: str = "general", max_items: int = 5,
+                         project: str = "current_project") -> Dict[str, Any]:
         """Retrieve relevant context for a query"""
-        # For now, use simple keyword matching
-        # In practice, this would use semantic search with embeddings
-
-        query_lower = query.lower()
-
-        # Search decisions
-        decisions = self.memory_store.get_decisions("current_project", limit=20)
-        relevant_decisions = []
+        # Search decisions through the store's term index
+        relevant_decisions = self.memory_store.search_decisions(project, query, limit=max_items)
 
-        for decision in decisions:
-            spec_text = json.dumps(decision['spec']).lower()
-            if any(keyword in spec_text for keyword in query_lower.split()):
-                relevant_decisions.append(decision)
-                if len(relevant_decisions) >= max_items:
-                    break
-
-        # Search similar embeddings if available
+        # Search similar embeddings if available; over-fetch, then keep this project's
         similar_items = []
-        # This would use vector search in a full implementation
+        query_vec = embed_text(query)
+        if query_vec is not None:
+            hits = self.memory_store.search_similar(query_vec, DECISION_EMBEDDING_KIND, top_k=max_items * 4)
+            # Hits are best-first: stop at the first non-positive score or once max_items match
+            positive = takewhile(lambda hit: hit["similarity"] > 0, hits)
+            similar_items = list(islice(
+                (hit for hit in positive if hit["meta"].get("project") == project), max_items
+            ))
 
         return {
-            "decisions": relevant_decisions[:max_items],
+            "decisions": relevant_decisions,
             "similar_items": similar_items,
             "total_tokens": self._estimate_tokens(relevant_decisions + similar_items)
         }
@@ -45,7 +80,10 @@ class RAGPolicy:
         """Estimate token count of retrieved items"""
         total = 0
         for item in items:
-            total += len(json.dumps(item)) // 4  # Rough token estimation
+            estimate = item.get(TOKEN_ESTIMATE_KEY)
+            if estimate is None:
+                estimate = len(_json_bytes(item)) // BYTES_PER_TOKEN
+            total += estimate
         return total
 
     def should_retrieve(self, query_complexity: str, available_tokens: int) -> bool:
@@ -80,107 +118,100 @@ class RAGPolicy:
 class RAGEnrichment:
     """Enrich TaskSpecs with RAG-retrieved information"""
 
-    def __init__(self):
-        self.rag_policy = RAGPolicy()
-        self.memory_store = MemoryStore()
+    def __init__(self, rag_policy: Optional[RAGPolicy] = None):
+        self.rag_policy = rag_policy or RAGPolicy()
+        # Shared so decisions stored here are visible to the policy's vector index
+        self.memory_store = self.rag_policy.memory_store
 
     def enrich_taskspec(self, taskspec: Dict[str, Any], project_context: str = "current_project") -> Dict[str, Any]:
         """Enrich a TaskSpec with historical patterns and examples"""
         enriched = taskspec.copy()
+        enriched.update(self.enrichment_updates(
+            taskspec.get("goal", ""),
+            taskspec.get("constraints_inferred", []),
+            taskspec.get("edge_cases", []),
+            project_context
+        ))
+        return enriched
+
+    def enrichment_updates(self, goal: str, constraints_inferred: List[str], edge_cases: List[str],
+                           project_context: str = "current_project") -> Dict[str, Any]:
+        """Fields an enriched TaskSpec would change, without copying the spec"""
+        updates: Dict[str, Any] = {}
 
         # Extract key terms from the goal for retrieval
-        query = taskspec.get("goal", "")
-        if not query:
-            return enriched
+        if not goal:
+            return updates
 
         # Retrieve relevant context
-        context = self.rag_policy.retrieve_context(query, "taskspec")
+        context = self.rag_policy.retrieve_context(goal, "taskspec", project=project_context)
 
         # Enrich constraints_inferred with patterns
         patterns = self._extract_patterns_from_context(context)
         if patterns:
-            existing = enriched.get("constraints_inferred", [])
-            enriched["constraints_inferred"] = existing + patterns
+            updates["constraints_inferred"] = constraints_inferred + patterns
 
         # Add edge cases from similar past tasks
-        edge_cases = self._extract_edge_cases_from_context(context)
-        if edge_cases:
-            existing = enriched.get("edge_cases", [])
-            enriched["edge_cases"] = existing + edge_cases
+        similar_edge_cases = self._extract_edge_cases_from_context(context)
+        if similar_edge_cases:
+            updates["edge_cases"] = edge_cases + similar_edge_cases
 
         # Add examples from similar successful tasks
         examples = self._extract_examples_from_context(context)
         if examples:
-            enriched["examples"] = examples
+            updates["examples"] = examples
 
-        return enriched
+        return updates
 
     def _extract_patterns_from_context(self, context: Dict[str, Any]) -> List[str]:
         """Extract common patterns from historical decisions"""
-        patterns = []
-
         decisions = context.get("decisions", [])
         if len(decisions) < 2:
-            return patterns
+            return []
 
         # Look for common constraints across similar tasks
-        constraint_counts = {}
-
-        for decision in decisions:
-            spec = decision.get("spec", {})
-            constraints = spec.get("constraints_inferred", [])
-
-            for constraint in constraints:
-                constraint_counts[constraint] = constraint_counts.get(constraint, 0) + 1
+        constraint_counts = Counter(
+            constraint
+            for decision in decisions
+            for constraint in decision.get("spec", {}).get("constraints_inferred", [])
+        )
 
         # Add constraints that appear in multiple similar tasks
-        for constraint, count in constraint_counts.items():
-            if count >= 2:  # Appears in at least 2 similar tasks
-                patterns.append(f"Pattern: {constraint}")
-
-        return patterns
+        return [f"Pattern: {constraint}" for constraint, count in constraint_counts.items() if count >= 2]
 
     def _extract_edge_cases_from_context(self, context: Dict[str, Any]) -> List[str]:
         """Extract edge cases from historical decisions"""
-        edge_cases = []
-
-        decisions = context.get("decisions", [])
-
-        for decision in decisions:
-            spec = decision.get("spec", {})
-            cases = spec.get("edge_cases", [])
-
-            for case in cases:
-                if case not in edge_cases:
-                    edge_cases.append(case)
-
-        return edge_cases[:5]  # Limit to 5 most relevant
+        # dict.fromkeys drops repeats while keeping first-seen order
+        edge_cases = dict.fromkeys(
+            case
+            for decision in context.get("decisions", [])
+            for case in decision.get("spec", {}).get("edge_cases", [])
+        )
+        return list(edge_cases)[:5]  # Limit to 5 most relevant
 
     def _extract_examples_from_context(self, context: Dict[str, Any]) -> List[str]:
         """Extract successful examples from historical decisions"""
-        examples = []
-
-        decisions = context.get("decisions", [])
-
-        for decision in decisions:
-            spec = decision.get("spec", {})
-            goal = spec.get("goal", "")
-
-            # Create example from successful past decisions
-            if goal:
-                examples.append(f"Similar task: {goal}")
-
+        # Create example from successful past decisions
+        examples = [
+            f"Similar task: {goal}"
+            for goal in (decision.get("spec", {}).get("goal", "") for decision in context.get("decisions", []))
+            if goal
+        ]
         return examples[:3]  # Limit to 3 examples
 
     def store_successful_taskspec(self, taskspec: Dict[str, Any], project: str = "current_project"):
         """Store a successful TaskSpec for future RAG retrieval"""
-        self.memory_store.store_decision(project, taskspec)
-
-        # Extract and store patterns for future enrichment
-        goal = taskspec.get("goal", "")
-        if goal:
-            # In a full implementation, this would create embeddings for semantic search
-            pass
+        decision_id = self.memory_store.store_decision(project, taskspec)
+
+        # Embed the goal and constraints for similarity retrieval
+        vector = embed_text(decision_text(taskspec))
+        if vector is not None:
+            self.memory_store.store_embedding(
+                str(decision_id),
+                DECISION_EMBEDDING_KIND,
+                vector,
+                meta={"project": project, "goal": taskspec.get("goal", "")}
+            )
 
     def get_rag_stats(self) -> Dict[str, Any]:
         """Get RAG system statistics"""
@@ -194,4 +225,5 @@ class RAGEnrichment:
 
 # Global instances
 rag_policy = RAGPolicy()
-rag_enrichment = RAGEnrichment()
\ No newline at end of file
+# One store for both singletons rather than opening the database twice
+rag_enrichment = RAGEnrichment(rag_policy)
\ No newline at end of file
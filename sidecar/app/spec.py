@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from functools import lru_cache
 from typing import Any, Optional
 
 from .models import TranscodeRequest
@@ -25,23 +26,22 @@ def _infer_defaults(style_profile: Optional[dict]) -> dict[str, Any]:
     }
 
 
-def generate_spec(req: TranscodeRequest) -> dict:
-    goal = req.prompt.strip()
+_PROFILE_FIELDS = ("naming_conventions", "testing_strategy", "style_guides", "design_patterns")
 
-    inferred = [
-        "follow personal style profile",
-        "enforce explicit error handling policy",
-        "prefer small, pure functions where possible",
-    ]
 
-    defaults = _infer_defaults(req.style_profile)
+def _build_template(style_profile: Optional[dict]) -> dict[str, Any]:
+    defaults = _infer_defaults(style_profile)
 
-    spec: dict[str, Any] = {
-        "goal": goal,
+    return {
+        "goal": "",
         "inputs": [],
         "outputs": [],
         "constraints_explicit": [],
-        "constraints_inferred": inferred,
+        "constraints_inferred": [
+            "follow personal style profile",
+            "enforce explicit error handling policy",
+            "prefer small, pure functions where possible",
+        ],
         "libraries_preferred": [],
         "libraries_forbidden": [],
         "style_guides": defaults["style_guides"],
@@ -49,11 +49,48 @@ def generate_spec(req: TranscodeRequest) -> dict:
         "design_patterns": defaults["design_patterns"],
         "testing_strategy": defaults["testing_strategy"],
         "edge_cases": [],
-        "verbosity": req.verbosity,
+        "verbosity": "normal",
         "open_questions": [],
     }
 
-    return spec
+
+_DEFAULT_TEMPLATE = _build_template(None)
+
+
+def _freeze(value: Any) -> Any:
+    return tuple(value) if isinstance(value, list) else value
 
 
+@lru_cache(maxsize=32)
+def _profile_template(profile_key: tuple) -> dict[str, Any]:
+    return _build_template({
+        field: list(value) if isinstance(value, tuple) else value
+        for field, value in profile_key
+    })
 
+
+def _template(style_profile: Optional[dict]) -> dict[str, Any]:
+    if not isinstance(style_profile, dict):
+        return _DEFAULT_TEMPLATE
+    # Only the fields _infer_defaults reads can change the template
+    profile_key = tuple(
+        (field, _freeze(style_profile[field]))
+        for field in _PROFILE_FIELDS
+        if field in style_profile
+    )
+    try:
+        return _profile_template(profile_key)
+    except TypeError:  # unhashable profile values
+        return _build_template(style_profile)
+
+
+def generate_spec(req: TranscodeRequest) -> dict:
+    """Spec for a prompt, built from the cached template for its style profile"""
+    # Fresh lists, so changes to one spec never reach the template or later specs
+    spec = {
+        key: list(value) if isinstance(value, list) else value
+        for key, value in _template(req.style_profile).items()
+    }
+    spec["goal"] = req.prompt.strip()
+    spec["verbosity"] = req.verbosity
+    return spec
@@ -3,11 +3,64 @@ from __future__ import annotations
 from typing import Any, Dict, List, Optional
 import json
 import os
+import re
+from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
 
 from .models import TaskSpec
 from .rag_system import rag_enrichment
 
+try:  # optional accelerator for reading the style profile
+    from orjson import loads as _loads
+except ImportError:
+    _loads = json.loads
+
+
+# Library mentions in prompts, compiled once; matched against the lowercased prompt
+_AVOID_PATTERNS = tuple(re.compile(pattern) for pattern in (
+    r'avoid\s+(?:using\s+)?([^\s,.]+)',
+    r'don\'t\s+use\s+([^\s,.]+)',
+    r'forbid\s+([^\s,.]+)',
+    r'no\s+([^\s,.]+)',
+    r'without\s+([^\s,.]+)'
+))
+_PREFER_PATTERNS = tuple(re.compile(pattern) for pattern in (
+    r'(?:prefer|use)\s+(?:the\s+)?([^\s,.]+)',
+    r'(?:must|should)\s+use\s+([^\s,.]+)',
+    r'with\s+([^\s,.]+)',
+    r'using\s+([^\s,.]+)'
+))
+_NOT_LIBRARIES = frozenset(['the', 'a', 'an', 'to', 'and', 'or'])
+
+
+@dataclass(slots=True)
+class _AnalysisMetrics:
+    """The analysis signals every scoring helper reads, extracted once"""
+    duplication: int
+    complexity: int
+    coverage: float
+    todos: int
+
+    @classmethod
+    def from_analysis(cls, analysis_data: Dict[str, Any]) -> "_AnalysisMetrics":
+        return cls(
+            duplication=analysis_data.get("duplication", 0),
+            complexity=analysis_data.get("complexity", {}).get("complexity_score", 0),
+            coverage=analysis_data.get("test_gap", {}).get("test_coverage_ratio", 1.0),
+            todos=analysis_data.get("todos_dead_code", {}).get("todos", 0),
+        )
+
+
+@lru_cache(maxsize=1)
+def _read_style_profile(path: str, mtime_ns: int) -> Optional[Dict[str, Any]]:
+    # Keyed on mtime so an edited profile is picked up; None if unreadable
+    try:
+        with open(path, 'rb') as f:
+            return _loads(f.read())
+    except (json.JSONDecodeError, IOError):
+        return None
+
 
 class SpecGenerator:
     """Generate TaskSpecs from clustered signals and analysis data"""
@@ -18,13 +71,12 @@ class SpecGenerator:
     def _load_style_profile(self) -> Dict[str, Any]:
         """Load user style profile from local JSON file"""
         profile_path = Path.home() / ".aeiou" / "style_profile.json"
-        if profile_path.exists():
-            try:
-                with open(profile_path, 'r') as f:
-                    return json.load(f)
-            except (json.JSONDecodeError, IOError):
-                pass
-        return self._get_default_style_profile()
+        try:
+            mtime_ns = profile_path.stat().st_mtime_ns
+        except OSError:
+            return self._get_default_style_profile()
+        profile = _read_style_profile(str(profile_path), mtime_ns)
+        return profile if profile is not None else self._get_default_style_profile()
 
     def _get_default_style_profile(self) -> Dict[str, Any]:
         """Get default style profile"""
@@ -44,8 +96,10 @@ class SpecGenerator:
         filepath = analysis_data.get("filepath", "")
         filename = os.path.basename(filepath) if filepath else "unknown"
 
+        metrics = _AnalysisMetrics.from_analysis(analysis_data)
+
         # Determine goal based on analysis
-        goal = self._infer_goal_from_analysis(analysis_data, filename)
+        goal = self._infer_goal_from_analysis(metrics, filename)
 
         # Parse explicit constraints from any available prompt
         prompt = analysis_data.get("prompt", "")
@@ -61,25 +115,22 @@ class SpecGenerator:
         open_questions = []
 
         # Process duplication issues
-        if analysis_data.get("duplication", 0) > 3:
+        if metrics.duplication > 3:
             constraints_inferred.append("Address code duplication")
             open_questions.append("Which duplicated sections should be refactored into shared functions?")
 
         # Process complexity issues
-        complexity = analysis_data.get("complexity", {})
-        if complexity.get("complexity_score", 0) > 50:
+        if metrics.complexity > 50:
             constraints_inferred.append("Reduce function complexity")
             open_questions.append("How can this complex function be broken down?")
 
         # Process test gaps
-        test_gap = analysis_data.get("test_gap", {})
-        if test_gap.get("test_coverage_ratio", 1.0) < 0.5:
+        if metrics.coverage < 0.5:
             constraints_inferred.append("Improve test coverage")
             open_questions.append("Which functions need test cases?")
 
         # Process TODO items
-        todos_dead_code = analysis_data.get("todos_dead_code", {})
-        if todos_dead_code.get("todos", 0) > 2:
+        if metrics.todos > 2:
             constraints_inferred.append("Address outstanding TODO items")
             open_questions.append("Which TODO items should be prioritized?")
 
@@ -89,19 +140,19 @@ class SpecGenerator:
             f"Follow {guide}" for guide in style_profile.get("style_guides", [])
         ])
 
-        # Merge parsed libraries with style profile
-        all_preferred = list(set(
+        # Merge parsed libraries with style profile; first mention wins, so output is deterministic
+        all_preferred = list(dict.fromkeys(
             parsed_constraints['libraries_preferred'] +
             style_profile.get("libraries_preferred", [])
         ))
-        all_forbidden = list(set(
+        all_forbidden = list(dict.fromkeys(
             parsed_constraints['libraries_forbidden'] +
             style_profile.get("libraries_forbidden", [])
         ))
 
         # Calculate risk and priority
-        risk_level = self._calculate_risk(analysis_data)
-        priority = self._calculate_priority(analysis_data)
+        risk_level = self._calculate_risk(metrics)
+        priority = self._calculate_priority(metrics)
 
         # Create initial TaskSpec
         taskspec = TaskSpec(
@@ -121,25 +172,27 @@ class SpecGenerator:
             open_questions=open_questions,
             risk=risk_level,
             priority=priority,
-            estimated_cost=self._estimate_cost(analysis_data)
+            estimated_cost=self._estimate_cost(metrics)
         )
 
-        # Enrich with RAG-retrieved information
-        enriched_taskspec = rag_enrichment.enrich_taskspec(taskspec.dict(), "current_project")
-
-        return TaskSpec(**enriched_taskspec)
+        # Enrich with RAG-retrieved information; only the changed fields are copied
+        updates = rag_enrichment.enrichment_updates(
+            taskspec.goal, taskspec.constraints_inferred, taskspec.edge_cases, "current_project"
+        )
+        updates.pop("examples", None)  # not a TaskSpec field
+        return taskspec.model_copy(update=updates) if updates else taskspec
 
-    def _infer_goal_from_analysis(self, analysis_data: Dict[str, Any], filename: str) -> str:
+    def _infer_goal_from_analysis(self, metrics: _AnalysisMetrics, filename: str) -> str:
         """Infer the main goal from analysis data"""
         issues = []
 
-        if analysis_data.get("duplication", 0) > 3:
+        if metrics.duplication > 3:
             issues.append("refactor duplicated code")
-        if analysis_data.get("complexity", {}).get("complexity_score", 0) > 50:
+        if metrics.complexity > 50:
             issues.append("simplify complex functions")
-        if analysis_data.get("test_gap", {}).get("test_coverage_ratio", 1.0) < 0.5:
+        if metrics.coverage < 0.5:
             issues.append("add missing tests")
-        if analysis_data.get("todos_dead_code", {}).get("todos", 0) > 2:
+        if metrics.todos > 2:
             issues.append("address TODO items")
 
         if issues:
@@ -147,25 +200,24 @@ class SpecGenerator:
         else:
             return f"Maintain code quality in {filename}"
 
-    def _calculate_risk(self, analysis_data: Dict[str, Any]) -> str:
+    def _calculate_risk(self, metrics: _AnalysisMetrics) -> str:
         """Calculate risk level based on analysis"""
         risk_score = 0
 
         # High complexity increases risk
-        if analysis_data.get("complexity", {}).get("complexity_score", 0) > 100:
+        if metrics.complexity > 100:
             risk_score += 3
-        elif analysis_data.get("complexity", {}).get("complexity_score", 0) > 50:
+        elif metrics.complexity > 50:
             risk_score += 2
 
         # Low test coverage increases risk
-        test_ratio = analysis_data.get("test_gap", {}).get("test_coverage_ratio", 1.0)
-        if test_ratio < 0.3:
+        if metrics.coverage < 0.3:
             risk_score += 3
-        elif test_ratio < 0.5:
+        elif metrics.coverage < 0.5:
             risk_score += 2
 
         # Many TODOs indicate technical debt
-        if analysis_data.get("todos_dead_code", {}).get("todos", 0) > 5:
+        if metrics.todos > 5:
             risk_score += 2
 
         if risk_score >= 5:
@@ -175,22 +227,22 @@ class SpecGenerator:
         else:
             return "low"
 
-    def _calculate_priority(self, analysis_data: Dict[str, Any]) -> str:
+    def _calculate_priority(self, metrics: _AnalysisMetrics) -> str:
         """Calculate priority based on analysis"""
         priority_score = 0
 
         # Critical issues get high priority
-        if analysis_data.get("duplication", 0) > 10:
+        if metrics.duplication > 10:
             priority_score += 3
-        if analysis_data.get("complexity", {}).get("complexity_score", 0) > 100:
+        if metrics.complexity > 100:
             priority_score += 3
-        if analysis_data.get("test_gap", {}).get("test_coverage_ratio", 1.0) < 0.2:
+        if metrics.coverage < 0.2:
             priority_score += 3
 
         # Medium priority issues
-        if analysis_data.get("duplication", 0) > 5:
+        if metrics.duplication > 5:
             priority_score += 2
-        if analysis_data.get("complexity", {}).get("complexity_score", 0) > 50:
+        if metrics.complexity > 50:
             priority_score += 2
 
         if priority_score >= 6:
@@ -200,20 +252,18 @@ class SpecGenerator:
         else:
             return "low"
 
-    def _estimate_cost(self, analysis_data: Dict[str, Any]) -> str:
+    def _estimate_cost(self, metrics: _AnalysisMetrics) -> str:
         """Estimate implementation cost"""
         cost_score = 0
 
         # Complexity affects cost
-        complexity_score = analysis_data.get("complexity", {}).get("complexity_score", 0)
-        cost_score += complexity_score // 10
+        cost_score += metrics.complexity // 10
 
         # Duplication affects cost
-        cost_score += analysis_data.get("duplication", 0) // 2
+        cost_score += metrics.duplication // 2
 
         # Test gaps affect cost
-        test_ratio = analysis_data.get("test_gap", {}).get("test_coverage_ratio", 1.0)
-        if test_ratio < 0.5:
+        if metrics.coverage < 0.5:
             cost_score += 2
 
         if cost_score > 10:
@@ -290,33 +340,15 @@ class SpecGenerator:
         lower_prompt = prompt.lower()
 
         # Parse "avoid/forbid" patterns
-        import re
-        avoid_patterns = [
-            r'avoid\s+(?:using\s+)?([^\s,.]+)',
-            r'don\'t\s+use\s+([^\s,.]+)',
-            r'forbid\s+([^\s,.]+)',
-            r'no\s+([^\s,.]+)',
-            r'without\s+([^\s,.]+)'
-        ]
-
-        for pattern in avoid_patterns:
-            matches = re.findall(pattern, lower_prompt)
-            for match in matches:
-                if match not in ['the', 'a', 'an', 'to', 'and', 'or']:
+        for pattern in _AVOID_PATTERNS:
+            for match in pattern.findall(lower_prompt):
+                if match not in _NOT_LIBRARIES:
                     libraries_forbidden.append(match.strip())
 
         # Parse "prefer/use" patterns
-        prefer_patterns = [
-            r'(?:prefer|use)\s+(?:the\s+)?([^\s,.]+)',
-            r'(?:must|should)\s+use\s+([^\s,.]+)',
-            r'with\s+([^\s,.]+)',
-            r'using\s+([^\s,.]+)'
-        ]
-
-        for pattern in prefer_patterns:
-            matches = re.findall(pattern, lower_prompt)
-            for match in matches:
-                if match not in ['the', 'a', 'an', 'to', 'and', 'or']:
+        for pattern in _PREFER_PATTERNS:
+            for match in pattern.findall(lower_prompt):
+                if match not in _NOT_LIBRARIES:
                     libraries_preferred.append(match.strip())
 
         # Parse other explicit constraints
@@ -1,16 +1,71 @@
 from __future__ import annotations
 
+import itertools
+import re
+import shlex
 import subprocess
 import tempfile
+import time
 import os
 import shutil
 from pathlib import Path
-from typing import Dict, List, Any, Optional, Tuple
-from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Any, Optional, Tuple, Union
+from dataclasses import dataclass, field
+from functools import lru_cache
 from datetime import datetime
 
 
-@dataclass
+# Diff parsing and content patterns, compiled once
+_FILE_B_RE = re.compile(r'b/(.+)')
+# Content patterns; [^\S\n] keeps a match within one line when run over a
+# diff body joined by newlines
+_FUNCTION_RE = re.compile(r'(?:def|function|class)[^\S\n]+\w+')
+_IMPORT_RE = re.compile(r'(?:import|from)[^\S\n]+\w+')
+_COMMENT_RE = re.compile(r'#|//|/\*|\*/')
+_CONTENT_INSIGHTS = (
+    (_FUNCTION_RE, "Modified function definitions"),
+    (_IMPORT_RE, "Updated imports"),
+    (_COMMENT_RE, "Modified comments/documentation"),
+)
+# Risk level by score; scores run 0-7 and 3 and 5 are the thresholds
+_RISK_LEVELS = ('low', 'low', 'low', 'medium', 'medium', 'high', 'high', 'high')
+# Lockfiles, minified bundles, images and generated code: their content says
+# nothing worth narrating, so only their line counts are kept
+SKIPPED_FILE_SUFFIXES = (
+    '.lock', '.min.js', '.min.css', '.map', '.png', '.jpg', '.jpeg', '.gif', '.ico', '.pdf', '.svg',
+    '.pb.go', '_pb2.py'
+)
+SKIPPED_FILE_NAMES = frozenset({'package-lock.json', 'pnpm-lock.yaml', 'go.sum'})
+SKIPPED_NARRATION = "Binary/generated file (skipped)"
+# Narrated diffs kept per VCSOperations, keyed by the commit SHAs of both ends
+NARRATED_DIFF_CACHE_SIZE = 128
+
+
+def _is_skipped_path(path: str) -> bool:
+    """Whether a file is generated or binary by its name alone"""
+    name = path.rpartition('/')[2]
+    return name in SKIPPED_FILE_NAMES or name.endswith(SKIPPED_FILE_SUFFIXES)
+
+
+def _is_line_range(text: str) -> bool:
+    """Whether text is a hunk range, 'start' or 'start,count'"""
+    start, comma, count = text.partition(',')
+    return start.isdecimal() and (not comma or count.isdecimal())
+
+
+def _hunk_new_start(line: str) -> Optional[int]:
+    """New-file start line of a '@@ -a[,b] +c[,d] @@' header, or None if malformed"""
+    # Split on the fixed separators rather than running a regex per hunk
+    if not line.startswith('@@ -'):
+        return None
+    old_range, plus, rest = line[4:].partition(' +')
+    new_range, close, _ = rest.partition(' @@')
+    if not (plus and close and _is_line_range(old_range) and _is_line_range(new_range)):
+        return None
+    return int(new_range.partition(',')[0])
+
+
+@dataclass(slots=True)
 class VCSDiff:
     """Represents a VCS diff with narration"""
     file_path: str
@@ -19,9 +74,18 @@ class VCSDiff:
     hunks: List[Dict[str, Any]]
     narration: str
     risk_level: str
+    # Body lines of every hunk in order; each hunk's 'line_slice' indexes into it
+    lines: List[str] = field(default_factory=list)
+    # Definition lines seen (at most two), counted while parsing when `lines`
+    # is not kept; None means _assess_diff_risk counts them from `lines`
+    function_changes: Optional[int] = None
 
+    def hunk_lines(self, hunk: Dict[str, Any]) -> List[str]:
+        start, end = hunk['line_slice']
+        return self.lines[start:end]
 
-@dataclass
+
+@dataclass(slots=True)
 class EphemeralBranch:
     """Represents an ephemeral branch for temporary edits"""
     branch_name: str
@@ -38,18 +102,23 @@ class VCSOperations:
     def __init__(self, repo_path: str = "."):
         self.repo_path = Path(repo_path)
         self.ephemeral_branches: Dict[str, EphemeralBranch] = {}
+        # Suffix for branch names, so two created within one clock tick differ
+        self._branch_seq = itertools.count()
+        self._narrated_diffs = lru_cache(maxsize=NARRATED_DIFF_CACHE_SIZE)(self._narrate_commits)
         self._ensure_git_repo()
+        # Every git call runs here; stringify the path once rather than per call
+        self._repo_cwd = str(self.repo_path)
 
     def _ensure_git_repo(self):
-        """Ensure we're in a git repository"""
-        if not (self.repo_path / '.git').exists():
+        """Ensure we're in a git repository, at its root or in a subdirectory as git allows"""
+        path = self.repo_path.resolve()
+        if not any((directory / '.git').exists() for directory in (path, *path.parents)):
             raise ValueError(f"Not a git repository: {self.repo_path}")
 
     def create_ephemeral_branch(self, description: str, base_branch: str = "main") -> str:
         """Create an ephemeral branch for temporary edits"""
         # Generate unique branch name
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        branch_name = f"aeiou_ephemeral_{timestamp}"
+        branch_name = f"aeiou_ephemeral_{time.time_ns():x}_{next(self._branch_seq)}"
 
         # Create and checkout branch
         self._run_git_command(["checkout", "-b", branch_name, base_branch])
@@ -74,11 +143,8 @@ class VCSOperations:
         branch = self.ephemeral_branches[branch_name]
 
         try:
-            # Stage all changes
-            self._run_git_command(["add", "."])
-
-            # Commit
-            self._run_git_command(["commit", "-m", message])
+            # Stage all changes and commit
+            self._run_git_many([["add", "."], ["commit", "-m", message]])
 
             branch.status = "committed"
             return True
@@ -92,11 +158,8 @@ class VCSOperations:
             return False
 
         try:
-            # Switch to target branch
-            self._run_git_command(["checkout", target_branch])
-
-            # Merge
-            self._run_git_command(["merge", branch_name])
+            # Switch to target branch and merge
+            self._run_git_many([["checkout", target_branch], ["merge", branch_name]])
 
             # Clean up ephemeral branch
             self.cleanup_ephemeral_branch(branch_name)
@@ -126,94 +189,218 @@ class VCSOperations:
         self.cleanup_ephemeral_branch(branch_name)
 
     def get_diffs_with_narration(self, from_ref: str = "HEAD~1", to_ref: str = "HEAD") -> List[VCSDiff]:
-        """Get diffs with AI narration"""
+        """Get diffs with AI narration
+
+        Refs are resolved to commit SHAs first and the result is cached on
+        those, so a ref that moves (HEAD after a commit or merge) misses the
+        cache rather than serving a stale diff. Cached VCSDiff objects are
+        shared between callers and should not be modified.
+        """
         try:
-            # Get diff stat
-            diff_stat = self._run_git_command(["diff", "--stat", from_ref, to_ref])
+            from_sha, to_sha = self._run_git_command(
+                ["rev-parse", f"{from_ref}^{{commit}}", f"{to_ref}^{{commit}}"]
+            ).split()
+            return list(self._narrated_diffs(from_sha, to_sha))
 
-            # Get detailed diff
-            diff_output = self._run_git_command(["diff", from_ref, to_ref])
+        except subprocess.CalledProcessError:
+            return []
 
-            diffs = self._parse_diff_output(diff_output)
+    def _narrate_commits(self, from_sha: str, to_sha: str) -> Tuple[VCSDiff, ...]:
+        """Parse and narrate the diff between two commits"""
+        # Parse the detailed diff as git streams it
+        diffs = self._parse_diff_output(self._iter_git_lines(["diff", from_sha, to_sha]))
 
-            # Add narration to each diff
-            for diff in diffs:
-                diff.narration = self._generate_diff_narration(diff)
-                diff.risk_level = self._assess_diff_risk(diff)
+        self._narrate(diffs)
+        return tuple(diffs)
 
-            return diffs
+    def list_changed_files(self, from_ref: str = "HEAD~1", to_ref: str = "HEAD") -> List[VCSDiff]:
+        """Changed files with line counts from `git diff --numstat`; hunks are not loaded
 
+        Narration and risk come from the counts alone; call load_hunks for
+        the files whose content should be inspected.
+        """
+        try:
+            output = self._run_git_command(["diff", "--numstat", "-z", from_ref, to_ref])
         except subprocess.CalledProcessError:
             return []
 
-    def _parse_diff_output(self, diff_output: str) -> List[VCSDiff]:
-        """Parse git diff output into VCSDiff objects"""
         diffs = []
+        fields = iter(output.split('\0'))
+        for entry in fields:
+            if not entry:
+                continue
+            added, deleted, file_path = entry.split('\t', 2)
+            if not file_path:  # renames list the old then the new path as separate fields
+                next(fields, None)
+                file_path = next(fields, "")
+            diff = VCSDiff(
+                file_path=file_path,
+                # Binary files report "-" for both counts
+                additions=int(added) if added != '-' else 0,
+                deletions=int(deleted) if deleted != '-' else 0,
+                hunks=[],
+                narration="",
+                risk_level="low"
+            )
+            diff.narration = self._generate_diff_narration(diff)
+            diff.risk_level = self._assess_diff_risk(diff)
+            diffs.append(diff)
+        return diffs
 
-        # Split by file
-        file_sections = re.split(r'^diff --git', diff_output, flags=re.MULTILINE)
+    def load_hunks(self, diff: VCSDiff, from_ref: str = "HEAD~1", to_ref: str = "HEAD") -> VCSDiff:
+        """Fetch one file's hunks and refresh its narration and risk"""
+        try:
+            parsed = self._parse_diff_output(
+                self._iter_git_lines(["diff", "--unified=3", from_ref, to_ref, "--", diff.file_path])
+            )
+        except subprocess.CalledProcessError:
+            return diff
+        if parsed:
+            diff.hunks = parsed[0].hunks
+            diff.lines = parsed[0].lines
+            diff.function_changes = parsed[0].function_changes
+            diff.narration = self._generate_diff_narration(diff)
+            diff.risk_level = self._assess_diff_risk(diff)
+        return diff
+
+    def get_diff_summary(self, from_ref: str = "HEAD~1", to_ref: str = "HEAD") -> List[VCSDiff]:
+        """Counts-only narration: line and section counts without keeping content
+
+        The diff keeps git's default context and definition lines are counted
+        as they stream past, so sections and risk match get_diffs_with_narration.
+        The full patch is still read from git; what is saved is memory and the
+        content analysis, since no line is stored.
+        """
+        try:
+            diffs = self._parse_diff_output(
+                self._iter_git_lines(["diff", from_ref, to_ref]), keep_lines=False
+            )
+        except subprocess.CalledProcessError:
+            return []
+
+        self._narrate(diffs)
+        return diffs
 
-        for section in file_sections[1:]:  # Skip first empty section
-            lines = section.strip().split('\n')
+    def _narrate(self, diffs: List[VCSDiff]):
+        """Add narration and risk to each diff; skipped files keep theirs"""
+        for diff in diffs:
+            if diff.narration != SKIPPED_NARRATION:
+                diff.narration = self._generate_diff_narration(diff)
+                diff.risk_level = self._assess_diff_risk(diff)
 
-            if len(lines) < 3:
+    def _parse_diff_output(self, diff_output: Union[str, Iterable[str]], keep_lines: bool = True) -> List[VCSDiff]:
+        """Parse git diff output into VCSDiff objects
+
+        Accepts the whole output or an iterable of lines, so a diff can be
+        parsed while git is still writing it; only one file is held at a time.
+        With keep_lines off only the counts (and function_changes) are kept and
+        every hunk slice is empty.
+        Binary files and generated paths (see SKIPPED_FILE_SUFFIXES) are only
+        counted and come back already narrated as skipped, with no hunks.
+        """
+        lines = diff_output.split('\n') if isinstance(diff_output, str) else diff_output
+        diffs = []
+        file_path = None
+        section_lines = 0
+        hunks = []
+        body = []
+        hunk = None
+        skipped = False
+        keep = keep_lines
+        # Counts for the open hunk live in locals and are stored when it closes
+        additions = deletions = 0
+        function_changes = None if keep_lines else 0
+
+        for line in lines:
+            line = line.rstrip('\n')
+            if not line:
                 continue
 
-            # Extract file path
-            file_match = re.search(r'b/(.+)', lines[0])
-            if not file_match:
+            # One first-character test per line picks the case; the full
+            # prefix is only compared for the character it could start with
+            marker = line[0]
+            if marker == 'd' and line.startswith('diff --git'):
+                if hunk is not None:
+                    hunk['additions'], hunk['deletions'] = additions, deletions
+                self._append_diff(diffs, file_path, section_lines, hunks, body, skipped, function_changes)
+                file_match = _FILE_B_RE.search(line, len('diff --git'))
+                file_path = file_match.group(1) if file_match else None
+                skipped = file_path is not None and _is_skipped_path(file_path)
+                keep = keep_lines and not skipped
+                function_changes = None if keep_lines else 0
+                section_lines = 1
+                hunks = []
+                body = []
+                hunk = None
                 continue
+            if file_path is None:
+                continue
+            section_lines += 1
+
+            if marker == '@' and line.startswith('@@'):
+                if hunk is not None:
+                    hunk['additions'], hunk['deletions'] = additions, deletions
+                additions = deletions = 0
+                start_line = _hunk_new_start(line)
+                hunk = None
+                if start_line is not None:
+                    # The end bound is filled in once the file is complete
+                    hunk = {
+                        'start_line': start_line,
+                        'additions': 0,
+                        'deletions': 0,
+                        'line_slice': (len(body), len(body))
+                    }
+                    hunks.append(hunk)
+            elif hunk is not None:
+                if marker == '+':
+                    additions += 1
+                elif marker == '-':
+                    deletions += 1
+                if keep:
+                    body.append(line)
+                elif function_changes is not None and function_changes < 2 and _FUNCTION_RE.search(line):
+                    function_changes += 1
+            elif marker in 'BG' and (line.startswith('Binary files ') or line == 'GIT binary patch'):
+                # git's binary markers only appear among a file's header lines
+                skipped = True
+
+        if hunk is not None:
+            hunk['additions'], hunk['deletions'] = additions, deletions
+        self._append_diff(diffs, file_path, section_lines, hunks, body, skipped, function_changes)
+        return diffs
 
-            file_path = file_match.group(1)
-
-            # Parse hunks
-            hunks = []
-            additions = 0
-            deletions = 0
-
-            i = 1
-            while i < len(lines):
-                if lines[i].startswith('@@'):
-                    # Parse hunk
-                    hunk_match = re.search(r'@@ -\d+(?:,\d+)? \+(\d+)(?:,\d+)? @@', lines[i])
-                    if hunk_match:
-                        hunk_start = int(hunk_match.group(1))
-                        hunk_lines = []
-
-                        i += 1
-                        hunk_add = 0
-                        hunk_del = 0
-
-                        while i < len(lines) and not lines[i].startswith('@@'):
-                            if lines[i].startswith('+'):
-                                hunk_add += 1
-                            elif lines[i].startswith('-'):
-                                hunk_del += 1
-                            hunk_lines.append(lines[i])
-                            i += 1
-
-                        hunks.append({
-                            'start_line': hunk_start,
-                            'additions': hunk_add,
-                            'deletions': hunk_del,
-                            'lines': hunk_lines
-                        })
-
-                        additions += hunk_add
-                        deletions += hunk_del
-                else:
-                    i += 1
-
+    @staticmethod
+    def _append_diff(diffs: List[VCSDiff], file_path: Optional[str], section_lines: int,
+                     hunks: List[Dict[str, Any]], body: List[str], skipped: bool = False,
+                     function_changes: Optional[int] = None):
+        # Sections of under three lines carry no change worth narrating
+        if file_path is None or section_lines < 3:
+            return
+        if skipped:
             diffs.append(VCSDiff(
                 file_path=file_path,
-                additions=additions,
-                deletions=deletions,
-                hunks=hunks,
-                narration="",  # Will be filled by narration function
-                risk_level="low"  # Will be assessed
+                additions=sum(hunk['additions'] for hunk in hunks),
+                deletions=sum(hunk['deletions'] for hunk in hunks),
+                hunks=[],
+                narration=SKIPPED_NARRATION,
+                risk_level="low"
             ))
-
-        return diffs
+            return
+        # Hunks are contiguous in the body: each ends where the next begins
+        ends = [hunk['line_slice'][0] for hunk in hunks[1:]] + [len(body)]
+        for hunk, end in zip(hunks, ends):
+            hunk['line_slice'] = (hunk['line_slice'][0], end)
+        diffs.append(VCSDiff(
+            file_path=file_path,
+            additions=sum(hunk['additions'] for hunk in hunks),
+            deletions=sum(hunk['deletions'] for hunk in hunks),
+            hunks=hunks,
+            narration="",  # Will be filled by narration function
+            risk_level="low",  # Will be assessed
+            lines=body,
+            function_changes=function_changes
+        ))
 
     def _generate_diff_narration(self, diff: VCSDiff) -> str:
         """Generate human-readable narration for a diff"""
@@ -239,71 +426,79 @@ class VCSOperations:
 
     def _analyze_diff_content(self, diff: VCSDiff) -> str:
         """Analyze diff content for specific insights"""
-        insights = []
-
-        # Check for function additions/modifications
-        func_pattern = r'(?:def|function|class)\s+\w+'
-        has_functions = any(re.search(func_pattern, line) for hunk in diff.hunks for line in hunk['lines'])
-        if has_functions:
-            insights.append("Modified function definitions")
-
-        # Check for imports
-        import_pattern = r'(?:import|from)\s+\w+'
-        has_imports = any(re.search(import_pattern, line) for hunk in diff.hunks for line in hunk['lines'])
-        if has_imports:
-            insights.append("Updated imports")
-
-        # Check for comments
-        comment_pattern = r'#|//|/\*|\*/'
-        has_comments = any(re.search(comment_pattern, line) for hunk in diff.hunks for line in hunk['lines'])
-        if has_comments:
-            insights.append("Modified comments/documentation")
-
-        return "; ".join(insights) if insights else ""
+        # Each pattern searches the joined body in C and stops at its first hit,
+        # rather than a Python-level regex call per line
+        text = "\n".join(diff.lines)
+        return "; ".join(insight for pattern, insight in _CONTENT_INSIGHTS if pattern.search(text))
 
     def _assess_diff_risk(self, diff: VCSDiff) -> str:
         """Assess the risk level of a diff"""
-        risk_score = 0
-
-        # Large diffs are riskier
+        # Large diffs are riskier (+1 each past 20, 50 and 100 changed lines),
+        # multiple hunks indicate scattered changes (+1 each past 2 and 5)
         total_changes = diff.additions + diff.deletions
-        if total_changes > 100:
-            risk_score += 3
-        elif total_changes > 50:
-            risk_score += 2
-        elif total_changes > 20:
-            risk_score += 1
-
-        # Multiple hunks indicate scattered changes
-        if len(diff.hunks) > 5:
-            risk_score += 2
-        elif len(diff.hunks) > 2:
-            risk_score += 1
-
-        # Function modifications are moderately risky
-        func_changes = sum(1 for hunk in diff.hunks
-                          for line in hunk['lines']
-                          if re.search(r'(?:def|function|class)\s+\w+', line))
-        risk_score += min(func_changes, 2)
-
-        if risk_score >= 5:
-            return "high"
-        elif risk_score >= 3:
-            return "medium"
-        else:
-            return "low"
+        hunk_count = len(diff.hunks)
+        risk_score = (
+            (total_changes > 20) + (total_changes > 50) + (total_changes > 100)
+            + (hunk_count > 2) + (hunk_count > 5)
+        )
+
+        # Function modifications are moderately risky; only the first two count
+        func_changes = diff.function_changes
+        if func_changes is None:
+            func_changes = 0
+            for line in diff.lines:
+                if _FUNCTION_RE.search(line):
+                    func_changes += 1
+                    if func_changes == 2:
+                        break
+        risk_score += func_changes
+
+        return _RISK_LEVELS[risk_score]
 
     def _run_git_command(self, args: List[str]) -> str:
         """Run a git command and return output"""
         result = subprocess.run(
             ["git"] + args,
-            cwd=self.repo_path,
+            cwd=self._repo_cwd,
             capture_output=True,
             text=True,
             check=True
         )
         return result.stdout
 
+    def _run_git_many(self, commands: List[List[str]]) -> str:
+        """Run git commands in order, stopping at the first failure
+
+        On POSIX the sequence is one `sh -c` process rather than a fork per
+        command; arguments are shell-quoted, so messages pass through intact.
+        """
+        if os.name != "posix":
+            return "".join(self._run_git_command(args) for args in commands)
+        script = " && ".join(shlex.join(["git"] + args) for args in commands)
+        result = subprocess.run(
+            ["sh", "-c", script],
+            cwd=self._repo_cwd,
+            capture_output=True,
+            text=True,
+            check=True
+        )
+        return result.stdout
+
+    def _iter_git_lines(self, args: List[str]) -> Iterator[str]:
+        """Run a git command and yield its output lines as they are produced"""
+        process = subprocess.Popen(
+            ["git"] + args,
+            cwd=self._repo_cwd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            errors="replace"
+        )
+        with process:
+            yield from process.stdout
+        if process.returncode:
+            raise subprocess.CalledProcessError(process.returncode, ["git"] + args)
+
     def get_ephemeral_branches(self) -> List[Dict[str, Any]]:
         """Get list of active ephemeral branches"""
         return [{
@@ -318,23 +513,14 @@ class VCSOperations:
     def squash_commits(self, branch_name: str, message: str) -> bool:
         """Squash commits on a branch"""
         try:
-            # Interactive rebase to squash
             commit_count = int(self._run_git_command(["rev-list", "--count", f"{branch_name}~1..{branch_name}"]))
 
             if commit_count > 1:
-                # Create squash script
-                squash_script = f"""#!/bin/bash
-echo "Squashing {commit_count} commits"
-GIT_SEQUENCE_EDITOR=true git rebase -i HEAD~{commit_count}
-git commit --amend -m "{message}"
-"""
-                script_path = self.repo_path / "squash_script.sh"
-                with open(script_path, 'w') as f:
-                    f.write(squash_script)
-
-                os.chmod(script_path, 0o755)
-                subprocess.run([str(script_path)], cwd=self.repo_path, check=True)
-                script_path.unlink()
+                # A soft reset keeps the tree, so one commit replaces the range
+                self._run_git_many([
+                    ["reset", "--soft", f"HEAD~{commit_count}"],
+                    ["commit", "-m", message]
+                ])
 
             return True
 
@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+import pytest
+
+from app.budgeter import CostLatencyBudgeter
+from app.providers import provider_manager
+
+
+def test_estimate_cost_matches_blended_rate():
+    budgeter = CostLatencyBudgeter()
+
+    # 30% input at $0.03/1K + 70% output at $0.06/1K
+    assert budgeter._estimate_cost("gpt-4", 8000) == pytest.approx(0.408)
+
+
+def test_cached_input_tokens_are_discounted():
+    budgeter = CostLatencyBudgeter()
+
+    full = budgeter._estimate_cost("gpt-4", 8000)
+    cached = budgeter._estimate_cost("gpt-4", 8000, cached_tokens=2000)
+
+    # OpenAI bills cached input at half the input rate
+    assert cached == pytest.approx(full - 2000 * 0.03 * 0.5 / 1000)
+
+
+def test_select_model_uses_cached_prefix():
+    budgeter = CostLatencyBudgeter()
+    provider_manager.record_cached_prefix("prefix-abc", 2000)
+
+    without_cache = budgeter.select_model_and_context("high", 10000)
+    with_cache = budgeter.select_model_and_context("high", 10000, prefix_hash="prefix-abc")
+
+    assert with_cache["estimated_cost"] < without_cache["estimated_cost"]
@@ -0,0 +1,217 @@
+from __future__ import annotations
+
+import difflib
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+from app.edit_engine import AtomicEditEngine, EditOperation, _parse_python_source, _unified_diff
+
+
+def _op(path, op_type, start, end, old="", new="", description="test"):
+    return EditOperation(
+        operation_type=op_type,
+        file_path=str(path),
+        start_line=start,
+        end_line=end,
+        old_content=old,
+        new_content=new,
+        description=description,
+    )
+
+
+def test_apply_edits_batches_ops_on_same_file(tmp_path):
+    """Multiple operations on one file are applied in order"""
+    target = tmp_path / "module.py"
+    target.write_text("a\nb\nc\n")
+    engine = AtomicEditEngine()
+
+    result = engine.apply_edits([
+        _op(target, "replace", 2, 2, old="b", new="B"),
+        _op(target, "insert", 1, 0, new="header"),
+    ])
+
+    assert result.success
+    assert len(result.operations) == 2
+    assert target.read_text() == "header\na\nB\nc\n"
+
+
+def test_apply_edits_invalid_operation_leaves_files_untouched(tmp_path):
+    """A failing validation must not modify any file"""
+    target = tmp_path / "module.py"
+    target.write_text("a\nb\n")
+    engine = AtomicEditEngine()
+
+    result = engine.apply_edits([
+        _op(target, "replace", 1, 1, old="a", new="A"),
+        _op(target, "delete", 10, 12),
+    ])
+
+    assert not result.success
+    assert target.read_text() == "a\nb\n"
+
+
+def test_apply_edits_missing_file_is_invalid(tmp_path):
+    engine = AtomicEditEngine()
+
+    result = engine.apply_edits([_op(tmp_path / "missing.py", "insert", 1, 0, new="x")])
+
+    assert not result.success
+
+
+def test_undo_restores_replaced_content(tmp_path):
+    target = tmp_path / "module.py"
+    target.write_text("a\nb\nc\n")
+    engine = AtomicEditEngine()
+
+    assert engine.apply_edits([_op(target, "replace", 2, 2, old="b", new="B")]).success
+    assert engine.undo_last_operation()
+    assert target.read_text() == "a\nb\nc\n"
+
+    assert engine.redo_last_operation()
+    assert target.read_text() == "a\nB\nc\n"
+
+
+def test_fuzzy_patch_edit_reports_match_lines(tmp_path):
+    target = tmp_path / "module.py"
+    target.write_text("import os\n\ndef old():\n    return 1\n")
+    engine = AtomicEditEngine()
+
+    op = engine.create_fuzzy_patch_edit(str(target), r"def old\(\):\n\s+return 1", "def new():\n    return 2")
+
+    assert op is not None
+    assert (op.start_line, op.end_line) == (3, 4)
+    assert op.old_content == "def old():\n    return 1"
+
+
+def test_multiline_insert_and_replace_keep_line_structure(tmp_path):
+    """Multi-line content occupies one buffer entry per line and undoes cleanly"""
+    target = tmp_path / "module.py"
+    target.write_text("a\nb\nc")
+    engine = AtomicEditEngine()
+
+    result = engine.apply_edits([
+        _op(target, "replace", 3, 3, old="c", new="C\nD"),
+        _op(target, "insert", 1, 0, new="x\ny"),
+    ])
+
+    assert result.success
+    # The unterminated final line stays unterminated
+    assert target.read_text() == "x\ny\na\nb\nC\nD"
+
+    assert engine.undo_last_operation()
+    assert target.read_text() == "a\nb\nc"
+
+
+def test_apply_edits_keeps_file_mode_and_leaves_no_tempfiles(tmp_path):
+    target = tmp_path / "script.sh"
+    target.write_text("echo a\n")
+    target.chmod(0o755)
+    engine = AtomicEditEngine()
+
+    assert engine.apply_edits([_op(target, "replace", 1, 1, old="echo a", new="echo b")]).success
+
+    assert target.read_text() == "echo b\n"
+    assert target.stat().st_mode & 0o777 == 0o755
+    assert [p.name for p in tmp_path.iterdir()] == ["script.sh"]
+
+
+def test_concurrent_replacements_of_one_file_do_not_collide(tmp_path):
+    target = tmp_path / "shared.py"
+    target.write_text("start\n")
+    contents = [f"writer {i}\n" * 2000 for i in range(8)]
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(lambda content: AtomicEditEngine._replace_file(str(target), content), contents))
+
+    # Every write lands whole through its own temp file, and none are left over
+    assert target.read_text() in contents
+    assert [p.name for p in tmp_path.iterdir()] == ["shared.py"]
+
+
+def test_ast_guided_edit_spans_whole_definition(tmp_path):
+    target = tmp_path / "module.py"
+    target.write_text(
+        "# helper is mentioned in a comment: def helper\n"
+        "def helper(x):\n"
+        "    return x + 1\n"
+        "\n"
+        "class Other:\n"
+        "    pass\n"
+    )
+    engine = AtomicEditEngine()
+
+    op = engine.create_ast_guided_edit(str(target), "helper", "def helper(x):\n    return x + 2")
+
+    assert op is not None
+    assert (op.start_line, op.end_line) == (2, 3)
+    assert op.old_content == "def helper(x):\n    return x + 1"
+    assert engine.create_ast_guided_edit(str(target), "missing", "") is None
+
+
+def test_apply_edits_across_many_files(tmp_path):
+    paths = []
+    for i in range(5):
+        path = tmp_path / f"module_{i}.py"
+        path.write_text(f"value = {i}\n")
+        paths.append(path)
+    engine = AtomicEditEngine()
+
+    result = engine.apply_edits([
+        _op(path, "replace", 1, 1, old=f"value = {i}", new=f"value = {i * 10}")
+        for i, path in enumerate(paths)
+    ])
+
+    assert result.success
+    assert [p.read_text() for p in paths] == [f"value = {i * 10}\n" for i in range(5)]
+
+
+def test_failed_flush_restores_already_written_files(tmp_path, monkeypatch):
+    good = tmp_path / "good.py"
+    bad = tmp_path / "bad.py"
+    good.write_text("a\n")
+    bad.write_text("b\n")
+    engine = AtomicEditEngine()
+
+    real_replace = AtomicEditEngine._replace_file
+
+    def failing_replace(file_path, content):
+        if file_path == str(bad) and content == "B\n":
+            raise OSError("disk full")
+        real_replace(file_path, content)
+
+    monkeypatch.setattr(AtomicEditEngine, "_replace_file", staticmethod(failing_replace))
+
+    result = engine.apply_edits([
+        _op(good, "replace", 1, 1, old="a", new="A"),
+        _op(bad, "replace", 1, 1, old="b", new="B"),
+    ])
+
+    assert not result.success
+    assert good.read_text() == "a\n"
+    assert bad.read_text() == "b\n"
+
+
+def test_identical_sources_share_one_parse(tmp_path):
+    source = "def helper():\n    return 1\n"
+    first = tmp_path / "first.py"
+    second = tmp_path / "second.py"
+    first.write_text(source)
+    second.write_text(source)
+
+    assert _parse_python_source(str(first)) is _parse_python_source(str(second))
+
+    first.write_text(source + "\ndef other():\n    pass\n")
+    assert _parse_python_source(str(first)) is not _parse_python_source(str(second))
+
+
+def test_unified_diff_matches_difflib_without_patching_it():
+    rng = random.Random(0)
+    for _ in range(50):
+        old = [f"line {rng.randrange(8)}\n" for _ in range(rng.randrange(30))]
+        new = [line for line in old if rng.random() > 0.2]
+        new[rng.randrange(len(new) + 1):0] = ["added\n"] * rng.randrange(3)
+        expected = list(difflib.unified_diff(old, new, fromfile="a/f.py", tofile="b/f.py", lineterm=""))
+        assert _unified_diff(old, new, "a/f.py", "b/f.py") == expected
+
+    # The optional C matcher stays local to edit_engine
+    assert difflib.SequenceMatcher.__module__ == "difflib"
@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import asyncio
+import time
+
+from app.health_monitor import HealthMonitor
+
+
+def _sample(ts: float, memory: float = 10.0, cpu: float = 5.0) -> dict:
+    return {
+        "ts": ts,
+        "system": {"memory_percent": memory, "cpu_percent": cpu},
+        "application": {},
+        "database": {}
+    }
+
+
+def test_metrics_history_returns_only_window():
+    """Samples older than the requested window are excluded"""
+    monitor = HealthMonitor()
+    now = time.time()
+    monitor.metrics_history.append(_sample(now - 3 * 3600))
+    monitor.metrics_history.append(_sample(now - 30 * 60))
+    monitor.metrics_history.append(_sample(now))
+
+    assert len(monitor.get_metrics_history(1)) == 2
+    history = monitor.get_metrics_history(24)
+    assert len(history) == 3
+    # Timestamps are rendered as ISO strings at the API boundary
+    assert isinstance(history[-1]["timestamp"], str)
+    assert "ts" not in history[-1]
+
+
+def test_alerts_are_bounded():
+    monitor = HealthMonitor()
+
+    for i in range(monitor.MAX_ALERTS + 10):
+        monitor._create_alert("test", f"alert {i}", "info")
+
+    assert len(monitor.alerts) == monitor.MAX_ALERTS
+    assert monitor._get_recent_alerts(2)[-1]["message"] == f"alert {monitor.MAX_ALERTS + 9}"
+
+
+def test_health_status_reuses_fresh_sample():
+    """A fresh cached sample is served without collecting again"""
+    monitor = HealthMonitor()
+    first = monitor._latest_metrics()
+
+    assert monitor._latest_metrics() is first
+
+    first["ts"] -= monitor.interval_seconds
+    assert monitor._latest_metrics() is not first
+
+
+def test_performance_report_averages_last_hour():
+    monitor = HealthMonitor()
+    now = time.time()
+    monitor._record_sample(_sample(now - 2 * 3600, memory=90.0, cpu=90.0))
+    monitor._record_sample(_sample(now - 60, memory=20.0, cpu=10.0))
+    monitor._record_sample(_sample(now, memory=40.0, cpu=30.0))
+
+    report = monitor.get_performance_report()
+
+    assert report["average_memory_percent"] == 30.0
+    assert report["average_cpu_percent"] == 20.0
+
+
+def test_monitor_task_collects_and_stops_promptly():
+    monitor = HealthMonitor()
+    monitor.thresholds["memory_usage_percent"] = -1.0  # every sample alerts
+    monitor.thresholds["cpu_usage_percent"] = 101.0  # ...on memory only, whatever the host load
+
+    async def run():
+        await monitor.start_monitoring(interval_seconds=3600)
+        alert = await monitor.wait_for_alert(timeout=5)
+        started = time.monotonic()
+        await monitor.stop_monitoring()
+        return alert, time.monotonic() - started
+
+    alert, stop_seconds = asyncio.run(run())
+
+    assert alert is not None and alert["type"] == "high_memory_usage"
+    assert len(monitor.metrics_history) == 1
+    assert stop_seconds < 1
+    assert monitor.monitor_task is None
+
+
+def test_full_window_history_drops_samples_past_retention():
+    monitor = HealthMonitor()
+    now = time.time()
+    monitor.metrics_history.append(_sample(now - 30 * 3600))
+    monitor.metrics_history.append(_sample(now - 3600))
+
+    assert len(monitor.get_metrics_history(48)) == 1
+    assert len(monitor.metrics_history) == 1
+
+
+def test_history_reads_survive_concurrent_recording():
+    """Endpoint threads can read while the monitor appends and evicts"""
+    import threading
+    from collections import deque
+
+    monitor = HealthMonitor()
+    monitor.metrics_history = deque(maxlen=50)  # full quickly, so appends also evict
+    start = time.time()
+    done = threading.Event()
+    errors = []
+
+    def record():
+        for i in range(20000):
+            monitor._record_sample(_sample(start + i))
+            monitor._create_alert("test", f"alert {i}", "info")
+        done.set()
+
+    def read():
+        try:
+            while not done.is_set():
+                monitor._metrics_since(1)
+                monitor._metrics_since(48)
+                monitor._get_recent_alerts(5)
+        except RuntimeError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=record), threading.Thread(target=read)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
@@ -0,0 +1,248 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from app.memory_store import MemoryStore
+
+
+def test_connection_is_reused_per_thread(tmp_path):
+    store = MemoryStore(str(tmp_path / "memory.db"))
+
+    assert store._conn() is store._conn()
+    assert store._conn().execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+    other = []
+    thread = threading.Thread(target=lambda: other.append(store._conn()))
+    thread.start()
+    thread.join()
+
+    assert other[0] is not store._conn()
+    store.close()
+
+
+def test_writes_are_visible_across_threads(tmp_path):
+    store = MemoryStore(str(tmp_path / "memory.db"))
+
+    thread = threading.Thread(target=store.store_decision, args=("proj", {"goal": "x"}))
+    thread.start()
+    thread.join()
+
+    decisions = store.get_decisions("proj")
+    assert [d["spec"] for d in decisions] == [{"goal": "x"}]
+    assert store.get_stats()["decisions"] == 1
+    store.close()
+
+
+def test_failed_transaction_rolls_back(tmp_path):
+    store = MemoryStore(str(tmp_path / "memory.db"))
+
+    try:
+        with store._transaction() as conn:
+            conn.execute("UPDATE decisions SET pinned = 1")
+            conn.execute("INSERT INTO decisions (ts, project, spec, created_at) VALUES (1, 'p', '{}', 1)")
+            raise RuntimeError("boom")
+    except RuntimeError:
+        pass
+
+    assert store.get_stats()["decisions"] == 0
+    store.close()
+
+
+def test_search_similar_ranks_and_sees_new_embeddings(tmp_path):
+    store = MemoryStore(str(tmp_path / "memory.db"))
+    store.store_embedding("a", "spec", [1.0, 0.0], {"name": "a"})
+    store.store_embedding("b", "spec", [0.6, 0.8])
+    store.store_embedding("c", "spec", [0.0, 1.0])
+    store.store_embedding("other", "code", [1.0, 0.0])
+
+    results = store.search_similar([2.0, 0.0], "spec", top_k=2)
+    assert [r["item_id"] for r in results] == ["a", "b"]
+    assert results[0]["similarity"] == pytest.approx(1.0)
+    assert results[0]["meta"] == {"name": "a"}
+
+    # Writes invalidate the cached matrix for that kind
+    store.store_embedding("d", "spec", [0.0, -1.0])
+    results = store.search_similar([0.0, -1.0], "spec", top_k=10)
+    assert [r["item_id"] for r in results] == ["d", "a", "b", "c"]
+    assert store.search_similar([1.0, 0.0], "missing") == []
+    store.close()
+
+
+def test_embeddings_are_stored_as_fp16_and_legacy_rows_still_load(tmp_path):
+    db_path = tmp_path / "memory.db"
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("""
+            CREATE TABLE embeddings (
+                id INTEGER PRIMARY KEY, item_id TEXT, kind TEXT, dim INTEGER, vec BLOB,
+                meta TEXT, ttl INTEGER DEFAULT 2592000, created_at REAL, UNIQUE(item_id, kind)
+            )
+        """)
+        conn.execute(
+            "INSERT INTO embeddings (item_id, kind, dim, vec, meta, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+            ("legacy", "spec", 2, np.array([3.0, 4.0], dtype=np.float32).tobytes(), "{}", time.time()),
+        )
+
+    store = MemoryStore(str(db_path))
+    store.store_embedding("new", "spec", [0.0, 2.0])
+
+    vec, dtype, scale = store._conn().execute(
+        "SELECT vec, dtype, scale FROM embeddings WHERE item_id = 'new'"
+    ).fetchone()
+    assert dtype == "i8"
+    assert np.frombuffer(vec, dtype=np.int8).tolist() == [0, 127]
+    assert scale == pytest.approx(1 / 127)
+
+    results = store.search_similar([0.0, 1.0], "spec")
+    assert [r["item_id"] for r in results] == ["new", "legacy"]
+    assert results[1]["similarity"] == pytest.approx(0.8, abs=1e-3)
+    store.close()
+
+
+def test_export_data_keys_rows_by_column_name(tmp_path):
+    store = MemoryStore(str(tmp_path / "memory.db"))
+    store.store_node("n1", "file", uri="a.py")
+
+    exported = store.export_data(["nodes"])
+
+    assert exported["nodes"][0]["id"] == "n1"
+    assert exported["nodes"][0]["uri"] == "a.py"
+    assert store.get_stats() == {"decisions": 0, "actions": 0, "embeddings": 0, "nodes": 1, "edges": 0}
+    store.close()
+
+
+def test_bulk_stores_write_all_rows(tmp_path):
+    store = MemoryStore(str(tmp_path / "memory.db"))
+
+    store.store_nodes_bulk([{"node_id": f"n{i}", "kind": "file"} for i in range(3)])
+    store.store_edges_bulk([
+        {"src": "n0", "dst": "n1", "rel": "imports"},
+        {"src": "n0", "dst": "n2", "rel": "imports", "meta": {"weight": 2}},
+    ])
+    store.store_embeddings_bulk([
+        {"item_id": "a", "kind": "spec", "vector": [1.0, 0.0]},
+        {"item_id": "b", "kind": "spec", "vector": [0.0, 1.0], "meta": {"x": 1}},
+    ])
+
+    assert store.get_stats() == {"decisions": 0, "actions": 0, "embeddings": 2, "nodes": 3, "edges": 2}
+    assert sorted(n["target"] for n in store.get_node_neighbors("n0", "imports")) == ["n1", "n2"]
+    assert store.search_similar([0.0, 1.0], "spec", top_k=1)[0]["meta"] == {"x": 1}
+    store.close()
+
+
+def test_neighbor_lookups_filter_by_relation_and_window(tmp_path):
+    store = MemoryStore(str(tmp_path / "memory.db"))
+    store.store_edges_bulk([
+        {"src": "a", "dst": "b", "rel": "imports"},
+        {"src": "a", "dst": "c", "rel": "calls"},
+    ])
+
+    assert sorted(n["target"] for n in store.get_node_neighbors("a")) == ["b", "c"]
+    assert [n["target"] for n in store.get_node_neighbors("a", "calls")] == ["c"]
+    assert [n["source"] for n in store.get_reverse_neighbors("b", "imports")] == ["a"]
+    # A caller-supplied "now" past the retention window sees nothing
+    assert store.get_node_neighbors("a", now=int(time.time()) + 2592000) == []
+    store.close()
+
+
+def test_search_similar_skips_embeddings_past_retention(tmp_path):
+    store = MemoryStore(str(tmp_path / "memory.db"))
+    store.store_embeddings_bulk([
+        {"item_id": "fresh", "kind": "spec", "vector": [0.0, 1.0]},
+        {"item_id": "stale", "kind": "spec", "vector": [1.0, 0.0]},
+    ])
+    store._conn().execute(
+        "UPDATE embeddings SET created_at = ? WHERE item_id = 'stale'", (int(time.time()) - 40 * 86400,)
+    )
+    store._invalidate_vectors()
+
+    assert [r["item_id"] for r in store.search_similar([1.0, 0.0], "spec")] == ["fresh"]
+    store.close()
+
+
+def test_int8_rows_rank_like_fp16_rows(tmp_path, monkeypatch):
+    import app.memory_store as memory_store
+
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((50, 64)).astype(np.float32)
+    query = rng.standard_normal(64).astype(np.float32)
+
+    rankings = {}
+    for dtype in ("f16", "i8"):
+        monkeypatch.setattr(memory_store, "EMBEDDING_DTYPE", dtype)
+        store = MemoryStore(str(tmp_path / f"{dtype}.db"))
+        store.store_embeddings_bulk({"item_id": str(i), "kind": "spec", "vector": v} for i, v in enumerate(vectors))
+        rankings[dtype] = store.search_similar(query, "spec", top_k=5)
+        store.close()
+
+    assert [r["item_id"] for r in rankings["i8"]] == [r["item_id"] for r in rankings["f16"]]
+    for fp16, int8 in zip(rankings["f16"], rankings["i8"]):
+        assert int8["similarity"] == pytest.approx(fp16["similarity"], abs=0.01)
+
+
+def test_int8_rows_keep_recall_at_high_dimensions(tmp_path, monkeypatch):
+    import app.memory_store as memory_store
+
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((500, 1536)).astype(np.float32)
+    queries = rng.standard_normal((20, 1536)).astype(np.float32)
+
+    hits = {}
+    for dtype in ("f32", "i8"):
+        monkeypatch.setattr(memory_store, "EMBEDDING_DTYPE", dtype)
+        store = MemoryStore(str(tmp_path / f"{dtype}.db"))
+        store.store_embeddings_bulk({"item_id": str(i), "kind": "spec", "vector": v} for i, v in enumerate(vectors))
+        hits[dtype] = [{r["item_id"] for r in store.search_similar(q, "spec", top_k=5)} for q in queries]
+        store.close()
+
+    # Each row is scaled by its own peak, so unit vectors use the full int8 range
+    recall = np.mean([len(exact & quantized) / 5 for exact, quantized in zip(hits["f32"], hits["i8"])])
+    assert recall >= 0.95
+
+
+def test_legacy_int8_rows_without_a_scale_still_decode(tmp_path):
+    store = MemoryStore(str(tmp_path / "memory.db"))
+    store.store_embedding("old", "spec", [1.0, 0.0])
+    store.store_embedding("new", "spec", [0.0, 1.0])
+    # Rows written before per-vector scales used a fixed 1/127
+    store._conn().execute(
+        "UPDATE embeddings SET vec = ?, scale = NULL WHERE item_id = 'old'",
+        (np.array([127, 0], dtype=np.int8).tobytes(),),
+    )
+    store._invalidate_vectors()
+
+    [best] = store.search_similar([1.0, 0.1], "spec", top_k=1)
+    assert best["item_id"] == "old"
+    assert best["similarity"] == pytest.approx(0.995, abs=0.01)
+    store.close()
+
+
+def test_search_decisions_uses_term_index_and_backfills_legacy_rows(tmp_path):
+    db_path = tmp_path / "memory.db"
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("""
+            CREATE TABLE decisions (
+                id INTEGER PRIMARY KEY, ts INTEGER, project TEXT, spec TEXT,
+                ttl INTEGER DEFAULT 2592000, pinned BOOLEAN DEFAULT 0, created_at INTEGER
+            )
+        """)
+        conn.execute(
+            "INSERT INTO decisions (ts, project, spec, created_at) VALUES (?, 'proj', ?, ?)",
+            (int(time.time()) - 10, '{"goal": "Legacy retry logic"}', int(time.time()) - 10),
+        )
+
+    store = MemoryStore(str(db_path))
+    store.store_decision("proj", {"goal": "Add retry to uploads"})
+    store.store_decision("proj", {"goal": "Render settings"})
+    store.store_decision("other", {"goal": "Retry elsewhere"})
+
+    goals = [d["spec"]["goal"] for d in store.search_decisions("proj", "RETRY, please")]
+    assert goals == ["Add retry to uploads", "Legacy retry logic"]
+    assert store.search_decisions("proj", "retry", limit=1)[0]["spec"]["goal"] == "Add retry to uploads"
+    assert store.search_decisions("proj", "retr") == []
+    assert store.search_decisions("proj", "!!!") == []
+    store.close()
@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import threading
+import time
+
+from app.permissions import PermissionLevel, PermissionManager
+
+
+def test_check_permission_uses_configured_level_and_default():
+    manager = PermissionManager()
+
+    assert manager.check_permission("file_read") is PermissionLevel.ALLOW
+    assert manager.check_permission("unknown_tool") is PermissionLevel.ASK
+
+    manager.set_tool_permission("file_read", PermissionLevel.DENY)
+    assert manager.check_permission("file_read") is PermissionLevel.DENY
+
+
+def test_cached_decisions_follow_policy_changes_and_expiry(monkeypatch):
+    manager = PermissionManager()
+
+    assert manager.check_permission("file_delete", "s1") is PermissionLevel.DENY
+    manager.grant_elevation("s1", ["file_delete"])
+    assert manager.check_permission("file_delete", "s1") is PermissionLevel.ALLOW
+    assert manager.check_permission("file_delete", "s2") is PermissionLevel.DENY
+
+    # An elevation that lapses stops applying without any policy mutation
+    expires_at = manager.session_elevations["s1"].expires_at
+    monkeypatch.setattr(time, "time", lambda: expires_at)
+    assert manager.check_permission("file_delete", "s1") is PermissionLevel.DENY
+
+    manager.grant_elevation("s1", ["file_delete"])
+    manager.revoke_elevation("s1")
+    assert manager.check_permission("file_delete", "s1") is PermissionLevel.DENY
+
+
+def test_cleanup_removes_only_expired_current_grants(monkeypatch):
+    manager = PermissionManager()
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now)
+
+    manager.grant_elevation("short", ["file_write"], duration_minutes=1)
+    manager.grant_elevation("long", ["file_write"], duration_minutes=60)
+    # Re-granting replaces the earlier, shorter elevation
+    manager.grant_elevation("renewed", ["file_write"], duration_minutes=1)
+    manager.grant_elevation("renewed", ["file_write"], duration_minutes=60)
+
+    monkeypatch.setattr(time, "time", lambda: now + 120)
+
+    assert manager.cleanup_expired_elevations() == 1
+    assert sorted(manager.session_elevations) == ["long", "renewed"]
+    assert manager.cleanup_expired_elevations() == 0
+
+
+def test_concurrent_checks_and_mutations_are_safe():
+    manager = PermissionManager()
+    errors = []
+
+    def worker(i):
+        try:
+            for j in range(200):
+                session = f"s{i}-{j % 5}"
+                manager.grant_elevation(session, ["file_write"], duration_minutes=0)
+                manager.check_permission("file_write", session)
+                manager.set_tool_permission(f"tool_{i}", PermissionLevel.ALLOW)
+                manager.get_permission_stats()
+                manager.cleanup_expired_elevations()
+        except Exception as exc:  # pragma: no cover - reported below
+            errors.append(exc)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+
+
+def test_cached_decision_without_elevation_skips_the_clock(monkeypatch):
+    manager = PermissionManager()
+    assert manager.check_permission("file_read", "s1") is PermissionLevel.ALLOW
+
+    def no_clock():
+        raise AssertionError("clock read on a cached decision")
+
+    monkeypatch.setattr(time, "time", no_clock)
+    assert manager.check_permission("file_read", "s1") is PermissionLevel.ALLOW
+
+
+def test_request_permission_reports_settings_and_counts_usage():
+    manager = PermissionManager()
+
+    assert manager.request_permission("file_read", "look", "s1") == {"granted": True, "reason": "Auto-approved"}
+    pending = manager.request_permission("run_command", "build", "s1")
+    assert pending["requires_approval"] and pending["risk_level"] == "high"
+    assert pending["description"] == "Execute system commands"
+    assert manager.request_permission("unknown_tool", "x", "s1")["risk_level"] == "medium"
+
+    assert manager.tool_permissions["file_read"].use_count == 1
+
+
+def test_permission_stats_track_usage_and_reuse_unchanged_snapshots():
+    manager = PermissionManager()
+    manager.request_permission("file_read", "look", "s1")
+    manager.request_permission("file_read", "look", "s1")
+    manager.request_permission("run_tests", "ci", "s1")
+
+    stats = manager.get_permission_stats()
+    assert stats["total_requests"] == 3
+    assert stats["tools"]["file_read"]["use_count"] == 2
+    snapshot = manager._stats_memo[1]
+
+    # Each caller gets its own copy built from the reused snapshot
+    stats["tools"]["file_read"]["use_count"] = 99
+    again = manager.get_permission_stats()
+    assert again["tools"]["file_read"]["use_count"] == 2
+    assert manager._stats_memo[1] is snapshot
+
+    manager.set_tool_permission("file_read", PermissionLevel.ALLOW)
+    stats = manager.get_permission_stats()
+    assert stats["total_requests"] == 1
+    assert stats["tools"]["file_read"]["use_count"] == 0
+
+    manager.grant_elevation("s2", ["file_write"])
+    assert manager.get_permission_stats()["elevations"] == 1
@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import os
+
+from app.project_graph import ProjectGraphBuilder, _extract_dependencies
+
+
+def _write(root, rel, text):
+    path = root / rel
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+
+
+def test_dependency_lookups_in_both_directions(tmp_path):
+    _write(tmp_path, "helpers.py", "def helper():\n    return 1\n")
+    _write(tmp_path, "service.py", "import helpers\n\nclass Service:\n    pass\n")
+    _write(tmp_path, "main.py", "from service import Service\n")
+    builder = ProjectGraphBuilder(str(tmp_path))
+
+    graph = builder.build_graph()
+
+    assert graph["metadata"]["total_files"] == 3
+    assert sorted((e.from_file, e.to_file, e.symbol_name) for e in graph["dependencies"]) == [
+        ("main.py", "service.py", "from service import Service"),
+        ("service.py", "helpers.py", "import helpers"),
+    ]
+    assert builder.get_file_dependencies("service.py") == ["helpers.py"]
+    assert builder.get_reverse_dependencies("helpers.py") == ["service.py"]
+    assert builder.get_reverse_dependencies("main.py") == []
+    assert builder.get_file_dependencies("missing.py") == []
+
+
+def test_symbol_extraction_reports_names_and_lines(tmp_path):
+    _write(tmp_path, "module.py", "import os\n\nclass Widget(Base):\n    def render(self):\n        pass\n# def not_code\n")
+    _write(tmp_path, "app.js", "const add = (a, b) => a + b\nclass Store {\n}\n")
+    builder = ProjectGraphBuilder(str(tmp_path))
+
+    builder.build_graph()
+
+    py = [(s["name"], s["kind"], s["line"]) for s in builder.files["module.py"].symbols]
+    assert py == [("Widget", "class", 3), ("render", "function", 4)]
+    js = [(s["kind"], s["line"]) for s in builder.files["app.js"].symbols]
+    assert js == [("function", 1), ("class", 2)]
+
+
+def test_parallel_parse_matches_serial(tmp_path, monkeypatch):
+    import app.project_graph as project_graph
+
+    for i in range(6):
+        _write(tmp_path, f"pkg/mod_{i}.py", f"import mod_{(i + 1) % 6}\n\ndef func_{i}():\n    pass\n")
+
+    serial = ProjectGraphBuilder(str(tmp_path))
+    serial.build_graph()
+
+    monkeypatch.setattr(project_graph, "PARALLEL_PARSE_MIN_FILES", 1)
+    parallel = ProjectGraphBuilder(str(tmp_path))
+    parallel.build_graph()
+
+    assert parallel.symbols.keys() == serial.symbols.keys()
+    assert {p: f.imports for p, f in parallel.files.items()} == {p: f.imports for p, f in serial.files.items()}
+    assert len(parallel.dependencies) == len(serial.dependencies) == 6
+
+
+def test_parse_cache_skips_unchanged_files(tmp_path, monkeypatch):
+    import app.project_graph as project_graph
+
+    root = tmp_path / "project"
+    _write(root, "a.py", "def a():\n    pass\n")
+    _write(root, "b.py", "import a\n")
+    cache_path = str(tmp_path / "graph_cache.db")
+
+    first = ProjectGraphBuilder(str(root), cache_path=cache_path)
+    first.build_graph()
+
+    parsed = []
+    real_parse = project_graph._parse_file
+    monkeypatch.setattr(project_graph, "_parse_file", lambda path, lang: parsed.append(path) or real_parse(path, lang))
+    _write(root, "b.py", "import a\n\nclass B:\n    pass\n")
+
+    second = ProjectGraphBuilder(str(root), cache_path=cache_path)
+    second.build_graph()
+
+    assert parsed == [str(root / "b.py")]
+    assert [s["name"] for s in second.files["a.py"].symbols] == ["a"]
+    assert [s["name"] for s in second.files["b.py"].symbols] == ["B"]
+    assert second.get_file_dependencies("b.py") == ["a.py"]
+
+
+def test_scan_skips_hidden_and_vendored_directories(tmp_path):
+    _write(tmp_path, "pkg/mod.py", "x = 1\n")
+    _write(tmp_path, "node_modules/dep/index.js", "")
+    _write(tmp_path, ".git/hook.py", "")
+    _write(tmp_path, "README.md", "")
+
+    builder = ProjectGraphBuilder(str(tmp_path))
+    builder._scan_files()
+
+    assert list(builder.files) == [os.path.join("pkg", "mod.py")]
+    assert builder.files[os.path.join("pkg", "mod.py")].size == 6
+
+
+def test_imports_resolve_by_whole_module_name(tmp_path):
+    _write(tmp_path, "a.py", "x = 1\n")
+    _write(tmp_path, "utils.py", "y = 2\n")
+    _write(tmp_path, "main.py", "import pandas as pd\nfrom utils import y\n")
+    builder = ProjectGraphBuilder(str(tmp_path))
+
+    builder.build_graph()
+
+    # "a" appears inside "pandas" and "as" but is not imported
+    assert builder.get_file_dependencies("main.py") == ["utils.py"]
+    assert builder.get_reverse_dependencies("a.py") == []
+
+
+def test_dependency_lines_are_extracted_per_language():
+    source = "import os\r\n    from pkg import mod\nvalue = 1  # import nothing\n"
+
+    assert _extract_dependencies(source, "python") == ["import os", "from pkg import mod"]
+    assert _extract_dependencies('import a from "b"\n  require("c")\n', "typescript") == ['import a from "b"', 'require("c")']
+    assert _extract_dependencies("import x\n", "go") == []
+
+
+def test_binary_minified_and_oversized_files_are_not_parsed(tmp_path, monkeypatch):
+    import app.project_graph as project_graph
+
+    monkeypatch.setattr(project_graph, "MAX_PARSE_BYTES", 64 * 1024)
+    _write(tmp_path, "small.py", "def small():\n    pass\n")
+    _write(tmp_path, "huge.py", "def huge():\n    pass\n" * 4000)
+    _write(tmp_path, "bundle.js", "class Bundle {}; " * 2000)
+    (tmp_path / "blob.py").write_bytes(b"def blob():\n\x00\x01")
+    builder = ProjectGraphBuilder(str(tmp_path))
+
+    builder.build_graph()
+
+    assert [s["name"] for s in builder.files["small.py"].symbols] == ["small"]
+    assert builder.files["huge.py"].symbols == []
+    assert builder.files["bundle.js"].symbols == []
+    assert builder.files["blob.py"].symbols == []
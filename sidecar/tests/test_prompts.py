@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+from dataclasses import replace
+
+from app.prompts import PromptRegistry
+
+
+def test_list_prompts_filters_by_any_tag():
+    registry = PromptRegistry()
+
+    assert [p.id for p in registry.list_prompts(["testing"])] == ["testing_specialist_v1"]
+    assert {p.id for p in registry.list_prompts(["code", "refactoring"])} == {"code_assistant_v1", "refactoring_expert_v1"}
+    assert registry.list_prompts(["missing"]) == []
+    assert len(registry.list_prompts()) == 3
+
+
+def test_replacing_a_prompt_reindexes_its_tags():
+    registry = PromptRegistry()
+    prompt = registry.get_prompt("testing_specialist_v1")
+
+    registry.add_prompt(replace(prompt, tags=["qa"]))
+
+    assert registry.list_prompts(["testing"]) == []
+    assert [p.id for p in registry.list_prompts(["qa"])] == ["testing_specialist_v1"]
@@ -0,0 +1,322 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.providers import (
+    FAILURE_THRESHOLD,
+    CacheConfig,
+    LLMCache,
+    OpenAIProvider,
+    Provider,
+    ProviderError,
+    ProviderManager,
+    RateLimiter,
+    RateLimitError,
+)
+
+
+class _FakeCompletions:
+    def __init__(self):
+        self.calls = []
+
+    async def create(self, **kwargs):
+        self.calls.append(kwargs)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=f"answer {len(self.calls)}"))],
+            usage=SimpleNamespace(total_tokens=10),
+        )
+
+
+def _provider(cache=None):
+    provider = OpenAIProvider("test-key", "gpt-4", cache=cache)
+    completions = _FakeCompletions()
+    provider.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    return provider, completions
+
+
+def test_identical_requests_are_served_from_cache():
+    provider, completions = _provider(LLMCache())
+
+    async def run():
+        return [
+            await provider.generate("hello"),
+            await provider.generate("hello"),
+            await provider.generate("hello", temperature=0.0),
+            await provider.generate("hello", use_cache=False),
+        ]
+
+    assert asyncio.run(run()) == ["answer 1", "answer 1", "answer 2", "answer 3"]
+    assert len(completions.calls) == 3
+    assert provider.request_count == 3
+    assert (provider.cache.hits, provider.cache.misses) == (1, 2)
+
+
+def test_cache_evicts_least_recent_and_expired_entries(monkeypatch):
+    import app.providers as providers
+
+    now = 1000.0
+    monkeypatch.setattr(providers.time, "time", lambda: now)
+    cache = LLMCache(CacheConfig(max_entries=2, ttl=60))
+    cache.set("a", "A")
+    cache.set("b", "B")
+    assert cache.get("a") == "A"
+    cache.set("c", "C")
+
+    assert cache.get("b") is None
+    now += 61
+    assert cache.get("a") is None
+
+
+def test_generate_batch_packs_uncached_prompts_into_one_call():
+    provider, completions = _provider(LLMCache())
+
+    async def create(**kwargs):
+        completions.calls.append(kwargs)
+        prompts = json.loads(kwargs["messages"][-1]["content"])
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=json.dumps([p.upper() for p in prompts])))],
+            usage=SimpleNamespace(total_tokens=10),
+        )
+
+    completions.create = create
+
+    async def run():
+        first = await provider.generate_batch(["a", "b"])
+        second = await provider.generate_batch(["b", "c", "a"])
+        return first, second
+
+    assert asyncio.run(run()) == (["A", "B"], ["B", "C", "A"])
+    assert [json.loads(call["messages"][-1]["content"]) for call in completions.calls] == [["a", "b"], ["c"]]
+
+
+class _ScriptedProvider(Provider):
+    def __init__(self, delay=0.0, error=None, answer="ok"):
+        super().__init__("key", "gpt-4")
+        self.delay = delay
+        self.error = error
+        self.answer = answer
+        self.calls = 0
+
+    async def generate(self, prompt, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return self.answer
+
+    def estimate_cost(self, tokens):
+        return 0.0
+
+
+def test_failover_races_fallbacks_and_opens_the_circuit():
+    manager = ProviderManager()
+    manager.add_provider("primary", _ScriptedProvider(error=RateLimitError("429")))
+    manager.add_provider("slow", _ScriptedProvider(delay=5.0, answer="slow"))
+    manager.add_provider("broken", _ScriptedProvider(error=ProviderError("down")))
+    manager.add_provider("fast", _ScriptedProvider(delay=0.01, answer="fast"))
+
+    async def run():
+        return [await manager.generate("hi") for _ in range(FAILURE_THRESHOLD + 1)]
+
+    started = time.monotonic()
+    assert asyncio.run(run()) == ["fast"] * (FAILURE_THRESHOLD + 1)
+    assert time.monotonic() - started < 2
+    # After three failures the broken provider is no longer tried
+    assert manager.providers["broken"].calls == FAILURE_THRESHOLD
+    assert manager.health["fast"].latency_ewma is not None
+
+
+def test_hedged_request_beats_a_slow_primary():
+    manager = ProviderManager()
+    manager.hedge_requests = True
+    manager.add_provider("primary", _ScriptedProvider(delay=5.0, answer="primary"))
+    manager.add_provider("backup", _ScriptedProvider(answer="backup"))
+    manager.health["primary"].latency_ewma = 0.01
+
+    assert asyncio.run(manager.generate("hi")) == "backup"
+
+
+def test_rate_limit_retries_back_off_with_jitter(monkeypatch):
+    import app.providers as providers
+    import openai
+
+    provider, completions = _provider()
+    create = completions.create
+
+    async def flaky_create(**kwargs):
+        if len(completions.calls) < 2:
+            completions.calls.append(kwargs)
+            raise openai.RateLimitError("slow down", response=SimpleNamespace(request=None, status_code=429, headers={}), body=None)
+        return await create(**kwargs)
+
+    completions.create = flaky_create
+    bounds = []
+    monkeypatch.setattr(providers.random, "uniform", lambda low, high: bounds.append((low, high)) or 0.0)
+
+    assert asyncio.run(provider.generate("hello", retry_delay=20.0)) == "answer 3"
+    assert bounds == [(0, 20.0), (0, providers.MAX_RETRY_DELAY)]
+
+
+def test_rate_limiter_throttles_and_caps_in_flight():
+    limiter = RateLimiter(rate=2, period=0.2, max_in_flight=1)
+    active = []
+
+    async def call():
+        async with limiter:
+            active.append(1)
+            assert len(active) == 1
+            await asyncio.sleep(0)
+            active.pop()
+
+    async def run():
+        started = time.monotonic()
+        await asyncio.gather(*(call() for _ in range(4)))
+        return time.monotonic() - started
+
+    # Two requests fit in the full bucket; the other two wait for refills
+    assert asyncio.run(run()) >= 0.18
+
+
+def test_usage_counters_feed_the_manager_total():
+    provider, _ = _provider()
+    manager = ProviderManager()
+    manager.add_provider("openai", provider)
+
+    provider.record_usage(10)
+    provider.record_usage(5)
+
+    assert (provider.request_count, provider.token_count) == (2, 15)
+    assert provider.cost_estimate == pytest.approx(provider.estimate_cost(15))
+    assert manager.total_estimated_cost == pytest.approx(provider.cost_estimate)
+
+    manager.reset_usage_stats()
+    assert manager.get_usage_stats()["openai"]["requests"] == 0
+    assert (provider.token_count, provider.cost_estimate, manager.total_estimated_cost) == (0, 0.0, 0.0)
+
+
+def test_cached_prompt_tokens_are_recorded_for_a_tagged_prefix():
+    provider, completions = _provider()
+    manager = ProviderManager()
+    manager.add_provider("openai", provider)
+
+    async def respond(**kwargs):
+        completions.calls.append(kwargs)
+        details = SimpleNamespace(cached_tokens=cached.pop(0))
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content="ok"))],
+            usage=SimpleNamespace(total_tokens=2000, prompt_tokens_details=details),
+        )
+
+    completions.create = respond
+    cached = [1536, 0, 1024]
+
+    asyncio.run(manager.generate("shared prefix + question", prefix_hash="abc"))
+    assert manager.lookup_cached_prefix_tokens("abc") == 1536
+    # A cache miss means the provider dropped the prefix
+    asyncio.run(manager.generate("shared prefix + question", prefix_hash="abc"))
+    assert manager.lookup_cached_prefix_tokens("abc") == 0
+    # Untagged requests are not tracked
+    asyncio.run(manager.generate("shared prefix + question"))
+    assert not manager.cached_prefixes
+
+
+def test_cached_prefixes_are_evicted_on_insert(monkeypatch):
+    import app.providers as providers
+
+    monkeypatch.setattr(providers, "MAX_CACHED_PREFIXES", 3)
+    manager = ProviderManager()
+    now = time.time()
+    monkeypatch.setattr(providers.time, "time", lambda: now)
+    manager.record_cached_prefix("old", 100)
+
+    now += providers.PREFIX_CACHE_TTL + 1
+    for name in ("a", "b", "c", "d"):
+        manager.record_cached_prefix(name, 100)
+
+    assert list(manager.cached_prefixes) == ["b", "c", "d"]
+
+
+def test_cost_estimate_uses_model_rates():
+    gpt4 = OpenAIProvider("test-key", "gpt-4")
+    turbo = OpenAIProvider("test-key", "gpt-3.5-turbo")
+    unknown = OpenAIProvider("test-key", "some-new-model")
+
+    assert gpt4.estimate_cost(1000) == pytest.approx(0.3 * 0.03 + 0.7 * 0.06)
+    assert turbo.estimate_cost(2000) == pytest.approx(2 * (0.3 * 0.0015 + 0.7 * 0.002))
+    assert unknown.estimate_cost(1000) == gpt4.estimate_cost(1000)
+
+
+def test_stream_yields_deltas_and_records_final_usage(monkeypatch):
+    import app.providers as providers
+
+    provider, completions = _provider()
+
+    def chunk(content=None, usage=None):
+        choices = [SimpleNamespace(delta=SimpleNamespace(content=content))] if usage is None else []
+        return SimpleNamespace(choices=choices, usage=usage)
+
+    async def create(**kwargs):
+        completions.calls.append(kwargs)
+
+        async def stream():
+            for item in (chunk("Hel"), chunk(None), chunk("lo"), chunk(usage=SimpleNamespace(total_tokens=7))):
+                yield item
+        return stream()
+
+    completions.create = create
+    manager = ProviderManager()
+    manager.add_provider("openai", provider)
+
+    async def run():
+        return [piece async for piece in providers.stream_with_provider("hi", "openai", max_tokens=5)]
+
+    monkeypatch.setattr(providers, "provider_manager", manager)
+    assert asyncio.run(run()) == ["Hel", "lo"]
+    assert completions.calls[0]["stream"] is True
+    assert (provider.request_count, provider.token_count) == (1, 7)
+
+
+def test_providers_share_one_pooled_http_client():
+    import app.providers as providers
+
+    first = OpenAIProvider("key-a", "gpt-4")
+    second = OpenAIProvider("key-b", "gpt-3.5-turbo")
+
+    pooled = providers.shared_http_client()
+    assert first.client._client is second.client._client is pooled
+
+    asyncio.run(providers.close_http_client())
+    assert providers.shared_http_client() is not pooled
+
+
+
+def test_providers_reconnect_after_the_shared_client_is_closed(monkeypatch):
+    import httpx
+    import app.providers as providers
+
+    provider = OpenAIProvider("key-a", "gpt-4")
+    closed = provider.client._client
+    asyncio.run(providers.close_http_client())
+    assert closed.is_closed
+
+    sent = []
+
+    def handler(request):
+        sent.append(request.url.path)
+        return httpx.Response(200, json={
+            "id": "x", "object": "chat.completion", "created": 0, "model": "gpt-4",
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": "hi"}}],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+        })
+
+    # Stands in for the pool the next shared_http_client() call would open
+    monkeypatch.setattr(providers, "_http_client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+
+    assert asyncio.run(provider.generate("hello")) == "hi"
+    assert sent == ["/v1/chat/completions"]
+    assert provider.client._client is providers.shared_http_client()
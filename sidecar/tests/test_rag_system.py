@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+from app.memory_store import MemoryStore
+from app import rag_system
+from app.rag_system import TOKEN_ESTIMATE_KEY, RAGEnrichment, RAGPolicy
+
+
+def _enrichment(tmp_path):
+    return RAGEnrichment(RAGPolicy(memory_store=MemoryStore(str(tmp_path / "memory.db"))))
+
+
+def test_stored_taskspecs_are_retrieved_by_similarity(tmp_path):
+    enrichment = _enrichment(tmp_path)
+    enrichment.store_successful_taskspec({"goal": "Add retry to the http client", "constraints_inferred": ["async"]}, "proj")
+    enrichment.store_successful_taskspec({"goal": "Render the settings page"}, "proj")
+    enrichment.store_successful_taskspec({"goal": "Add retry to uploads"}, "other")
+
+    context = enrichment.rag_policy.retrieve_context("retry http requests", project="proj")
+
+    assert [item["meta"]["goal"] for item in context["similar_items"]] == ["Add retry to the http client"]
+    assert enrichment.rag_policy.retrieve_context("!!!", project="proj")["similar_items"] == []
+
+
+def test_context_extractors_count_and_dedupe_in_first_seen_order(tmp_path):
+    enrichment = _enrichment(tmp_path)
+    context = {"decisions": [
+        {"spec": {"goal": "one", "constraints_inferred": ["a", "b"], "edge_cases": ["empty", "null"]}},
+        {"spec": {"goal": "", "constraints_inferred": ["b", "a", "c"], "edge_cases": ["null", "huge"]}},
+        {"spec": {"goal": "three", "constraints_inferred": ["c"]}},
+    ]}
+
+    assert enrichment._extract_patterns_from_context(context) == ["Pattern: a", "Pattern: b", "Pattern: c"]
+    assert enrichment._extract_edge_cases_from_context(context) == ["empty", "null", "huge"]
+    assert enrichment._extract_examples_from_context(context) == ["Similar task: one", "Similar task: three"]
+
+
+def test_token_estimates_leave_items_unchanged(tmp_path):
+    enrichment = _enrichment(tmp_path)
+    policy = enrichment.rag_policy
+    items = [{"spec": {"goal": "x" * 400}}, {"spec": {"goal": "y" * 40}, TOKEN_ESTIMATE_KEY: 7}]
+
+    total = policy._estimate_tokens(items)
+
+    assert total > 100 + 7
+    # Stored estimates are used as-is; computed ones are not written back
+    assert items[0] == {"spec": {"goal": "x" * 400}}
+    assert policy._estimate_tokens(items[1:]) == 7
+
+
+def test_decisions_are_retrieved_by_shared_terms(tmp_path):
+    enrichment = _enrichment(tmp_path)
+    enrichment.memory_store.store_decision("proj", {"goal": "Add retry to the http client"})
+    enrichment.memory_store.store_decision("proj", {"goal": "Render the settings page"})
+
+    context = enrichment.rag_policy.retrieve_context("HTTP timeouts", project="proj")
+
+    assert [d["spec"]["goal"] for d in context["decisions"]] == ["Add retry to the http client"]
+    assert enrichment.rag_policy.retrieve_context("http", project="other")["decisions"] == []
+
+
+def test_module_singletons_share_one_store():
+    assert rag_system.rag_enrichment.rag_policy is rag_system.rag_policy
+    assert rag_system.rag_enrichment.memory_store is rag_system.rag_policy.memory_store
+
+
+def test_stored_decisions_carry_their_token_estimate(tmp_path, monkeypatch):
+    import app.rag_system as rag_system
+
+    enrichment = _enrichment(tmp_path)
+    enrichment.memory_store.store_decision("proj", {"goal": "Add retry " + "x" * 400})
+
+    def no_serialization(item):
+        raise AssertionError("stored decisions should not be re-serialized")
+
+    monkeypatch.setattr(rag_system, "_json_bytes", no_serialization)
+    context = enrichment.rag_policy.retrieve_context("retry", project="proj")
+
+    assert context["decisions"][0][TOKEN_ESTIMATE_KEY] > 100
+    assert context["total_tokens"] == context["decisions"][0][TOKEN_ESTIMATE_KEY]
+
+
+def test_similar_items_stop_at_max_items_and_non_positive_scores(tmp_path, monkeypatch):
+    enrichment = _enrichment(tmp_path)
+    policy = enrichment.rag_policy
+    hits = [
+        {"item_id": "a", "similarity": 0.9, "meta": {"project": "proj"}},
+        {"item_id": "b", "similarity": 0.8, "meta": {"project": "other"}},
+        {"item_id": "c", "similarity": 0.7, "meta": {"project": "proj"}},
+        {"item_id": "d", "similarity": 0.0, "meta": {"project": "proj"}},
+    ]
+    monkeypatch.setattr(policy.memory_store, "search_similar", lambda vec, kind, top_k: hits)
+
+    assert [h["item_id"] for h in policy.retrieve_context("q", max_items=1, project="proj")["similar_items"]] == ["a"]
+    assert [h["item_id"] for h in policy.retrieve_context("q", max_items=5, project="proj")["similar_items"]] == ["a", "c"]
+    # Estimating the total leaves the returned hits in the shape the store gave them
+    assert all(TOKEN_ESTIMATE_KEY not in hit for hit in hits)
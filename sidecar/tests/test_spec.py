@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+from app.models import TranscodeRequest
+from app.spec import _profile_template, generate_spec
+
+
+def test_specs_share_a_template_per_style_profile():
+    profile = {"style_guides": ["pep8"], "testing_strategy": "unittest", "unrelated": {"x": 1}}
+    _profile_template.cache_clear()
+
+    first = generate_spec(TranscodeRequest(prompt="  add retries ", style_profile=profile))
+    second = generate_spec(TranscodeRequest(prompt="other", verbosity="minimal", style_profile=dict(profile)))
+
+    assert (first["goal"], first["verbosity"]) == ("add retries", "normal")
+    assert (second["goal"], second["verbosity"]) == ("other", "minimal")
+    assert first["style_guides"] == ["pep8"] and isinstance(first["style_guides"], list)
+    assert first["testing_strategy"] == "unittest"
+    assert first["naming_conventions"] == ["functions: snake_case", "classes: PascalCase"]
+    assert _profile_template.cache_info().hits == 1
+
+
+def test_default_and_unhashable_profiles_build_specs():
+    default = generate_spec(TranscodeRequest(prompt="x"))
+    nested = generate_spec(TranscodeRequest(prompt="x", style_profile={"design_patterns": [{"name": "di"}]}))
+
+    assert default["style_guides"] == ["google docstrings"]
+    assert nested["design_patterns"] == [{"name": "di"}]
+    assert len(default) == len(nested) == 14
+
+
+def test_mutating_a_spec_leaves_later_specs_unchanged():
+    profile = {"style_guides": ["pep8"]}
+    first = generate_spec(TranscodeRequest(prompt="x", style_profile=profile))
+    first["style_guides"].append("mine")
+    first["constraints_inferred"].clear()
+    first["inputs"].append("file.py")
+
+    second = generate_spec(TranscodeRequest(prompt="y", style_profile=profile))
+    default = generate_spec(TranscodeRequest(prompt="z"))
+    default["open_questions"].append("why?")
+
+    assert second["style_guides"] == ["pep8"] and profile["style_guides"] == ["pep8"]
+    assert len(second["constraints_inferred"]) == 3
+    assert second["inputs"] == []
+    assert generate_spec(TranscodeRequest(prompt="z"))["open_questions"] == []
@@ -1,16 +1,34 @@
 import pytest
 from pathlib import Path
 import json
-from jsonschema import validate as jsonschema_validate, ValidationError
+from jsonschema import ValidationError
+from jsonschema.validators import validator_for
 
 from app.spec_generator import SpecGenerator
 from app.models import TaskSpec
 
 
-def test_style_profile_loading():
-    """Test loading style profile from JSON"""
-    generator = SpecGenerator()
+@pytest.fixture(scope="module")
+def generator():
+    """One generator for the tests that only read from it"""
+    return SpecGenerator()
+
+
+@pytest.fixture(scope="module")
+def schema_validator():
+    """Validator compiled once from the canonical schema, as main.py does"""
+    schema_path = Path(__file__).parent.parent / "schemas" / "canonical_spec.schema.json"
+    with open(schema_path, 'r') as f:
+        schema = json.load(f)
+
+    # The schema's own $schema picks the draft
+    validator_cls = validator_for(schema)
+    validator_cls.check_schema(schema)
+    return validator_cls(schema)
+
 
+def test_style_profile_loading(generator):
+    """Test loading style profile from JSON"""
     # Should load default profile if file doesn't exist
     profile = generator.style_profile
     assert isinstance(profile, dict)
@@ -18,10 +36,29 @@ def test_style_profile_loading():
     assert "testing_strategy" in profile
 
 
-def test_cluster_signals_to_taskspec():
-    """Test converting analysis data to TaskSpec"""
-    generator = SpecGenerator()
+def test_style_profile_is_read_once_until_modified(tmp_path, monkeypatch):
+    """The profile file is parsed once and re-read only after it changes"""
+    import os
+    from app import spec_generator
 
+    monkeypatch.setenv("HOME", str(tmp_path))
+    profile_path = tmp_path / ".aeiou" / "style_profile.json"
+    profile_path.parent.mkdir()
+    profile_path.write_text(json.dumps({"style_guides": ["pep8"]}))
+    spec_generator._read_style_profile.cache_clear()
+
+    assert SpecGenerator().style_profile == {"style_guides": ["pep8"]}
+    assert SpecGenerator().style_profile == {"style_guides": ["pep8"]}
+    assert spec_generator._read_style_profile.cache_info().misses == 1
+
+    profile_path.write_text("not json")
+    stat = profile_path.stat()
+    os.utime(profile_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    assert "naming_conventions" in SpecGenerator().style_profile
+
+
+def test_cluster_signals_to_taskspec(generator):
+    """Test converting analysis data to TaskSpec"""
     analysis_data = {
         "filepath": "/path/to/file.py",
         "duplication": 2,
@@ -40,10 +77,8 @@ def test_cluster_signals_to_taskspec():
     assert taskspec.estimated_cost in ["low", "medium", "high"]
 
 
-def test_parse_explicit_constraints():
+def test_parse_explicit_constraints(generator):
     """Test parsing constraints from natural language"""
-    generator = SpecGenerator()
-
     # Test avoiding libraries
     prompt = "Create a function that avoids using numpy and prefers pandas"
     parsed = generator.parse_explicit_constraints(prompt)
@@ -61,10 +96,8 @@ def test_parse_explicit_constraints():
     assert any("dependencies" in c.lower() for c in parsed["constraints_explicit"])
 
 
-def test_generate_clarifying_questions():
+def test_generate_clarifying_questions(generator):
     """Test generating clarifying questions for incomplete TaskSpecs"""
-    generator = SpecGenerator()
-
     # TaskSpec with missing information
     taskspec = TaskSpec(
         goal="Create a function",
@@ -81,10 +114,8 @@ def test_generate_clarifying_questions():
     assert any("testing" in q.lower() for q in questions)
 
 
-def test_enhance_taskspec_with_answers():
+def test_enhance_taskspec_with_answers(generator):
     """Test enhancing TaskSpec with user answers"""
-    generator = SpecGenerator()
-
     taskspec = TaskSpec(
         goal="Create a function",
         inputs=[],
@@ -107,10 +138,8 @@ def test_enhance_taskspec_with_answers():
     assert enhanced.testing_strategy == "unit tests with pytest"
 
 
-def test_json_schema_validation():
+def test_json_schema_validation(generator, schema_validator):
     """Test that generated TaskSpecs validate against JSON schema"""
-    generator = SpecGenerator()
-
     analysis_data = {
         "filepath": "/test/file.py",
         "duplication": 0,
@@ -121,19 +150,12 @@ def test_json_schema_validation():
 
     taskspec = generator.cluster_signals_to_taskspec(analysis_data)
 
-    # Load schema
-    schema_path = Path(__file__).parent.parent / "schemas" / "canonical_spec.schema.json"
-    with open(schema_path, 'r') as f:
-        schema = json.load(f)
-
     # Should not raise ValidationError
-    jsonschema_validate(instance=taskspec.dict(), schema=schema)
+    schema_validator.validate(taskspec.dict())
 
 
-def test_risk_priority_calculation():
+def test_risk_priority_calculation(generator):
     """Test risk and priority calculation"""
-    generator = SpecGenerator()
-
     # High risk scenario
     analysis_data = {
         "filepath": "/test/file.py",
@@ -146,4 +168,57 @@ def test_risk_priority_calculation():
     taskspec = generator.cluster_signals_to_taskspec(analysis_data)
 
     assert taskspec.risk == "high"
-    assert taskspec.priority in ["high", "medium"]  # Could be either based on exact calculation
\ No newline at end of file
+    assert taskspec.priority in ["high", "medium"]  # Could be either based on exact calculation
+
+def test_scores_are_derived_from_extracted_metrics(generator):
+    """Risk, priority and cost read the same metrics the goal is built from"""
+    from app.spec_generator import _AnalysisMetrics
+
+    metrics = _AnalysisMetrics.from_analysis({
+        "duplication": 12,
+        "complexity": {"complexity_score": 120},
+        "test_gap": {"test_coverage_ratio": 0.1},
+        "todos_dead_code": {"todos": 6},
+    })
+
+    assert (metrics.duplication, metrics.complexity, metrics.coverage, metrics.todos) == (12, 120, 0.1, 6)
+    assert generator._calculate_risk(metrics) == "high"
+    assert generator._calculate_priority(metrics) == "high"
+    assert generator._estimate_cost(metrics) == "high"
+    assert _AnalysisMetrics.from_analysis({}) == _AnalysisMetrics(0, 0, 1.0, 0)
+    assert generator._infer_goal_from_analysis(_AnalysisMetrics.from_analysis({}), "a.py") == "Maintain code quality in a.py"
+
+
+def test_merged_libraries_keep_first_mention_order(monkeypatch):
+    """Parsed libraries come first, then profile ones, without duplicates"""
+    from app import spec_generator
+
+    monkeypatch.setattr(spec_generator.rag_enrichment, "enrichment_updates", lambda *args: {})
+    generator = SpecGenerator()
+    generator.style_profile = {"libraries_preferred": ["requests", "attrs", "httpx"]}
+
+    taskspec = generator.cluster_signals_to_taskspec(
+        {"filepath": "a.py", "prompt": "prefer httpx, use pydantic"}
+    )
+
+    assert taskspec.libraries_preferred == ["httpx", "pydantic", "requests", "attrs"]
+
+
+def test_taskspec_is_enriched_without_a_dict_round_trip(generator, monkeypatch):
+    """Retrieved patterns and edge cases are applied to a copy of the built spec"""
+    from app import spec_generator
+
+    def updates(goal, constraints_inferred, edge_cases, project):
+        return {
+            "constraints_inferred": constraints_inferred + ["Pattern: retries"],
+            "edge_cases": edge_cases + ["timeout"],
+            "examples": ["Similar task: x"],
+        }
+
+    monkeypatch.setattr(spec_generator.rag_enrichment, "enrichment_updates", updates)
+    taskspec = generator.cluster_signals_to_taskspec({"filepath": "a.py", "test_gap": {"test_coverage_ratio": 0.1}})
+
+    assert taskspec.constraints_inferred[0] == "Improve test coverage"
+    assert taskspec.constraints_inferred[-1] == "Pattern: retries"
+    assert taskspec.edge_cases == ["timeout"]
+    assert "examples" not in taskspec.model_dump()
@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import subprocess
+
+import pytest
+
+from app.vcs_ops import SKIPPED_NARRATION, VCSOperations, _hunk_new_start
+
+
+def _git(repo, *args):
+    return subprocess.run(["git", *args], cwd=repo, capture_output=True, text=True, check=True).stdout
+
+
+def _commit(repo, message="change"):
+    _git(repo, "add", "-A")
+    _git(repo, "commit", "-q", "-m", message)
+
+
+@pytest.fixture
+def repo(tmp_path):
+    _git(tmp_path, "init", "-q", "-b", "main")
+    _git(tmp_path, "config", "user.email", "dev@example.com")
+    _git(tmp_path, "config", "user.name", "Dev")
+    (tmp_path / "app.py").write_text("import os\n\n\ndef run():\n    return 1\n")
+    _commit(tmp_path, "initial")
+    return tmp_path
+
+
+def test_hunk_headers_are_parsed_by_hand():
+    assert _hunk_new_start("@@ -1,2 +3,4 @@ def f():") == 3
+    assert _hunk_new_start("@@ -1 +7 @@") == 7
+    assert _hunk_new_start("@@ -0,0 +1 @@") == 1
+    # Combined diffs and malformed ranges are not hunks
+    assert _hunk_new_start("@@@ -1,2 -1,2 +1,3 @@@") is None
+    assert _hunk_new_start("@@ -a +1 @@") is None
+    assert _hunk_new_start("@@ -1, +2 @@") is None
+    assert _hunk_new_start("@@ -1 +2,3@@") is None
+    assert _hunk_new_start("@@ -1 +2") is None
+
+
+def test_parser_counts_hunks_and_skips_malformed_ones(repo):
+    vcs = VCSOperations(str(repo))
+    output = "\n".join([
+        "diff --git a/a.py b/a.py",
+        "--- a/a.py",
+        "+++ b/a.py",
+        "@@ -1,2 +1,3 @@",
+        " keep",
+        "+def added():",
+        "-removed",
+        "@@@ -1 -1 +1 @@@",
+        "+ignored in a combined hunk",
+        "@@ -10 +11,2 @@",
+        "+# comment",
+        "diff --git a/b.py b/b.py",
+    ])
+
+    diffs = vcs._parse_diff_output(output)
+
+    assert [d.file_path for d in diffs] == ["a.py"]
+    diff = diffs[0]
+    assert (diff.additions, diff.deletions) == (2, 1)
+    assert [h["start_line"] for h in diff.hunks] == [1, 11]
+    assert [diff.hunk_lines(hunk) for hunk in diff.hunks] == [
+        [" keep", "+def added():", "-removed"],
+        ["+# comment"],
+    ]
+    # Streamed lines (with newlines, as git writes them) parse the same
+    streamed = vcs._parse_diff_output(line + "\n" for line in output.split("\n"))
+    assert [(d.file_path, d.additions, d.deletions, d.hunks) for d in streamed] == [
+        (d.file_path, d.additions, d.deletions, d.hunks) for d in diffs
+    ]
+
+
+def test_narration_covers_content_and_counts_only_summary(repo):
+    (repo / "app.py").write_text("import os\nimport sys\n\n\ndef run():\n    # two\n    return 2\n")
+    _commit(repo)
+    vcs = VCSOperations(str(repo))
+
+    [diff] = vcs.get_diffs_with_narration()
+    assert (diff.file_path, diff.additions, diff.deletions) == ("app.py", 3, 1)
+    assert "Updated imports" in diff.narration
+    assert "Modified comments/documentation" in diff.narration
+
+    [summary] = vcs.get_diff_summary()
+    assert (summary.additions, summary.deletions, summary.lines) == (3, 1, [])
+    assert vcs.get_diffs_with_narration("no-such-ref", "HEAD") == []
+
+
+def test_summary_risk_matches_full_narration(repo):
+    body = "".join(f"def f{i}():\n    return {i}\n\n\n" + "x = 1\n" * 10 for i in range(6))
+    (repo / "app.py").write_text(body)
+    _commit(repo)
+    vcs = VCSOperations(str(repo))
+
+    [full] = vcs.get_diffs_with_narration()
+    [summary] = vcs.get_diff_summary()
+
+    assert summary.lines == [] and summary.function_changes == 2
+    assert (len(summary.hunks), summary.risk_level) == (len(full.hunks), full.risk_level)
+    assert full.risk_level == "medium"
+
+
+def test_renames_and_binary_files_in_numstat(repo):
+    _git(repo, "mv", "app.py", "main.py")
+    (repo / "main.py").write_text("import os\n\n\ndef run():\n    return 1\n\nrun()\n")
+    (repo / "logo.bin").write_bytes(b"\x00\x01\x02")
+    _commit(repo)
+    vcs = VCSOperations(str(repo))
+
+    changed = {d.file_path: (d.additions, d.deletions) for d in vcs.list_changed_files()}
+
+    assert changed == {"main.py": (2, 0), "logo.bin": (0, 0)}
+
+
+def test_binary_and_generated_files_are_skipped(repo):
+    (repo / "logo.bin").write_bytes(b"\x00\x01\x02")
+    (repo / "package-lock.json").write_text('{\n  "a": 1\n}\n')
+    (repo / "vendor.min.js").write_text("function a(){}\n")
+    _commit(repo)
+    vcs = VCSOperations(str(repo))
+
+    diffs = {d.file_path: d for d in vcs.get_diffs_with_narration()}
+
+    assert set(diffs) == {"logo.bin", "package-lock.json", "vendor.min.js"}
+    for diff in diffs.values():
+        assert diff.narration == SKIPPED_NARRATION
+        assert (diff.hunks, diff.lines, diff.risk_level) == ([], [], "low")
+    # Skipped files still report their line counts
+    assert diffs["package-lock.json"].additions == 3
+
+
+def test_commit_messages_reach_git_unchanged(repo):
+    vcs = VCSOperations(str(repo))
+    message = "it's \"$(touch pwned)\" `touch pwned2`; echo $HOME && exit 1"
+
+    first = vcs.create_ephemeral_branch("try it", "main")
+    second = vcs.create_ephemeral_branch("again", first)
+    assert first != second
+
+    (repo / "app.py").write_text("print('hi')\n")
+    assert vcs.commit_ephemeral_changes(second, message)
+    assert vcs.merge_ephemeral_branch(second, "main")
+
+    assert _git(repo, "log", "-1", "--format=%B", "main").strip() == message
+    assert not (repo / "pwned").exists() and not (repo / "pwned2").exists()
+    assert second not in _git(repo, "branch")